@@ -5,17 +5,40 @@ from enum import auto as enum_auto
 from loguru import logger
 
 from .exceptions import NewStateException, StateMachineError
-from .state import State
+from .history import TransitionCause, TransitionHistory, TransitionRecord
+from .metrics import LoopLagMonitor
+from .sharded_runner import ShardedRunner
+from .snapshot import load_snapshots, save_snapshots
+from .state import State, offload
 from .state_machine import StateMachine
+from .state_machine_group import StateMachineGroup
+from .state_machine_template import StateMachineTemplate
 from .states_enum import StatesEnum
+from .timer_wheel import TimerWheel
+from .trace import analyze_trace, read_trace
+from .transition_policy import TransitionPolicy
 
 __all__ = [
+    "LoopLagMonitor",
     "NewStateException",
+    "ShardedRunner",
     "State",
     "StateMachine",
+    "StateMachineGroup",
+    "StateMachineTemplate",
     "StatesEnum",
     "StateMachineError",
+    "TimerWheel",
+    "TransitionCause",
+    "TransitionHistory",
+    "TransitionRecord",
+    "TransitionPolicy",
+    "analyze_trace",
     "enum_auto",
+    "load_snapshots",
+    "offload",
+    "read_trace",
+    "save_snapshots",
 ]
 
 logger.disable(__name__)
@@ -0,0 +1,135 @@
+"""Отчет по файлу трассировки.
+
+python -m async_state_machine trace.bin [--top 10] [--json]
+
+Трассировка записывается StateMachine.config_trace; функции состояний
+повторно не выполняются.
+"""
+
+import argparse
+import json
+from typing import Any
+
+from .trace import DEFAULT_TOP, TraceReport, analyze_trace, read_trace
+
+_MS: float = 1000
+
+
+def _report_json(report: TraceReport) -> dict[str, Any]:
+    return {
+        "duration": report.duration,
+        "states": [item._asdict() for item in report.states],
+        "stages": [item._asdict() for item in report.stages],
+        "critical_path": [item._asdict() for item in report.critical_path],
+        "slowest_transitions": [
+            item._asdict() for item in report.slowest_transitions
+        ],
+        "worst_latencies": [
+            {**item._asdict(), "cause": item.cause.name}
+            for item in report.worst_latencies
+        ],
+    }
+
+
+def _print_table(
+    title: str,
+    columns: tuple[str, ...],
+    rows: list[tuple[Any, ...]],
+) -> None:
+    """Таблица: первая колонка - имя, остальные - числа."""
+    print("\n{0:<38}".format(title) + "".join(
+        " {0:>12}".format(column) for column in columns
+    ))
+    for name, *values in rows:
+        print("  {0:<36}".format(name) + "".join(
+            " {0:>12.3f}".format(value)
+            if isinstance(value, float)
+            else " {0:>12}".format(value)
+            for value in values
+        ))
+
+
+def _print_report(report: TraceReport) -> None:
+    print("Duration: {0:.3f} s".format(report.duration))
+    _print_table(
+        "States",
+        ("visits", "total, ms", "max, ms"),
+        [
+            (item.state, item.visits, item.total * _MS, item.max * _MS)
+            for item in report.states
+        ],
+    )
+    _print_table(
+        "Stages",
+        ("runs", "timeouts", "total, ms", "max, ms"),
+        [
+            (
+                "{0}|{1}".format(item.state, item.stage),
+                item.runs,
+                item.timeouts,
+                item.total * _MS,
+                item.max * _MS,
+            )
+            for item in report.stages
+        ],
+    )
+    _print_table(
+        "Critical path",
+        ("intervals", "total, ms", "share, %"),
+        [
+            (item.segment, item.intervals, item.total * _MS, item.share * 100)
+            for item in report.critical_path
+        ],
+    )
+    _print_table(
+        "Slowest transitions",
+        ("transitions", "total, ms"),
+        [
+            (
+                "{0} -> {1}".format(item.active_state, item.new_state),
+                item.transitions,
+                item.total * _MS,
+            )
+            for item in report.slowest_transitions
+        ],
+    )
+    _print_table(
+        "Worst transition latencies",
+        ("cause", "ms"),
+        [
+            (
+                "{0} -> {1}".format(item.active_state, item.new_state),
+                item.cause.name,
+                item.latency * _MS,
+            )
+            for item in report.worst_latencies
+        ],
+    )
+
+
+def main() -> None:
+    """Разбор трассировки и вывод отчета."""
+    parser = argparse.ArgumentParser(prog="python -m async_state_machine")
+    parser.add_argument("trace", help="файл трассировки")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=DEFAULT_TOP,
+        help="количество записей в критическом пути, переходах и задержках",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="вывести отчет в формате JSON",
+    )
+    args = parser.parse_args()
+
+    report = analyze_trace(read_trace(args.trace), args.top)
+    if args.json:
+        print(json.dumps(_report_json(report), indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Активные родительские состояния машины."""
+
+import asyncio
+
+from .exceptions import NewStateData
+from .runtime import Runtime
+from .shared import cancel_and_wait, discard_results
+from .state import StateRunner
+
+
+class ActiveParents(object):
+    """Активные родительские состояния машины.
+
+    Хранит цепочку родителей активного состояния и задачи их стадий
+    on_run. При переходе выходит только из родителей, которых нет у нового
+    состояния, и входит только в новые, поэтому on_run общего родителя не
+    перезапускается.
+    """
+
+    __slots__ = ("__chain", "__tasks")
+
+    def __init__(self) -> None:
+        """Активные родительские состояния машины."""
+        self.__chain: list[StateRunner]
+        self.__tasks: list[asyncio.Task[NewStateData | None]]
+
+        self.__chain = []
+        self.__tasks = []
+
+    @property
+    def chain(self) -> tuple[StateRunner, ...]:
+        """Активные родители, от внешнего к ближайшему."""
+        return tuple(self.__chain)
+
+    async def switch(
+        self,
+        runner: StateRunner,
+        runtime: Runtime,
+        skip_on_enter: bool = False,
+    ) -> NewStateData | None:
+        """Перейти к родителям состояния runner.
+
+        Родитель, on_run которого запросил переход, считается покинутым:
+        он завершается и, если нужен новому состоянию, запускается заново.
+        Переход родителя, не принятый дочерним состоянием, например во время
+        его on_exit, возвращается без смены родителей.
+
+        Parameters
+        ----------
+        runner: StateRunner
+            новое активное состояние
+        runtime: Runtime
+            данные экземпляра машины
+        skip_on_enter: bool
+            не выполнять on_enter новых родителей
+
+        Returns
+        -------
+        Переход, запрошенный родителем, или None
+        """
+        pending = self.__pending_transition(runtime)
+        if pending is not None:
+            return pending
+        ancestors = runner.ancestors
+        keep = 0
+        limit = min(len(self.__chain), len(ancestors))
+        while keep < limit and self.__is_kept(keep, ancestors[keep]):
+            keep += 1
+        await self.__exit_to(keep, runtime)
+        if len(ancestors) > keep and runtime.interrupt is None:
+            runtime.interrupt = asyncio.get_running_loop().create_future()
+        for parent in ancestors[keep:]:
+            new_state_data: NewStateData | None = None
+            if not skip_on_enter:
+                new_state_data = await parent.execute_stage(
+                    "on_enter",
+                    runtime,
+                )
+            self.__chain.append(parent)
+            self.__tasks.append(self.__start_on_run(parent, runtime))
+            if new_state_data is not None:
+                return new_state_data
+        return None
+
+    async def close(self, runtime: Runtime) -> None:
+        """Остановить on_run всех родителей без выполнения on_exit.
+
+        Ошибки родителей, не переданные дочернему состоянию, считаются
+        обработанными: машина уже остановлена.
+        """
+        tasks = tuple(self.__tasks)
+        interrupt = runtime.interrupt
+        self.__chain.clear()
+        self.__tasks.clear()
+        runtime.interrupt = None
+        await cancel_and_wait(tasks)
+        if interrupt is not None:
+            discard_results((interrupt,))
+
+    def __is_kept(self, index: int, parent: StateRunner) -> bool:
+        """Родитель остается активным после перехода."""
+        if self.__chain[index] is not parent:
+            return False
+        task = self.__tasks[index]
+        # on_run, завершенный без перехода, не перезапускается
+        return not task.done() or task.result() is None
+
+    async def __exit_to(self, keep: int, runtime: Runtime) -> None:
+        """Выход из родителей, начиная с ближайшего."""
+        while len(self.__chain) > keep:
+            parent = self.__chain.pop()
+            task = self.__tasks.pop()
+            await cancel_and_wait((task,))
+            await parent.execute_stage("on_exit", runtime)
+        if not self.__chain:
+            runtime.interrupt = None
+
+    def __pending_transition(self, runtime: Runtime) -> NewStateData | None:
+        """Переход родителя, не принятый дочерним состоянием.
+
+        Ошибка on_run родителя, не переданная через дочернее состояние,
+        генерируется здесь.
+        """
+        interrupt = runtime.interrupt
+        if interrupt is None or not interrupt.done():
+            return None
+        runtime.interrupt = asyncio.get_running_loop().create_future()
+        return interrupt.result()
+
+    def __start_on_run(
+        self,
+        parent: StateRunner,
+        runtime: Runtime,
+    ) -> "asyncio.Task[NewStateData | None]":
+        return asyncio.ensure_future(_run_parent(parent, runtime))
+
+
+async def _run_parent(
+    parent: StateRunner,
+    runtime: Runtime,
+) -> NewStateData | None:
+    """on_run родителя с передачей перехода или ошибки дочернему состоянию.
+
+    Переход передается до завершения задачи, поэтому завершенная задача
+    всегда означает уже переданный переход.
+    """
+    try:
+        new_state_data = await parent.execute_stage("on_run", runtime)
+    except Exception as exc:
+        interrupt = runtime.interrupt
+        if interrupt is None or interrupt.done():
+            raise
+        interrupt.set_exception(exc)
+        return None
+    interrupt = runtime.interrupt
+    if new_state_data is not None and interrupt is not None:
+        if not interrupt.done():
+            interrupt.set_result(new_state_data)
+    return new_state_data
@@ -2,6 +2,7 @@
 
 from typing import NamedTuple, Self
 
+from .history import TransitionCause
 from .states_enum import StatesEnum
 
 
@@ -10,6 +11,7 @@ class NewStateData(NamedTuple):
 
     active_state: StatesEnum | None
     new_state: StatesEnum
+    cause: TransitionCause = TransitionCause.callback
 
 
 class NewStateException(Exception):  # noqa: N818
@@ -43,6 +45,7 @@ class NewStateException(Exception):  # noqa: N818
             new_state_data=NewStateData(
                 active_state=active_state,
                 new_state=new_state_data.new_state,
+                cause=new_state_data.cause,
             ),
         )
 
@@ -0,0 +1,179 @@
+"""История переходов машины состояний."""
+
+from array import array
+from collections.abc import Iterator
+from enum import IntEnum
+from typing import Any, Final, NamedTuple
+
+from .states_enum import StatesEnum
+
+EXC_WRONG_CAPACITY: Final[str] = "History capacity must be positive: {value}"
+
+
+class TransitionCause(IntEnum):
+    """Причина перехода."""
+
+    callback = 0
+    timeout = 1
+    event = 2
+
+
+class TransitionRecord(NamedTuple):
+    """Запись о переходе."""
+
+    time: float
+    active_state: StatesEnum | None
+    new_state: StatesEnum
+    cause: TransitionCause
+
+
+class TransitionHistory(object):
+    """Последние переходы машины в кольцевом буфере.
+
+    Буфер выделяется при создании: время и причина хранятся в массивах
+    array, состояния - в списках фиксированной длины. Запись перехода
+    только заменяет элементы, старые записи перезаписываются.
+    """
+
+    __slots__ = (
+        "__capacity",
+        "__times",
+        "__causes",
+        "__active_states",
+        "__new_states",
+        "__next",
+        "__count",
+    )
+
+    def __init__(self, capacity: int) -> None:
+        """Последние переходы машины в кольцевом буфере.
+
+        Parameters
+        ----------
+        capacity: int
+            количество хранимых переходов
+
+        Raises
+        ------
+        ValueError
+            capacity меньше 1
+        """
+        self.__capacity: int
+        self.__times: "array[float]"
+        self.__causes: "array[int]"
+        self.__active_states: list[StatesEnum | None]
+        self.__new_states: list[StatesEnum | None]
+        self.__next: int
+        self.__count: int
+
+        if capacity < 1:
+            raise ValueError(EXC_WRONG_CAPACITY.format(value=capacity))
+        self.__capacity = capacity
+        self.__times = array("d", bytes(8 * capacity))
+        self.__causes = array("B", bytes(capacity))
+        self.__active_states = [None] * capacity
+        self.__new_states = [None] * capacity
+        self.__next = 0
+        self.__count = 0
+
+    @property
+    def capacity(self) -> int:
+        """Количество хранимых переходов."""
+        return self.__capacity
+
+    def __len__(self) -> int:
+        """Количество записей в буфере."""
+        return self.__count
+
+    def __iter__(self) -> Iterator[TransitionRecord]:
+        """Записи от старых к новым."""
+        start = (self.__next - self.__count) % self.__capacity
+        for offset in range(self.__count):
+            yield self.__record((start + offset) % self.__capacity)
+
+    def record(
+        self,
+        time: float,
+        active_state: StatesEnum | None,
+        new_state: StatesEnum,
+        cause: TransitionCause,
+    ) -> None:
+        """Записать переход."""
+        index = self.__next
+        self.__times[index] = time
+        self.__causes[index] = cause
+        self.__active_states[index] = active_state
+        self.__new_states[index] = new_state
+        index += 1
+        self.__next = 0 if index == self.__capacity else index
+        if self.__count < self.__capacity:
+            self.__count += 1
+
+    def clear(self) -> None:
+        """Удалить все записи."""
+        self.__next = 0
+        self.__count = 0
+
+    def last(self) -> TransitionRecord | None:
+        """Последний переход."""
+        if not self.__count:
+            return None
+        return self.__record((self.__next - 1) % self.__capacity)
+
+    def query(
+        self,
+        since: float | None = None,
+        state: StatesEnum | None = None,
+        cause: TransitionCause | None = None,
+    ) -> list[TransitionRecord]:
+        """Выборка переходов от старых к новым.
+
+        Parameters
+        ----------
+        since: float | None
+            только переходы не раньше момента since, по loop.time()
+        state: StatesEnum | None
+            только переходы из состояния или в состояние state
+        cause: TransitionCause | None
+            только переходы с причиной cause
+
+        Returns
+        -------
+        Список записей
+        """
+        return [
+            record
+            for record in self
+            if (since is None or record.time >= since)
+            and (cause is None or record.cause == cause)
+            and (
+                state is None
+                or state in {record.active_state, record.new_state}
+            )
+        ]
+
+    def export(self) -> list[dict[str, Any]]:
+        """Записи от старых к новым в виде, пригодном для json."""
+        return [
+            {
+                "time": record.time,
+                "active_state": (
+                    None
+                    if record.active_state is None
+                    else record.active_state.name
+                ),
+                "new_state": record.new_state.name,
+                "cause": record.cause.name,
+            }
+            for record in self
+        ]
+
+    def __record(self, index: int) -> TransitionRecord:
+        new_state = self.__new_states[index]
+        assert new_state is not None  # noqa: S101
+        return TransitionRecord(
+            time=self.__times[index],
+            active_state=self.__active_states[index],
+            new_state=new_state,
+            cause=TransitionCause(self.__causes[index]),
+        )
@@ -0,0 +1,293 @@
+"""Метрики выполнения машины состояний."""
+
+import asyncio
+import bisect
+import time
+from collections.abc import Iterable
+from typing import Final, NamedTuple
+
+from .states_enum import StatesEnum
+
+DEFAULT_LOOP_LAG_INTERVAL: Final[float] = 0.1
+
+# верхние границы интервалов гистограммы, с; последний интервал - больше 10 с
+LATENCY_BUCKETS: Final[tuple[float, ...]] = (
+    0.00001,
+    0.00003,
+    0.0001,
+    0.0003,
+    0.001,
+    0.003,
+    0.01,
+    0.03,
+    0.1,
+    0.3,
+    1,
+    3,
+    10,
+)
+
+
+class HistogramSnapshot(NamedTuple):
+    """Снимок гистограммы."""
+
+    bounds: tuple[float, ...]
+    counts: tuple[int, ...]
+    samples: int
+    total: float
+
+
+class StageSnapshot(NamedTuple):
+    """Снимок метрик стадии."""
+
+    timeouts: int
+    latency: HistogramSnapshot
+
+
+class StateSnapshot(NamedTuple):
+    """Снимок метрик состояния."""
+
+    entries: int
+    duration: HistogramSnapshot
+    on_enter: StageSnapshot
+    on_run: StageSnapshot
+    on_exit: StageSnapshot
+
+
+class MetricsSnapshot(NamedTuple):
+    """Снимок метрик машины состояний.
+
+    transitions - количество переходов по каждому ребру графа,
+    transition_latency - время в исходном состоянии перед переходом по
+    ребру.
+    """
+
+    states: dict[StatesEnum, StateSnapshot]
+    transitions: dict[StatesEnum, dict[StatesEnum, int]]
+    transition_latency: dict[StatesEnum, dict[StatesEnum, HistogramSnapshot]]
+
+
+class Histogram(object):
+    """Гистограмма с фиксированными интервалами.
+
+    Счетчики выделяются при создании, запись значения не создает объектов.
+    """
+
+    __slots__ = ("__bounds", "__counts", "__count", "__total")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Гистограмма с фиксированными интервалами."""
+        self.__bounds: tuple[float, ...]
+        self.__counts: list[int]
+        self.__count: int
+        self.__total: float
+
+        self.__bounds = bounds
+        self.__counts = [0] * (len(bounds) + 1)
+        self.__count = 0
+        self.__total = 0
+
+    @property
+    def samples(self) -> int:
+        """Количество значений."""
+        return self.__count
+
+    def observe(self, value: float) -> None:
+        """Записать значение."""
+        self.__counts[bisect.bisect_left(self.__bounds, value)] += 1
+        self.__count += 1
+        self.__total += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        """Снимок гистограммы."""
+        return HistogramSnapshot(
+            bounds=self.__bounds,
+            counts=tuple(self.__counts),
+            samples=self.__count,
+            total=self.__total,
+        )
+
+
+class StageMetrics(object):
+    """Метрики стадии состояния."""
+
+    __slots__ = ("latency", "timeouts")
+
+    def __init__(self) -> None:
+        """Метрики стадии состояния."""
+        self.latency: Histogram = Histogram()
+        self.timeouts: int = 0
+
+    def snapshot(self) -> StageSnapshot:
+        """Снимок метрик стадии."""
+        return StageSnapshot(
+            timeouts=self.timeouts,
+            latency=self.latency.snapshot(),
+        )
+
+
+class StateMetrics(object):
+    """Метрики состояния."""
+
+    __slots__ = ("entries", "duration", "on_enter", "on_run", "on_exit")
+
+    def __init__(self) -> None:
+        """Метрики состояния."""
+        self.entries: int = 0
+        self.duration: Histogram = Histogram()
+        self.on_enter: StageMetrics = StageMetrics()
+        self.on_run: StageMetrics = StageMetrics()
+        self.on_exit: StageMetrics = StageMetrics()
+
+    def snapshot(self) -> StateSnapshot:
+        """Снимок метрик состояния."""
+        return StateSnapshot(
+            entries=self.entries,
+            duration=self.duration.snapshot(),
+            on_enter=self.on_enter.snapshot(),
+            on_run=self.on_run.snapshot(),
+            on_exit=self.on_exit.snapshot(),
+        )
+
+
+class MachineMetrics(object):
+    """Метрики машины состояний."""
+
+    __slots__ = ("__names", "__states", "__transitions")
+
+    def __init__(self, names: Iterable[StatesEnum]) -> None:
+        """Метрики машины состояний.
+
+        Parameters
+        ----------
+        names: Iterable[StatesEnum]
+            все состояния машины. Метрики состояния создаются при первом
+            входе в него и далее только обновляются, поэтому создание машины
+            не зависит от количества состояний.
+        """
+        self.__names: Iterable[StatesEnum]
+        self.__states: dict[StatesEnum, StateMetrics]
+        self.__transitions: dict[StatesEnum, dict[StatesEnum, Histogram]]
+
+        self.__names = names
+        self.__states = {}
+        self.__transitions = {}
+
+    def state(self, name: StatesEnum) -> StateMetrics:
+        """Метрики состояния."""
+        metrics = self.__states.get(name)
+        if metrics is None:
+            metrics = StateMetrics()
+            self.__states[name] = metrics
+            self.__transitions[name] = {}
+        return metrics
+
+    def record_transition(
+        self,
+        active_state: StatesEnum,
+        new_state: StatesEnum,
+        latency: float,
+    ) -> None:
+        """Записать переход между состояниями.
+
+        Гистограмма ребра создается при первом переходе по нему.
+
+        Parameters
+        ----------
+        active_state: StatesEnum
+            исходное состояние
+        new_state: StatesEnum
+            новое состояние
+        latency: float
+            время в исходном состоянии перед переходом, с
+        """
+        edges = self.__transitions.get(active_state)
+        if edges is None:
+            edges = {}
+            self.__transitions[active_state] = edges
+        histogram = edges.get(new_state)
+        if histogram is None:
+            histogram = Histogram()
+            edges[new_state] = histogram
+        histogram.observe(latency)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Снимок метрик машины состояний."""
+        return MetricsSnapshot(
+            states={
+                name: self.__states.get(name, _EMPTY_STATE).snapshot()
+                for name in self.__names
+            },
+            transitions={
+                name: {
+                    new_state: histogram.samples
+                    for new_state, histogram in self.__edges(name)
+                }
+                for name in self.__names
+            },
+            transition_latency={
+                name: {
+                    new_state: histogram.snapshot()
+                    for new_state, histogram in self.__edges(name)
+                }
+                for name in self.__names
+            },
+        )
+
+    def __edges(
+        self,
+        name: StatesEnum,
+    ) -> Iterable[tuple[StatesEnum, Histogram]]:
+        return self.__transitions.get(name, {}).items()
+
+
+class LoopLagMonitor(object):
+    """Задержка цикла событий.
+
+    Задача периодически засыпает на interval и записывает, насколько позже
+    заданного она была разбужена. Большая задержка означает, что функция
+    состояния блокирует цикл и ее следует выполнять через offload.
+    """
+
+    __slots__ = ("__interval", "__lag", "__max_lag")
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_LOOP_LAG_INTERVAL,
+    ) -> None:
+        """Задержка цикла событий.
+
+        Parameters
+        ----------
+        interval: float
+            период измерения, с
+        """
+        self.__interval: float
+        self.__lag: Histogram
+        self.__max_lag: float
+
+        self.__interval = interval
+        self.__lag = Histogram()
+        self.__max_lag = 0
+
+    @property
+    def max_lag(self) -> float:
+        """Наибольшая измеренная задержка, с."""
+        return self.__max_lag
+
+    def snapshot(self) -> HistogramSnapshot:
+        """Снимок гистограммы задержек."""
+        return self.__lag.snapshot()
+
+    async def run(self) -> None:
+        """Задача для асинхронного выполнения."""
+        interval = self.__interval
+        while True:  # noqa: WPS457
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(time.perf_counter() - start - interval, 0)
+            self.__lag.observe(lag)
+            self.__max_lag = max(self.__max_lag, lag)
+
+
+_EMPTY_STATE: Final[StateMetrics] = StateMetrics()
@@ -0,0 +1,58 @@
+"""Данные экземпляра машины состояний."""
+
+import asyncio
+from typing import Any
+
+from .metrics import MachineMetrics
+from .timer_wheel import TimerWheel
+from .trace import TraceRecorder
+from .typings import TEvent
+
+
+class Runtime(object):
+    """Данные экземпляра машины состояний.
+
+    Созданные из State объекты StateRunner общие для всех машин с одними
+    определениями состояний, поэтому все данные экземпляра передаются в
+    StateRunner.execute через этот объект.
+    """
+
+    __slots__ = (
+        "metrics",
+        "events",
+        "timer_wheel",
+        "context_args",
+        "interrupt",
+        "recorder",
+    )
+
+    def __init__(
+        self,
+        metrics: MachineMetrics | None = None,
+        events: "asyncio.Queue[TEvent] | None" = None,
+        timer_wheel: TimerWheel | None = None,
+        context: Any = None,
+    ) -> None:
+        """Данные экземпляра машины состояний.
+
+        Parameters
+        ----------
+        metrics: MachineMetrics | None
+            метрики машины, None - не собираются
+        events: asyncio.Queue[TEvent] | None
+            очередь внешних событий машины
+        timer_wheel: TimerWheel | None
+            общее колесо таймеров, None - таймауты через asyncio.timeout
+        context: Any
+            контекст машины, передается функциям состояний. Хранится в
+            виде кортежа (context,), чтобы не создавать его при каждом
+            вызове.
+        """
+        self.metrics: MachineMetrics | None = metrics
+        self.events: asyncio.Queue[TEvent] | None = events
+        self.timer_wheel: TimerWheel | None = timer_wheel
+        self.context_args: tuple[Any, ...] = (context,)
+        # переход, запрошенный родительским состоянием
+        self.interrupt: asyncio.Future[Any] | None = None
+        # запись трассировки, None - не ведется
+        self.recorder: TraceRecorder | None = None
@@ -0,0 +1,368 @@
+"""Машины состояний на нескольких процессах."""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from collections.abc import Callable, Hashable
+from multiprocessing.connection import Connection
+from multiprocessing.context import (
+    DefaultContext,
+    ForkContext,
+    ForkServerContext,
+    SpawnContext,
+)
+from multiprocessing.process import BaseProcess
+from typing import Any, Final, Self, TypeVar
+
+from .exceptions import StateMachineError
+from .metrics import MetricsSnapshot
+from .state_machine import StateMachine
+from .state_machine_group import StateMachineGroup
+from .states_enum import StatesEnum
+from .typings import TEvent
+
+TMachineFactory = Callable[[Hashable], StateMachine]
+TMpContext = DefaultContext | SpawnContext | ForkContext | ForkServerContext
+T = TypeVar("T")
+
+DEFAULT_REQUEST_TIMEOUT: Final[float] = 10.0
+STOP_TIMEOUT: Final[float] = 1.0
+
+EXC_NOT_STARTED: Final[str] = "Sharded runner is not started"
+EXC_ALREADY_STARTED: Final[str] = "Sharded runner is already started"
+EXC_WRONG_WORKERS: Final[str] = "Workers count must be positive: {workers}"
+EXC_UNKNOWN_KEY: Final[str] = "State machine not found, key: {key}"
+EXC_KEY_EXISTS: Final[str] = "State machine already exists, key: {key}"
+EXC_UNKNOWN_COMMAND: Final[str] = "Unknown command: {command}"
+EXC_WORKER_DEAD: Final[str] = "Worker process is not running"
+EXC_REQUEST_TIMEOUT: Final[str] = "Worker did not respond in {timeout} s"
+
+CMD_ADD: Final[str] = "add"
+CMD_REMOVE: Final[str] = "remove"
+CMD_POST: Final[str] = "post"
+CMD_ACTIVE_STATE: Final[str] = "active_state"
+CMD_METRICS: Final[str] = "metrics"
+CMD_KEYS: Final[str] = "keys"
+CMD_STOP: Final[str] = "stop"
+
+
+class ShardedRunner(object):
+    """Машины состояний на нескольких процессах.
+
+    Каждый процесс выполняет StateMachineGroup на своем цикле событий.
+    Машины создаются в процессе фабрикой по ключу, процесс выбирается по
+    ключу. Управление - через канал к каждому процессу: события, активное
+    состояние, метрики.
+
+    Запросы к процессам блокируют вызывающий поток до ответа, но не дольше
+    timeout. Из асинхронного кода используйте call.
+    """
+
+    __slots__ = (
+        "__factory",
+        "__workers",
+        "__mp_context",
+        "__timeout",
+        "__processes",
+        "__channels",
+    )
+
+    def __init__(
+        self,
+        factory: TMachineFactory,
+        workers: int | None = None,
+        mp_context: TMpContext | None = None,
+        timeout: float | None = DEFAULT_REQUEST_TIMEOUT,
+    ) -> None:
+        """Машины состояний на нескольких процессах.
+
+        Parameters
+        ----------
+        factory: TMachineFactory
+            функция создания машины по ключу, выполняется в процессе.
+            Должна сериализоваться pickle, как и ключи, события и
+            состояния.
+        workers: int | None
+            количество процессов, по-умолчанию - количество ядер
+        mp_context: TMpContext | None
+            контекст multiprocessing, по-умолчанию - контекст платформы
+        timeout: float | None
+            наибольшее время ожидания ответа процесса, с. None - без
+            ограничения
+
+        Raises
+        ------
+        StateMachineError
+            количество процессов меньше 1
+        """
+        self.__factory: TMachineFactory
+        self.__workers: int
+        self.__mp_context: TMpContext
+        self.__timeout: float | None
+        self.__processes: list[BaseProcess]
+        self.__channels: list[_Channel]
+
+        workers = workers or os.cpu_count() or 1
+        if workers < 1:
+            raise StateMachineError(EXC_WRONG_WORKERS.format(workers=workers))
+        self.__factory = factory
+        self.__workers = workers
+        self.__mp_context = mp_context or multiprocessing.get_context()
+        self.__timeout = timeout
+        self.__processes = []
+        self.__channels = []
+
+    @property
+    def workers(self) -> int:
+        """Количество процессов."""
+        return self.__workers
+
+    @property
+    def started(self) -> bool:
+        """Процессы запущены."""
+        return bool(self.__processes)
+
+    def shard_of(self, key: Hashable) -> int:
+        """Номер процесса для машины с ключом key.
+
+        Номер не зависит от PYTHONHASHSEED: считается crc32 строки или
+        байтов ключа, для других ключей - crc32 repr(key).
+        """
+        return _stable_hash(key) % self.__workers
+
+    def start(self) -> Self:
+        """Запустить процессы."""
+        if self.__processes:
+            raise StateMachineError(EXC_ALREADY_STARTED)
+        for _ in range(self.__workers):
+            parent_conn, child_conn = self.__mp_context.Pipe()
+            process = self.__mp_context.Process(
+                target=_worker_main,
+                args=(self.__factory, child_conn),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self.__processes.append(process)
+            self.__channels.append(_Channel(parent_conn, self.__timeout))
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Остановить машины и процессы."""
+        for channel in self.__channels:
+            try:
+                channel.request(CMD_STOP, timeout=STOP_TIMEOUT)
+            except StateMachineError:
+                pass
+            channel.close()
+        for process in self.__processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.__processes.clear()
+        self.__channels.clear()
+
+    async def call(self, method: Callable[..., T], *args: Any) -> T:
+        """Выполнить запрос в потоке, не блокируя цикл событий.
+
+        Пример: await runner.call(runner.active_state, key)
+
+        Parameters
+        ----------
+        method: Callable[..., T]
+            метод ShardedRunner, например post или active_state
+        args: Any
+            аргументы метода
+
+        Returns
+        -------
+        Результат метода
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, method, *args)
+
+    def add(self, key: Hashable) -> Self:
+        """Создать и запустить машину с ключом key."""
+        self.__channel(key).request(CMD_ADD, key)
+        return self
+
+    def remove(self, key: Hashable) -> Self:
+        """Остановить машину с ключом key."""
+        self.__channel(key).request(CMD_REMOVE, key)
+        return self
+
+    def post(self, key: Hashable, event: TEvent) -> None:
+        """Передать событие машине без ожидания места в очереди."""
+        self.__channel(key).request(CMD_POST, key, event)
+
+    def active_state(self, key: Hashable) -> StatesEnum:
+        """Активное состояние машины."""
+        return self.__channel(key).request(CMD_ACTIVE_STATE, key)
+
+    def metrics_snapshot(self, key: Hashable) -> MetricsSnapshot | None:
+        """Снимок метрик машины."""
+        return self.__channel(key).request(CMD_METRICS, key)
+
+    def keys(self) -> list[Hashable]:
+        """Ключи всех машин."""
+        if not self.__channels:
+            raise StateMachineError(EXC_NOT_STARTED)
+        keys: list[Hashable] = []
+        for channel in self.__channels:
+            keys.extend(channel.request(CMD_KEYS))
+        return keys
+
+    def __enter__(self) -> Self:
+        """Запуск процессов."""
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Остановка процессов."""
+        self.stop()
+
+    def __channel(self, key: Hashable) -> "_Channel":
+        if not self.__channels:
+            raise StateMachineError(EXC_NOT_STARTED)
+        return self.__channels[self.shard_of(key)]
+
+
+class _Channel(object):
+    """Канал управления процессом, запрос - ответ.
+
+    Ответ содержит номер запроса: ответ, пришедший после таймаута,
+    пропускается следующим запросом.
+    """
+
+    __slots__ = ("__conn", "__lock", "__timeout", "__number")
+
+    def __init__(self, conn: Connection, timeout: float | None) -> None:
+        self.__conn = conn
+        self.__lock = threading.Lock()
+        self.__timeout = timeout
+        self.__number = 0
+
+    def request(
+        self,
+        command: str,
+        *args: Any,
+        timeout: float | None = None,
+    ) -> Any:
+        if timeout is None:
+            timeout = self.__timeout
+        with self.__lock:
+            self.__number += 1
+            try:
+                self.__conn.send((self.__number, command, args))
+                success, result = self.__receive(self.__number, timeout)
+            except (EOFError, OSError):
+                raise StateMachineError(EXC_WORKER_DEAD) from None
+        if not success:
+            raise StateMachineError(result)
+        return result
+
+    def close(self) -> None:
+        self.__conn.close()
+
+    def __receive(self, number: int, timeout: float | None) -> Any:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:  # noqa: WPS457
+            remaining = None
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+            if not self.__conn.poll(remaining):
+                raise StateMachineError(
+                    EXC_REQUEST_TIMEOUT.format(timeout=timeout),
+                )
+            reply_number, success, result = self.__conn.recv()
+            if reply_number == number:
+                return success, result
+
+
+class _Worker(object):
+    """Обработка команд в процессе."""
+
+    __slots__ = ("__factory", "__group", "__machines")
+
+    def __init__(self, factory: TMachineFactory) -> None:
+        self.__factory = factory
+        self.__group = StateMachineGroup()
+        self.__machines: dict[Hashable, StateMachine] = {}
+
+    async def serve(self, conn: Connection) -> None:
+        loop = asyncio.get_running_loop()
+        group_task = asyncio.create_task(self.__group.run())
+        try:
+            while True:  # noqa: WPS457
+                try:
+                    number, command, args = await loop.run_in_executor(
+                        None,
+                        conn.recv,
+                    )
+                except EOFError:
+                    return
+                conn.send((number, *self.__handle(command, args)))
+                if command == CMD_STOP:
+                    return
+        finally:
+            group_task.cancel()
+
+    def __handle(
+        self,
+        command: str,
+        args: tuple[Any, ...],
+    ) -> tuple[bool, Any]:
+        try:
+            return True, self.__dispatch(command, *args)
+        except StateMachineError as exc:
+            return False, exc.message
+        except Exception as exc:  # noqa: WPS440
+            return False, repr(exc)
+
+    def __dispatch(self, command: str, *args: Any) -> Any:  # noqa: WPS212
+        if command == CMD_KEYS:
+            return list(self.__machines)
+        if command == CMD_STOP:
+            return None
+        key = args[0]
+        if command == CMD_ADD:
+            return self.__add(key)
+        machine = self.__machines.get(key)
+        if machine is None:
+            raise StateMachineError(EXC_UNKNOWN_KEY.format(key=key))
+        if command == CMD_REMOVE:
+            self.__group.remove(self.__machines.pop(key))
+            return None
+        if command == CMD_POST:
+            return machine.post(args[1])
+        if command == CMD_ACTIVE_STATE:
+            return machine.active_state
+        if command == CMD_METRICS:
+            return machine.metrics_snapshot()
+        raise StateMachineError(EXC_UNKNOWN_COMMAND.format(command=command))
+
+    def __add(self, key: Hashable) -> None:
+        if key in self.__machines:
+            raise StateMachineError(EXC_KEY_EXISTS.format(key=key))
+        machine = self.__factory(key)
+        self.__machines[key] = machine
+        self.__group.add(machine)
+
+
+def _stable_hash(key: Hashable) -> int:
+    """Хеш ключа, одинаковый во всех запусках интерпретатора."""
+    if isinstance(key, bytes):
+        return zlib.crc32(key)
+    if isinstance(key, str):
+        return zlib.crc32(key.encode())
+    return zlib.crc32(repr(key).encode())
+
+
+def _worker_main(factory: TMachineFactory, conn: Connection) -> None:
+    """Точка входа процесса."""
+    try:
+        asyncio.run(_Worker(factory).serve(conn))
+    finally:
+        conn.close()
@@ -1,10 +1,22 @@
 """Вспомогательные функции."""
 
-from typing import TypeVar
+import asyncio
+from collections.abc import Iterable
+from typing import Any
 
-TException = TypeVar("TException", bound=Exception)
 
+def discard_results(futures: Iterable[asyncio.Future[Any]]) -> None:
+    """Отбросить результаты задач, исключения считаются обработанными."""
+    for future in futures:
+        if future.done() and not future.cancelled():
+            future.exception()
 
-def exc_group_to_exc(exc_gr: ExceptionGroup[TException]) -> TException:
-    """Возращает первое исключение из группы."""
-    return exc_gr.exceptions[0]  # pyright: ignore[reportGeneralTypeIssues]
+
+async def cancel_and_wait(futures: Iterable[asyncio.Future[Any]]) -> None:
+    """Отменить задачи, дождаться их завершения и отбросить результаты."""
+    futures = tuple(futures)
+    for future in futures:
+        future.cancel()
+    if futures:
+        await asyncio.wait(futures)
+    discard_results(futures)
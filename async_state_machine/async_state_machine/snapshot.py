@@ -0,0 +1,423 @@
+"""Двоичные снимки машин состояний."""
+
+import asyncio
+import mmap
+import os
+import pickle  # noqa: S403
+import struct
+import time
+import zlib
+from collections.abc import Iterable, Mapping
+from typing import Any, Final, NamedTuple
+
+from .exceptions import StateMachineError
+from .history import TransitionCause, TransitionRecord
+from .states_enum import StatesEnum
+
+EXC_WRONG_SNAPSHOT: Final[str] = "Wrong snapshot data: {reason}"
+EXC_WRONG_STATES: Final[str] = (
+    "Snapshot was made for another set of states"
+)
+EXC_WRONG_FILE: Final[str] = "Wrong snapshots file: {path}"
+
+SNAPSHOT_MAGIC: Final[bytes] = b"ASMS"
+FILE_MAGIC: Final[bytes] = b"ASMF"
+SNAPSHOT_VERSION: Final[int] = 1
+NO_STATE: Final[int] = 0xFFFF
+
+# magic, версия, отпечаток состояний, активное состояние, флаги,
+# длина контекста, количество переходов
+_HEADER: Final[struct.Struct] = struct.Struct("<4sBIHBII")
+# время, из состояния, в состояние, причина
+_RECORD: Final[struct.Struct] = struct.Struct("<dHHB")
+# magic, количество снимков
+_FILE_HEADER: Final[struct.Struct] = struct.Struct("<4sI")
+# длина ключа, длина снимка
+_FILE_ENTRY: Final[struct.Struct] = struct.Struct("<HI")
+# количество снимков параллельных областей
+_REGIONS: Final[struct.Struct] = struct.Struct("<I")
+
+_FLAG_CONTEXT: Final[int] = 1
+_FLAG_HISTORY: Final[int] = 2
+_FLAG_REGIONS: Final[int] = 4
+
+
+class StateTable(object):
+    """Нумерация состояний для двоичного снимка.
+
+    Состояния нумеруются в порядке имен, поэтому снимок не зависит от
+    порядка объявления. Отпечаток набора имен проверяется при
+    восстановлении.
+    """
+
+    __slots__ = ("__states", "__index", "__fingerprint")
+
+    def __init__(self, states: Iterable[StatesEnum]) -> None:
+        """Нумерация состояний для двоичного снимка."""
+        self.__states: tuple[StatesEnum, ...]
+        self.__index: dict[StatesEnum, int]
+        self.__fingerprint: int
+
+        self.__states = tuple(sorted(states, key=lambda state: state.value))
+        self.__index = {
+            state: index for index, state in enumerate(self.__states)
+        }
+        self.__fingerprint = zlib.crc32(
+            "\0".join(state.value for state in self.__states).encode(),
+        )
+
+    @property
+    def states(self) -> tuple[StatesEnum, ...]:
+        """Состояния в порядке номеров."""
+        return self.__states
+
+    @property
+    def fingerprint(self) -> int:
+        """Отпечаток набора имен состояний."""
+        return self.__fingerprint
+
+    def index(self, state: StatesEnum | None) -> int:
+        """Номер состояния."""
+        if state is None:
+            return NO_STATE
+        return self.__index[state]
+
+    def state(self, index: int) -> StatesEnum | None:
+        """Состояние по номеру."""
+        if index == NO_STATE:
+            return None
+        try:
+            return self.__states[index]
+        except IndexError:
+            raise StateMachineError(
+                EXC_WRONG_SNAPSHOT.format(reason=f"state index {index}"),
+            ) from None
+
+
+class MachineSnapshot(NamedTuple):
+    """Раскодированный снимок машины."""
+
+    active_state: StatesEnum
+    has_context: bool
+    context: Any
+    history: tuple[TransitionRecord, ...] | None
+    regions: dict[str, bytes] | None
+
+
+def encode_snapshot(
+    table: StateTable,
+    active_state: StatesEnum,
+    context_args: tuple[Any, ...],
+    history: Iterable[TransitionRecord] | None,
+    regions: Mapping[str, bytes] | None = None,
+) -> bytes:
+    """Двоичный снимок машины.
+
+    Parameters
+    ----------
+    table: StateTable
+        нумерация состояний шаблона
+    active_state: StatesEnum
+        активное состояние
+    context_args: tuple[Any, ...]
+        (context,) - сохранить контекст через pickle, () - не сохранять
+    history: Iterable[TransitionRecord] | None
+        переходы для сохранения, None - не сохранять. Время переходов по
+        часам цикла событий сохраняется как время по часам системы.
+    regions: Mapping[str, bytes] | None
+        снимки параллельных областей по именам, None - машина без областей
+
+    Returns
+    -------
+    Данные снимка
+    """
+    flags = 0
+    context = b""
+    if context_args:
+        flags |= _FLAG_CONTEXT
+        context = pickle.dumps(context_args[0], pickle.HIGHEST_PROTOCOL)
+    records: list[bytes] = []
+    if history is not None:
+        flags |= _FLAG_HISTORY
+        offset = _clock_offset()
+        records = [
+            _RECORD.pack(
+                record.time + offset,
+                table.index(record.active_state),
+                table.index(record.new_state),
+                record.cause,
+            )
+            for record in history
+        ]
+    regions_chunks: list[bytes] = []
+    if regions is not None:
+        flags |= _FLAG_REGIONS
+        regions_chunks = [_REGIONS.pack(len(regions))]
+        regions_chunks.extend(_encode_entries(regions))
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        table.fingerprint,
+        table.index(active_state),
+        flags,
+        len(context),
+        len(records),
+    )
+    return b"".join((header, context, *records, *regions_chunks))
+
+
+def decode_snapshot(table: StateTable, data: bytes) -> MachineSnapshot:
+    """Раскодировать двоичный снимок.
+
+    Контекст восстанавливается через pickle, поэтому снимки можно
+    загружать только из доверенных источников.
+
+    Raises
+    ------
+    StateMachineError
+        данные повреждены, в том числе контекст не восстанавливается
+        pickle, или снимок сделан для других состояний
+    """
+    view = memoryview(data)
+    header = _decode_header(table, view)
+    position = _HEADER.size
+    context: Any = None
+    if header.flags & _FLAG_CONTEXT:
+        context = _decode_context(
+            view[position:position + header.context_size],
+        )
+    position += header.context_size
+    history: tuple[TransitionRecord, ...] | None = None
+    if header.flags & _FLAG_HISTORY:
+        history = _decode_history(
+            table,
+            view[position:position + header.records_size],
+        )
+    position += header.records_size
+    regions: dict[str, bytes] | None = None
+    if header.flags & _FLAG_REGIONS:
+        regions = _decode_regions(view[position:])
+    return MachineSnapshot(
+        active_state=header.active_state,
+        has_context=bool(header.flags & _FLAG_CONTEXT),
+        context=context,
+        history=history,
+        regions=regions,
+    )
+
+
+class _Header(NamedTuple):
+    """Проверенный заголовок снимка."""
+
+    active_state: StatesEnum
+    flags: int
+    context_size: int
+    records_size: int
+
+
+def _decode_header(table: StateTable, view: memoryview) -> _Header:
+    try:
+        magic, version, fingerprint, active, flags, context_size, count = (
+            _HEADER.unpack_from(view)
+        )
+    except struct.error:
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason="short header"),
+        ) from None
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason="magic or version"),
+        )
+    if fingerprint != table.fingerprint:
+        raise StateMachineError(EXC_WRONG_STATES)
+    size = _HEADER.size + context_size + count * _RECORD.size
+    # снимки областей следуют за историей
+    too_short = len(view) < size
+    if too_short or (len(view) != size and not flags & _FLAG_REGIONS):
+        raise StateMachineError(EXC_WRONG_SNAPSHOT.format(reason="size"))
+    active_state = table.state(active)
+    if active_state is None:
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason="no active state"),
+        )
+    return _Header(active_state, flags, context_size, count * _RECORD.size)
+
+
+def _decode_context(view: memoryview) -> Any:
+    try:
+        return pickle.loads(view)  # noqa: S301
+    except Exception as exc:
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason=f"context: {exc!r}"),
+        ) from exc
+
+
+def _decode_regions(view: memoryview) -> dict[str, bytes]:
+    try:
+        (count,) = _REGIONS.unpack_from(view)
+        regions, position = _decode_entries(view, _REGIONS.size, count)
+    except (struct.error, ValueError):
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason="regions"),
+        ) from None
+    if position != len(view):
+        raise StateMachineError(EXC_WRONG_SNAPSHOT.format(reason="size"))
+    return regions
+
+
+def _decode_history(
+    table: StateTable,
+    view: memoryview,
+) -> tuple[TransitionRecord, ...]:
+    offset = _clock_offset()
+    return tuple(
+        _decode_record(table, fields, offset)
+        for fields in _RECORD.iter_unpack(view)
+    )
+
+
+def save_snapshots(path: str, snapshots: Mapping[str, bytes]) -> None:
+    """Сохранить снимки многих машин в один файл.
+
+    Файл записывается целиком во временный файл, сбрасывается на диск и
+    затем заменяет предыдущий; после замены на диск сбрасывается каталог.
+    При сбое, в том числе питания, остается прежняя или новая версия.
+
+    Parameters
+    ----------
+    path: str
+        путь к файлу
+    snapshots: Mapping[str, bytes]
+        снимки StateMachine.snapshot по ключам машин
+    """
+    chunks = [
+        _FILE_HEADER.pack(FILE_MAGIC, len(snapshots)),
+        *_encode_entries(snapshots),
+    ]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as snapshots_file:
+        snapshots_file.write(b"".join(chunks))
+        snapshots_file.flush()
+        os.fsync(snapshots_file.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def load_snapshots(path: str) -> dict[str, bytes]:
+    """Загрузить снимки, сохраненные save_snapshots.
+
+    Файл отображается в память и разбирается без промежуточного чтения.
+
+    Raises
+    ------
+    StateMachineError
+        файл пустой или поврежден
+    """
+    with open(path, "rb") as snapshots_file:
+        try:
+            with mmap.mmap(
+                snapshots_file.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+            ) as mapped:
+                return _parse_file(mapped)
+        except (struct.error, ValueError):
+            raise StateMachineError(
+                EXC_WRONG_FILE.format(path=path),
+            ) from None
+
+
+def _clock_offset() -> float:
+    """Разница часов системы и часов цикла событий.
+
+    История ведется по loop.time(), у VirtualTimeLoop - виртуальному. Вне
+    цикла используется time.monotonic, как у стандартного цикла.
+    """
+    try:
+        loop_time = asyncio.get_running_loop().time()
+    except RuntimeError:
+        loop_time = time.monotonic()
+    return time.time() - loop_time
+
+
+def _fsync_directory(directory: str) -> None:
+    """Сбросить на диск запись каталога после замены файла.
+
+    В Windows каталог не открывается как файл, замена там не сбрасывается.
+    """
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _parse_file(mapped: mmap.mmap) -> dict[str, bytes]:
+    magic, count = _FILE_HEADER.unpack_from(mapped)
+    if magic != FILE_MAGIC:
+        raise ValueError(magic)
+    snapshots, _ = _decode_entries(mapped, _FILE_HEADER.size, count)
+    return snapshots
+
+
+def _encode_entries(entries: Mapping[str, bytes]) -> list[bytes]:
+    """Снимки по ключам: длины ключа и данных, ключ, данные."""
+    chunks: list[bytes] = []
+    for key, data in entries.items():
+        encoded_key = key.encode()
+        chunks.append(_FILE_ENTRY.pack(len(encoded_key), len(data)))
+        chunks.append(encoded_key)
+        chunks.append(data)
+    return chunks
+
+
+def _decode_entries(
+    buffer: mmap.mmap | memoryview,
+    position: int,
+    count: int,
+) -> tuple[dict[str, bytes], int]:
+    """Снимки по ключам и позиция после них.
+
+    Raises
+    ------
+    ValueError
+        данные короче записанных длин
+    """
+    entries: dict[str, bytes] = {}
+    for _ in range(count):
+        key_size, data_size = _FILE_ENTRY.unpack_from(buffer, position)
+        position += _FILE_ENTRY.size
+        key = bytes(buffer[position:position + key_size]).decode()
+        position += key_size
+        if position + data_size > len(buffer):
+            raise ValueError(position)
+        entries[key] = bytes(buffer[position:position + data_size])
+        position += data_size
+    return entries, position
+
+
+def _decode_record(
+    table: StateTable,
+    fields: tuple[float, int, int, int],
+    offset: float,
+) -> TransitionRecord:
+    wall_time, active, new, cause = fields
+    new_state = table.state(new)
+    if new_state is None:
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason="no new state"),
+        )
+    try:
+        transition_cause = TransitionCause(cause)
+    except ValueError:
+        raise StateMachineError(
+            EXC_WRONG_SNAPSHOT.format(reason=f"transition cause {cause}"),
+        ) from None
+    return TransitionRecord(
+        time=wall_time - offset,
+        active_state=table.state(active),
+        new_state=new_state,
+        cause=transition_cause,
+    )
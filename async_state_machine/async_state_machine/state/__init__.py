@@ -1,9 +1,12 @@
 """Базовый класс для состояния."""
 
+from .offload import OffloadedCallback, offload
 from .state import State
 from .state_runner import StateRunner
 
 __all__ = [
+    "OffloadedCallback",
     "State",
     "StateRunner",
+    "offload",
 ]
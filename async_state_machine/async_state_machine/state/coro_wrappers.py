@@ -1,22 +1,214 @@
 """Обертки для запуска корутин."""
 
 import asyncio
+from typing import Any, Final, Literal
 
 from ..const import INFINITE_CORO_SLEEP
-from ..typings import TCallback
+from ..states_enum import StatesEnum, as_state
+from ..typings import TCallback, TCoroWrapper, TTrigger
+
+EXC_WRONG_TRIGGER: Final[str] = "Unsupported trigger type: {trigger}"
+EXC_WRONG_PERIOD: Final[str] = "Period must be positive: {period}"
+EXC_WRONG_OVERRUN: Final[str] = "Unsupported overrun policy: {overrun}"
+
+# при опоздании пропустить пропущенные вызовы / выполнить их подряд
+OVERRUN_SKIP: Final = "skip"
+OVERRUN_CATCH_UP: Final = "catch_up"
+TOverrun = Literal["skip", "catch_up"]
 
 
 class CoroWrappers(object):
     """Обертки для запуска корутин."""
 
     @staticmethod
-    async def infinite(coro_func: TCallback) -> None:
-        """Корутина вызывается в цикле бесконечно."""
+    async def infinite(
+        coro_func: TCallback,
+        args: tuple[Any, ...] = (),
+    ) -> StatesEnum | None:
+        """Корутина вызывается в цикле, пока не вернет новое состояние."""
         while True:  # noqa: WPS457
-            await coro_func()
+            new_state = as_state(await coro_func(*args))
+            if new_state is not None:
+                return new_state
             await asyncio.sleep(INFINITE_CORO_SLEEP)
 
     @staticmethod
-    async def single(coro_func: TCallback) -> None:
+    async def single(
+        coro_func: TCallback,
+        args: tuple[Any, ...] = (),
+    ) -> StatesEnum | None:
         """Корутина вызывается один раз."""
-        await coro_func()
+        return as_state(await coro_func(*args))
+
+    @staticmethod
+    def periodic(
+        period: float,
+        overrun: TOverrun = OVERRUN_SKIP,
+    ) -> TCoroWrapper:
+        """Корутина вызывается с фиксированной частотой.
+
+        Моменты вызовов отсчитываются от времени входа в стадию по
+        монотонным часам цикла событий: n-й вызов - в start + n * period,
+        поэтому время выполнения функции не накапливает смещение. Первый
+        вызов - сразу при входе.
+
+        Parameters
+        ----------
+        period: float
+            период вызова, с
+        overrun: TOverrun
+            что делать, если функция выполнялась дольше периода:
+            - "skip" - пропустить прошедшие моменты, следующий вызов в
+            ближайший момент сетки;
+            - "catch_up" - выполнить пропущенные вызовы подряд.
+
+        Returns
+        -------
+        Обертка для передачи в StageCallbacks
+
+        Raises
+        ------
+        ValueError
+            период не положительный или неизвестная политика
+        """
+        return _PeriodicWrapper(period, overrun, immediate=True)
+
+    @staticmethod
+    def triggered(trigger: TTrigger) -> TCoroWrapper:
+        """Корутина вызывается при срабатывании триггера.
+
+        Между вызовами обертка не опрашивает состояние, а ожидает триггер:
+        - asyncio.Event - вызов после установки события, событие
+        сбрасывается перед вызовом;
+        - asyncio.Queue - вызов на каждый элемент очереди, элемент
+        используется только как сигнал пробуждения. Каждая функция стадии
+        ожидает очередь сама, поэтому при нескольких функциях элементы
+        распределяются между ними: один элемент - один вызов одной
+        функции. Чтобы будить все функции, используется asyncio.Event;
+        - asyncio.Future - однократный вызов после завершения future;
+        - число - вызов с заданным периодом, в секундах, первый вызов
+        через период. Пропущенные при опоздании вызовы не выполняются.
+
+        Parameters
+        ----------
+        trigger: TTrigger
+            источник пробуждения
+
+        Returns
+        -------
+        Обертка для передачи в StageCallbacks
+
+        Raises
+        ------
+        TypeError
+            неподдерживаемый тип триггера
+        """
+        if isinstance(trigger, asyncio.Event):
+            return _EventWrapper(trigger)
+        if isinstance(trigger, asyncio.Queue):
+            return _QueueWrapper(trigger)
+        if isinstance(trigger, asyncio.Future):
+            return _FutureWrapper(trigger)
+        # остается число; триггер из фабрики контекста типами не проверен
+        try:
+            return _PeriodicWrapper(trigger, OVERRUN_SKIP, immediate=False)
+        except TypeError:
+            raise TypeError(
+                EXC_WRONG_TRIGGER.format(trigger=trigger),
+            ) from None
+
+
+class _EventWrapper(object):
+    __slots__ = ("__event",)
+
+    def __init__(self, event: asyncio.Event) -> None:
+        self.__event = event
+
+    async def __call__(
+        self,
+        coro_func: TCallback,
+        args: tuple[Any, ...] = (),
+    ) -> StatesEnum | None:
+        while True:  # noqa: WPS457
+            await self.__event.wait()
+            self.__event.clear()
+            new_state = as_state(await coro_func(*args))
+            if new_state is not None:
+                return new_state
+
+
+class _QueueWrapper(object):
+    __slots__ = ("__queue",)
+
+    def __init__(self, queue: "asyncio.Queue[Any]") -> None:
+        self.__queue = queue
+
+    async def __call__(
+        self,
+        coro_func: TCallback,
+        args: tuple[Any, ...] = (),
+    ) -> StatesEnum | None:
+        while True:  # noqa: WPS457
+            await self.__queue.get()
+            self.__queue.task_done()
+            new_state = as_state(await coro_func(*args))
+            if new_state is not None:
+                return new_state
+
+
+class _FutureWrapper(object):
+    __slots__ = ("__future",)
+
+    def __init__(self, future: "asyncio.Future[Any]") -> None:
+        self.__future = future
+
+    async def __call__(
+        self,
+        coro_func: TCallback,
+        args: tuple[Any, ...] = (),
+    ) -> StatesEnum | None:
+        await asyncio.wait((self.__future,))
+        new_state = as_state(await coro_func(*args))
+        if new_state is not None:
+            return new_state
+        # дальнейших срабатываний не будет - ждем выхода из состояния
+        return await asyncio.get_running_loop().create_future()
+
+
+class _PeriodicWrapper(object):
+    __slots__ = ("__period", "__skip", "__immediate")
+
+    def __init__(
+        self,
+        period: float,
+        overrun: TOverrun,
+        immediate: bool,
+    ) -> None:
+        if period <= 0:
+            raise ValueError(EXC_WRONG_PERIOD.format(period=period))
+        if overrun not in {OVERRUN_SKIP, OVERRUN_CATCH_UP}:
+            raise ValueError(EXC_WRONG_OVERRUN.format(overrun=overrun))
+        self.__period = period
+        self.__skip = overrun == OVERRUN_SKIP
+        self.__immediate = immediate
+
+    async def __call__(
+        self,
+        coro_func: TCallback,
+        args: tuple[Any, ...] = (),
+    ) -> StatesEnum | None:
+        loop = asyncio.get_running_loop()
+        period = self.__period
+        deadline = loop.time()
+        if not self.__immediate:
+            deadline += period
+        while True:  # noqa: WPS457
+            # при отставании sleep(0) все равно передает управление циклу
+            await asyncio.sleep(max(deadline - loop.time(), 0))
+            new_state = as_state(await coro_func(*args))
+            if new_state is not None:
+                return new_state
+            deadline += period
+            lag = loop.time() - deadline
+            if self.__skip and lag > 0:
+                deadline += (lag // period + 1) * period
@@ -0,0 +1,86 @@
+"""Выполнение блокирующих функций вне цикла событий."""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Executor
+from typing import Any, Final
+
+from ..states_enum import StatesEnum
+
+EXC_NOT_CALLABLE: Final[str] = "Offloaded callback is not callable: {func}"
+
+
+class OffloadedCallback(object):
+    """Синхронная функция, выполняемая в пуле потоков или процессов.
+
+    Для StageCallbacks объект - обычная асинхронная функция, поэтому
+    таймауты и переходы работают так же, как для корутин.
+    """
+
+    __slots__ = ("__func", "__executor")
+
+    def __init__(
+        self,
+        func: Callable[..., StatesEnum | None],
+        executor: Executor | None = None,
+    ) -> None:
+        """Синхронная функция, выполняемая в пуле потоков или процессов.
+
+        Parameters
+        ----------
+        func: Callable[..., StatesEnum | None]
+            синхронная функция. Принимает контекст машины первым
+            аргументом, если у состояния задан config_pass_context.
+        executor: Executor | None
+            пул для выполнения, None - пул потоков цикла событий по-умолчанию
+
+        Raises
+        ------
+        TypeError
+            func не является вызываемым объектом
+        """
+        self.__func: Callable[..., StatesEnum | None]
+        self.__executor: Executor | None
+
+        if not callable(func):
+            raise TypeError(EXC_NOT_CALLABLE.format(func=func))
+        self.__func = func
+        self.__executor = executor
+
+    @property
+    def func(self) -> Callable[..., StatesEnum | None]:
+        """Исходная функция."""
+        return self.__func
+
+    @property
+    def executor(self) -> Executor | None:
+        """Пул для выполнения."""
+        return self.__executor
+
+    async def __call__(self, *args: Any) -> StatesEnum | None:
+        """Выполнение функции в пуле.
+
+        При отмене, например по таймауту стадии, результат отбрасывается,
+        но уже запущенная функция выполняется до конца.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor,
+            self.__func,
+            *args,
+        )
+
+
+def offload(
+    func: Callable[..., StatesEnum | None],
+    executor: Executor | None = None,
+) -> OffloadedCallback:
+    """Пометить синхронную функцию для выполнения вне цикла событий.
+
+    Функция передается в State наравне с корутинами:
+
+    State(name=..., on_run=[offload(decode, process_pool)])
+
+    Для ProcessPoolExecutor функция, ее результат и контекст машины должны
+    сериализоваться pickle; изменения контекста в процессе не возвращаются.
+    """
+    return OffloadedCallback(func, executor)
@@ -1,14 +1,21 @@
 """Запуск функций для этапа состояния."""
 
 import asyncio
+import logging
+import time
 from collections.abc import Awaitable, Callable
 from typing import Any, Final, Literal, Self
 
 from loguru import logger
 
 from ..exceptions import NewStateData, NewStateException, StateMachineError
-from ..states_enum import StatesEnum
-from ..typings import TCallback, TCallbackCollection
+from ..history import TransitionCause
+from ..metrics import StageMetrics
+from ..shared import cancel_and_wait
+from ..states_enum import StatesEnum, as_state
+from ..timer_wheel import TimerWheel, WheelTimeout
+from ..trace import TraceRecorder
+from ..typings import TCallback, TCallbackCollection, TCoroWrapper
 
 EXC_TIMEOUT: Final[str] = "Timeout occur {name}|{stage}"
 EXC_TIMEOUT_WITHOUT_TARGET: Final[
@@ -19,6 +26,19 @@ EXC_TIMEOUT_WITHOUT_TARGET: Final[
 class StageCallbacks(object):
     """Запуск функций для этапа состояния."""
 
+    __slots__ = (
+        "__callbacks",
+        "__pass_context",
+        "__coro_wrapper",
+        "__wrapper_factory",
+        "__name",
+        "__timeout",
+        "__timeout_to_state",
+        "__stage",
+        "__trace",
+        "__executor",
+    )
+
     def __init__(
         self,
         callbacks: TCallbackCollection | None,
@@ -26,77 +46,253 @@ class StageCallbacks(object):
         timeout_to_state: StatesEnum | None,
         name: StatesEnum,
         stage: Literal["on_enter", "on_run", "on_exit"],
-        coro_wrapper: Callable[[TCallback], Awaitable[None]],
-        logging_level: int = 0,  # TODO - remove
+        coro_wrapper: TCoroWrapper,
+        logging_level: int = logging.NOTSET,
+        wrapper_factory: Callable[[Any], TCoroWrapper] | None = None,
+        pass_context: bool = False,
     ) -> None:
-        """Запуск функций для этапа состояния."""
-        self.__callbacks: TCallbackCollection | None
-        self.__coro_wrapper: Any
+        """Запуск функций для этапа состояния.
+
+        Способ запуска выбирается один раз, по количеству функций и наличию
+        таймаута: стадии без функций и с одной функцией выполняются без
+        создания задач. Если задан pass_context, все функции стадии получают
+        контекст машины первым аргументом. Если задана wrapper_factory,
+        обертка создается по контексту машины при каждом запуске стадии
+        вместо общей coro_wrapper.
+        """
+        self.__callbacks: tuple[TCallback, ...]
+        self.__pass_context: bool
+        self.__coro_wrapper: TCoroWrapper
+        self.__wrapper_factory: Callable[[Any], TCoroWrapper] | None
         self.__name: StatesEnum
         self.__timeout: float | None
         self.__timeout_to_state: StatesEnum | None
         self.__stage: str
+        self.__trace: bool
+        self.__executor: Callable[
+            [TimerWheel | None, tuple[Any, ...]],
+            Awaitable[NewStateData | None],
+        ]
 
-        self.__callbacks = callbacks
+        self.__callbacks = tuple(callbacks or ())
+        self.__pass_context = pass_context
         self.__coro_wrapper = coro_wrapper
+        self.__wrapper_factory = wrapper_factory
         self.__name = name
         self.__stage = stage
         self.__timeout = timeout
         self.__timeout_to_state = timeout_to_state
+        self.__trace = _trace_enabled(logging_level)
+        self.__executor = self.__select_executor()
 
-    async def run(self) -> None:
-        """Запуск."""
-        logger.debug(
-            "{name}|{stage}|start".format(
+    @property
+    def timeout_to_state(self) -> StatesEnum | None:
+        """Состояние для перехода по таймауту."""
+        return self.__timeout_to_state
+
+    async def execute(
+        self,
+        metrics: StageMetrics | None = None,
+        timer_wheel: TimerWheel | None = None,
+        context_args: tuple[Any, ...] = (),
+        recorder: TraceRecorder | None = None,
+    ) -> NewStateData | None:
+        """Запуск без генерации исключения при переходе.
+
+        Parameters
+        ----------
+        metrics: StageMetrics | None
+            метрики для записи длительности и таймаутов
+        timer_wheel: TimerWheel | None
+            общее колесо таймеров для отсчета таймаута. По-умолчанию
+            используется asyncio.timeout.
+        context_args: tuple[Any, ...]
+            контекст машины в виде (context,), передается функциям, если
+            задан pass_context
+        recorder: TraceRecorder | None
+            запись начала, конца и таймаута стадии в трассировку
+
+        Returns
+        -------
+        Данные перехода в новое состояние, или None, если стадия завершилась
+        без перехода
+        """
+        if self.__trace:
+            logger.debug(
+                "{name}|{stage}|start",
                 name=self.__name,
                 stage=self.__stage,
-            ),
-        )
+            )
+        if recorder is not None:
+            recorder.stage_start(self.__name, self.__stage)
+        start = time.perf_counter()
         new_state_data: NewStateData | None = None
         try:
-            await self.__run()
-        except* asyncio.TimeoutError:
-            self.__except_timeout()
-        except* NewStateException as exc:
+            new_state_data = await self.__executor(
+                timer_wheel,
+                context_args,
+            )
+        except TimeoutError:
+            if metrics is not None:
+                metrics.timeouts += 1
+            if recorder is not None:
+                recorder.timeout(self.__name, self.__stage)
+            new_state_data = self.__except_timeout()
+        except NewStateException as exc:
             new_state_data = self.__except_new_state(exc)
-        logger.debug(
-            "{name}|{stage}|end".format(
+        finally:
+            if recorder is not None:
+                recorder.stage_end(self.__name, self.__stage)
+        if metrics is not None:
+            metrics.latency.observe(time.perf_counter() - start)
+        if self.__trace:
+            logger.debug(
+                "{name}|{stage}|end",
                 name=self.__name,
                 stage=self.__stage,
-            ),
-        )
+            )
+        return new_state_data
+
+    async def run(self) -> None:
+        """Запуск."""
+        new_state_data = await self.execute()
         if new_state_data is not None:
             raise NewStateException.reraise(new_state_data, self.__name)
 
     def config_logging(self, logging_level: int) -> Self:
         """Конфигурировать уровень логгирования.
 
-        TODO - remove
+        Отладочные сообщения стадии формируются, только если logging_level
+        задан и не выше logging.DEBUG. При logging.NOTSET или более высоком
+        уровне стоимость - одна проверка флага.
         """
+        self.__trace = _trace_enabled(logging_level)
         return self
 
-    async def __run(self) -> None:
-        """Запуск."""
-        if self.__callbacks is None:
-            return await asyncio.sleep(0)
-        await asyncio.gather(*self.__create_tasks(self.__callbacks))
+    def __select_executor(
+        self,
+    ) -> Callable[
+        [TimerWheel | None, tuple[Any, ...]],
+        Awaitable[NewStateData | None],
+    ]:
+        if not self.__callbacks:
+            return self.__run_empty
+        if len(self.__callbacks) > 1:
+            return self.__run_many
+        if self.__timeout is None:
+            return self.__run_single
+        return self.__run_single_deadline
+
+    async def __run_empty(
+        self,
+        timer_wheel: TimerWheel | None,
+        context_args: tuple[Any, ...],
+    ) -> NewStateData | None:
+        """Стадия без функций."""
+        return None
+
+    async def __run_single(
+        self,
+        timer_wheel: TimerWheel | None,
+        context_args: tuple[Any, ...],
+    ) -> NewStateData | None:
+        """Одна функция без таймаута, выполняется в текущей задаче."""
+        new_state = as_state(
+            await self.__wrapper(context_args)(
+                self.__callbacks[0],
+                context_args if self.__pass_context else (),
+            ),
+        )
+        if new_state is None:
+            return None
+        return NewStateData(active_state=self.__name, new_state=new_state)
+
+    async def __run_single_deadline(
+        self,
+        timer_wheel: TimerWheel | None,
+        context_args: tuple[Any, ...],
+    ) -> NewStateData | None:
+        """Одна функция с таймаутом, выполняется в текущей задаче."""
+        async with self.__deadline(timer_wheel):
+            return await self.__run_single(timer_wheel, context_args)
+
+    async def __run_many(
+        self,
+        timer_wheel: TimerWheel | None,
+        context_args: tuple[Any, ...],
+    ) -> NewStateData | None:
+        """Несколько функций, каждая в своей задаче.
+
+        Первый переход, исключение, таймаут или отмена стадии отменяют
+        остальные задачи, и стадия завершается только после их
+        завершения - работа не продолжается в следующем состоянии.
+        """
+        tasks = self.__create_tasks(context_args)
+        pending = set(tasks)
+        try:
+            if self.__timeout is None:
+                return await self.__wait_tasks(tasks, pending)
+            async with self.__deadline(timer_wheel):
+                return await self.__wait_tasks(tasks, pending)
+        finally:
+            if pending:
+                await cancel_and_wait(pending)
+
+    async def __wait_tasks(
+        self,
+        tasks: tuple["asyncio.Task[StatesEnum | None]", ...],
+        pending: set["asyncio.Task[StatesEnum | None]"],
+    ) -> NewStateData | None:
+        """Ожидание первого перехода или завершения всех задач.
+
+        Оставшиеся задачи отменяются вызывающим кодом, поэтому множество
+        pending изменяется на месте.
+        """
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            pending.difference_update(done)
+            new_state = _first_new_state(tasks, done)
+            if new_state is not None:
+                return NewStateData(
+                    active_state=self.__name,
+                    new_state=new_state,
+                )
+        return None
+
+    def __deadline(
+        self,
+        timer_wheel: TimerWheel | None,
+    ) -> WheelTimeout | asyncio.Timeout:
+        """Один срок выполнения на всю стадию."""
+        if timer_wheel is None:
+            return asyncio.timeout(self.__timeout)
+        return timer_wheel.timeout(self.__timeout)
 
     def __create_tasks(
         self,
-        callbacks: TCallbackCollection,
-    ) -> tuple[Awaitable[None], ...]:
+        context_args: tuple[Any, ...],
+    ) -> tuple["asyncio.Task[StatesEnum | None]", ...]:
         """Создание коллекцию задач."""
+        coro_wrapper = self.__wrapper(context_args)
+        args = context_args if self.__pass_context else ()
         return tuple(
-            asyncio.wait_for(
-                fut=self.__coro_wrapper(task),
-                timeout=self.__timeout,
-            )
-            for task in callbacks
+            asyncio.ensure_future(coro_wrapper(task, args))
+            for task in self.__callbacks
         )
 
-    def __except_timeout(self) -> None:
+    def __wrapper(self, context_args: tuple[Any, ...]) -> TCoroWrapper:
+        """Обертка для запуска функций в экземпляре машины."""
+        if self.__wrapper_factory is None:
+            return self.__coro_wrapper
+        return self.__wrapper_factory(context_args[0] if context_args else None)
+
+    def __except_timeout(self) -> NewStateData:
         """Обработка превышения времени выполнения."""
-        logger.debug(EXC_TIMEOUT.format(name=self.__name, stage=self.__stage))
+        if self.__trace:
+            logger.debug(EXC_TIMEOUT, name=self.__name, stage=self.__stage)
         if self.__timeout_to_state is None:
             msg = EXC_TIMEOUT_WITHOUT_TARGET.format(
                 base_msg=EXC_TIMEOUT.format(
@@ -106,24 +302,49 @@ class StageCallbacks(object):
             )
             logger.error(msg)
             raise StateMachineError(msg)
-        raise NewStateException(
+        return NewStateData(
+            active_state=self.__name,
             new_state=self.__timeout_to_state,
+            cause=TransitionCause.timeout,
         )
 
-    def __except_new_state(
-        self,
-        exc: BaseExceptionGroup[NewStateException],
-    ) -> NewStateData:
+    def __except_new_state(self, exc: NewStateException) -> NewStateData:
         """Обработка перехода в новое состояние."""
-        new_state_data = exc.exceptions[0]
-        if isinstance(new_state_data, NewStateException):
-            exc_data = new_state_data.exception_data
+        exc_data = exc.exception_data
+        if self.__trace:
             logger.debug(
-                "State {name}, stage {stage}, new state: {new_name}".format(
-                    name=self.__name,
-                    stage=self.__stage,
-                    new_name=exc_data.new_state,
-                ),
+                "State {name}, stage {stage}, new state: {new_name}",
+                name=self.__name,
+                stage=self.__stage,
+                new_name=exc_data.new_state,
             )
-            return exc_data
-        raise StateMachineError
+        return exc_data
+
+
+def _trace_enabled(logging_level: int) -> bool:
+    """Нужно ли формировать отладочные сообщения.
+
+    logging.NOTSET - уровень не задан, сообщения не формируются.
+    """
+    return logging.NOTSET < logging_level <= logging.DEBUG
+
+
+def _first_new_state(
+    tasks: tuple["asyncio.Task[StatesEnum | None]", ...],
+    done: set["asyncio.Task[StatesEnum | None]"],
+) -> StatesEnum | None:
+    """Результат первой по порядку объявления завершившейся задачи.
+
+    Исключение задачи генерируется повторно. Исключения остальных
+    завершившихся задач считаются обработанными.
+    """
+    outcome: StatesEnum | BaseException | None = None
+    for task in tasks:
+        if task not in done or task.cancelled():
+            continue
+        exc = task.exception()
+        if outcome is None:
+            outcome = exc if exc is not None else as_state(task.result())
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
@@ -1,11 +1,13 @@
 """Строитель для создания State."""
 
+import logging
 from dataclasses import dataclass
-from typing import Final, Self
+from typing import Any, Callable, Final, Self
 
 from ..exceptions import StateMachineError
 from ..states_enum import StatesEnum
-from .coro_wrappers import CoroWrappers
+from ..typings import TCoroWrapper, TEvent, TTrigger, TTriggerFactory
+from .coro_wrappers import OVERRUN_SKIP, CoroWrappers, TOverrun
 from .stage_callbacks import StageCallbacks, TCallbackCollection
 from .state_runner import StateRunner
 
@@ -13,15 +15,35 @@ EXC_NO_ON_RUN: Final[str] = "No callbacks on on_run input, state: {name}"
 DEFAULT_TIMEOUT: Final[float] = 2.0
 
 
-@dataclass
+@dataclass(slots=True)
 class _StageData(object):
     callbacks: TCallbackCollection | None
     timeout: float | None
     timeout_to_state: StatesEnum | None
+    coro_wrapper: TCoroWrapper
+    # обертка экземпляра машины, создается по контексту при входе в стадию
+    wrapper_factory: Callable[[Any], TCoroWrapper] | None = None
 
 
 class State(object):
-    """Строитель для создания State."""
+    """Строитель для создания State.
+
+    Созданный StateRunner сохраняется и используется всеми машинами с этим
+    объектом State, пока определение не изменено.
+    """
+
+    __slots__ = (
+        "__name",
+        "__on_enter",
+        "__on_run",
+        "__on_exit",
+        "__logging_level",
+        "__pass_context",
+        "__events",
+        "__targets",
+        "__parent",
+        "__runner",
+    )
 
     def __init__(  # noqa: WPS211
         self,
@@ -43,6 +65,12 @@ class State(object):
         on_exit: TCallbackCollection
             Функции для выполения в стадии on_exit
 
+        Для перехода в новое состояние функция возвращает его из перечисления,
+        или генерирует NewStateException.
+
+        Блокирующие синхронные функции передаются через offload и
+        выполняются в пуле потоков или процессов.
+
         Raises
         ------
         StateMachineError
@@ -53,24 +81,38 @@ class State(object):
         self.__on_run: _StageData
         self.__on_exit: _StageData
         self.__logging_level: int
+        self.__pass_context: bool
+        self.__events: dict[TEvent, StatesEnum]
+        self.__targets: frozenset[StatesEnum] | None
+        self.__parent: State | None
+        self.__runner: StateRunner | None
 
         if not on_run:
             raise StateMachineError(EXC_NO_ON_RUN.format(name=name))
         self.__name = name
+        self.__logging_level = logging.NOTSET
+        self.__pass_context = False
+        self.__events = {}
+        self.__targets = None
+        self.__parent = None
+        self.__runner = None
         self.__on_enter = _StageData(
             callbacks=on_enter,
             timeout=DEFAULT_TIMEOUT,
             timeout_to_state=None,
+            coro_wrapper=CoroWrappers.single,
         )
         self.__on_run = _StageData(
             callbacks=on_run,
             timeout=None,
             timeout_to_state=None,
+            coro_wrapper=CoroWrappers.infinite,
         )
         self.__on_exit = _StageData(
             callbacks=on_exit,
             timeout=DEFAULT_TIMEOUT,
             timeout_to_state=None,
+            coro_wrapper=CoroWrappers.single,
         )
 
     def config_timeout_on_enter(
@@ -95,6 +137,7 @@ class State(object):
         """
         self.__on_enter.timeout = timeout
         self.__on_enter.timeout_to_state = to_state
+        self.__runner = None
         return self
 
     def config_timeout_on_run(
@@ -119,6 +162,7 @@ class State(object):
         """
         self.__on_run.timeout = timeout
         self.__on_run.timeout_to_state = to_state
+        self.__runner = None
         return self
 
     def config_timeout_on_exit(
@@ -143,17 +187,202 @@ class State(object):
         """
         self.__on_exit.timeout = timeout
         self.__on_exit.timeout_to_state = to_state
+        self.__runner = None
+        return self
+
+    def config_trigger_on_run(
+        self,
+        trigger: TTrigger | TTriggerFactory,
+    ) -> Self:
+        """Вызывать функции on_run по триггеру, а не в цикле опроса.
+
+        По-умолчанию функции on_run вызываются в цикле с паузой 1 мс, что
+        нагружает цикл событий даже в простое. После настройки триггера
+        функции вызываются только при его срабатывании.
+
+        Объект триггера, переданный напрямую, общий для всех машин с этим
+        состоянием, в том числе созданных из одного шаблона. Чтобы у
+        каждой машины был свой триггер, передается функция, получающая
+        контекст машины и возвращающая триггер, например
+        lambda context: context.queue. Она вызывается при каждом входе в
+        стадию on_run.
+
+        Parameters
+        ----------
+        trigger: TTrigger | TTriggerFactory
+            asyncio.Event, asyncio.Queue, asyncio.Future, период в
+            секундах или функция от контекста машины, возвращающая один из
+            них. Подробнее - CoroWrappers.triggered.
+
+        Returns
+        -------
+        Измененный объект состояния
+
+        Raises
+        ------
+        TypeError
+            неподдерживаемый тип триггера
+        """
+        if callable(trigger):
+            factory = trigger
+            self.__on_run.wrapper_factory = (
+                lambda context: CoroWrappers.triggered(factory(context))
+            )
+        else:
+            self.__on_run.coro_wrapper = CoroWrappers.triggered(trigger)
+            self.__on_run.wrapper_factory = None
+        self.__runner = None
+        return self
+
+    def config_period_on_run(
+        self,
+        period: float,
+        overrun: TOverrun = OVERRUN_SKIP,
+    ) -> Self:
+        """Вызывать функции on_run с фиксированной частотой.
+
+        В отличие от цикла опроса, вызовы привязаны к сетке времени
+        start + n * period и не смещаются на время выполнения функций.
+
+        Parameters
+        ----------
+        period: float
+            период вызова, с
+        overrun: TOverrun
+            "skip" или "catch_up". Подробнее - CoroWrappers.periodic.
+
+        Returns
+        -------
+        Измененный объект состояния
+        """
+        self.__on_run.coro_wrapper = CoroWrappers.periodic(period, overrun)
+        self.__on_run.wrapper_factory = None
+        self.__runner = None
+        return self
+
+    def config_event(self, event: TEvent, to_state: StatesEnum) -> Self:
+        """Переход в другое состояние по внешнему событию.
+
+        События передаются в машину через StateMachine.send / post. Во время
+        стадии on_run любого состояния машины события из очереди
+        обрабатываются параллельно с ней; событие без перехода в активном
+        состоянии, в том числе в состоянии без config_event, отбрасывается.
+        События, переданные во время on_enter или on_exit, обрабатываются
+        в ближайшей стадии on_run.
+
+        Parameters
+        ----------
+        event: TEvent
+            событие, любой хешируемый объект
+        to_state: StatesEnum
+            в какое состояние перейти
+
+        Returns
+        -------
+        Измененный объект состояния
+        """
+        self.__events[event] = to_state
+        self.__runner = None
+        return self
+
+    def config_targets(self, *targets: StatesEnum) -> Self:
+        """Объявить состояния, в которые разрешен переход из функций.
+
+        Переходы по таймаутам и событиям разрешены всегда. Если все состояния
+        машины объявили переходы, при создании StateMachine проверяется
+        достижимость состояний; переход в необъявленное состояние во время
+        работы вызывает StateMachineError.
+
+        Parameters
+        ----------
+        targets: StatesEnum
+            разрешенные состояния
+
+        Returns
+        -------
+        Измененный объект состояния
+        """
+        self.__targets = frozenset(targets)
+        self.__runner = None
+        return self
+
+    def config_parent(self, parent: "State | None") -> Self:
+        """Вложить состояние в родительское.
+
+        Стадии родителя выполняются при входе в первое из его дочерних
+        состояний и при выходе из последнего; при переходах между дочерними
+        состояниями on_run родителя продолжает работу. Переход, который
+        возвращает on_enter или on_run родителя, выполняется из активного
+        дочернего состояния; on_exit родителя переходов не выполняет.
+        Переходы по событиям и объявленные переходы родителя действуют в
+        дочерних состояниях.
+
+        Parameters
+        ----------
+        parent: State | None
+            родительское состояние, не входящее в список состояний машины.
+            None - убрать вложенность.
+
+        Returns
+        -------
+        Измененный объект состояния
+        """
+        self.__parent = parent
+        self.__runner = None
+        return self
+
+    def config_pass_context(self, enabled: bool = True) -> Self:
+        """Передавать контекст машины функциям состояния.
+
+        Все функции стадий on_enter, on_run и on_exit получают контекст
+        машины (StateMachine.context) первым аргументом. По-умолчанию
+        функции вызываются без аргументов. Для родительского состояния
+        настраивается отдельно.
+
+        Parameters
+        ----------
+        enabled: bool
+            передавать контекст
+
+        Returns
+        -------
+        Измененный объект состояния
+        """
+        self.__pass_context = enabled
+        self.__runner = None
         return self
 
     def config_logging(self, logging_level: int) -> Self:
-        """Конфигурировать уровень логгирования."""
+        """Конфигурировать уровень логгирования.
+
+        Parameters
+        ----------
+        logging_level: int
+            уровень из модуля logging. Отладочные сообщения стадий
+            формируются, только если уровень задан и не выше
+            logging.DEBUG. По-умолчанию logging.NOTSET - сообщения не
+            формируются.
+
+        Returns
+        -------
+        Измененный объект состояния
+        """
+        self.__logging_level = logging_level
+        self.__runner = None
         return self
 
     def build(self) -> StateRunner:
         """Создание состояния.
 
-        Вызывается из StateMachine.
+        Вызывается из StateMachine. Повторный вызов возвращает тот же объект,
+        если не изменялось определение состояния и его родителей.
         """
+        parent = None if self.__parent is None else self.__parent.build()
+        if self.__runner is None or self.__runner.parent is not parent:
+            self.__runner = self.__build(parent)
+        return self.__runner
+
+    def __build(self, parent: StateRunner | None) -> StateRunner:
         return StateRunner(
             name=self.__name,
             on_enter=StageCallbacks(
@@ -162,8 +391,9 @@ class State(object):
                 timeout_to_state=self.__on_enter.timeout_to_state,
                 name=self.__name,
                 stage="on_enter",
-                coro_wrapper=CoroWrappers.single,
-                logging_level=0,
+                coro_wrapper=self.__on_enter.coro_wrapper,
+                logging_level=self.__logging_level,
+                pass_context=self.__pass_context,
             ),
             on_run=StageCallbacks(
                 callbacks=self.__on_run.callbacks,
@@ -171,8 +401,10 @@ class State(object):
                 timeout_to_state=self.__on_run.timeout_to_state,
                 name=self.__name,
                 stage="on_run",
-                coro_wrapper=CoroWrappers.infinite,
-                logging_level=0,
+                coro_wrapper=self.__on_run.coro_wrapper,
+                wrapper_factory=self.__on_run.wrapper_factory,
+                logging_level=self.__logging_level,
+                pass_context=self.__pass_context,
             ),
             on_exit=StageCallbacks(
                 callbacks=self.__on_exit.callbacks,
@@ -180,7 +412,11 @@ class State(object):
                 timeout_to_state=self.__on_exit.timeout_to_state,
                 name=self.__name,
                 stage="on_exit",
-                coro_wrapper=CoroWrappers.single,
-                logging_level=0,
+                coro_wrapper=self.__on_exit.coro_wrapper,
+                logging_level=self.__logging_level,
+                pass_context=self.__pass_context,
             ),
+            events=self.__events,
+            declared_targets=self.__targets,
+            parent=parent,
         )
@@ -1,19 +1,46 @@
 """Рабочая логика State."""
 
-from typing import Final, Self
+import asyncio
+import time
+from collections.abc import Iterable, Mapping
+from types import MappingProxyType
+from typing import Final, Literal, Self
+
+from loguru import logger
 
 from ..exceptions import NewStateData, NewStateException, StateMachineError
-from ..shared import exc_group_to_exc
+from ..history import TransitionCause
+from ..metrics import StageMetrics
+from ..runtime import Runtime
+from ..shared import discard_results
 from ..states_enum import StatesEnum
+from ..typings import TEvent, TEventTable
 from .stage_callbacks import StageCallbacks
 
 EXC_COMPL_NO_NEWSTATE: Final[
     str
 ] = "State '{name}' completed, but NewStateException not raised."
 
+_EMPTY_RUNTIME: Final[Runtime] = Runtime()
+
 
 class StateRunner(object):
-    """Рабочая логика State."""
+    """Рабочая логика State.
+
+    Не хранит данных экземпляра машины и может использоваться несколькими
+    машинами одновременно.
+    """
+
+    __slots__ = (
+        "__name",
+        "__on_enter",
+        "__on_run",
+        "__on_exit",
+        "__events",
+        "__declared_targets",
+        "__parent",
+        "__ancestors",
+    )
 
     def __init__(
         self,
@@ -21,75 +48,266 @@ class StateRunner(object):
         on_enter: StageCallbacks,
         on_run: StageCallbacks,
         on_exit: StageCallbacks,
+        events: TEventTable | None = None,
+        declared_targets: Iterable[StatesEnum] | None = None,
+        parent: "StateRunner | None" = None,
     ) -> None:
-        """Рабочая логика State."""
+        """Рабочая логика State.
+
+        Переходы по событиям и объявленные переходы родительского
+        состояния действуют и в дочернем.
+        """
         self.__name: StatesEnum
         self.__on_enter: StageCallbacks
         self.__on_run: StageCallbacks
         self.__on_exit: StageCallbacks
-        self.__new_state_data: NewStateData | None
+        self.__events: Mapping[TEvent, StatesEnum]
+        self.__declared_targets: frozenset[StatesEnum] | None
+        self.__parent: StateRunner | None
+        self.__ancestors: tuple[StateRunner, ...]
 
         self.__name = name
         self.__on_enter = on_enter
         self.__on_run = on_run
         self.__on_exit = on_exit
-        self.__new_state_data = None
+        self.__parent = parent
+        self.__ancestors = () if parent is None else (
+            *parent.ancestors,
+            parent,
+        )
+        self.__events = MappingProxyType(
+            {**(parent.events if parent else {}), **(events or {})},
+        )
+        self.__declared_targets = (
+            None if declared_targets is None else frozenset(declared_targets)
+        )
 
     @property
     def name(self) -> StatesEnum:
         """Имя состояния."""
         return self.__name
 
-    async def run(self) -> None:
-        """Задача для асинхронного выполнения, вызывается из StateMachine."""
-        self.__new_state_data = None
-        await self.__run_on_enter()
-        await self.__run_on_run()
-        await self.__run_on_exit()
-        if self.__new_state_data is None:
+    @property
+    def parent(self) -> "StateRunner | None":
+        """Родительское состояние."""
+        return self.__parent
+
+    @property
+    def ancestors(self) -> tuple["StateRunner", ...]:
+        """Родительские состояния, от внешнего к ближайшему."""
+        return self.__ancestors
+
+    @property
+    def events(self) -> Mapping[TEvent, StatesEnum]:
+        """Таблица переходов по внешним событиям."""
+        return self.__events
+
+    @property
+    def targets(self) -> frozenset[StatesEnum]:
+        """Состояния для перехода, известные до запуска.
+
+        Переходы по таймауту стадий, по событиям и объявленные в
+        State.config_targets, включая переходы родительских состояний.
+        """
+        stages = (self.__on_enter, self.__on_run, self.__on_exit)
+        timeout_targets = frozenset(
+            stage.timeout_to_state
+            for stage in stages
+            if stage.timeout_to_state is not None
+        )
+        return timeout_targets.union(
+            self.__events.values(),
+            self.__declared_targets or (),
+            self.__parent.targets if self.__parent else (),
+        )
+
+    @property
+    def allowed_targets(self) -> frozenset[StatesEnum] | None:
+        """Разрешенные переходы, None - переходы не объявлены."""
+        if self.__declared_targets is None:
+            return None
+        return self.targets
+
+    async def execute(
+        self,
+        runtime: Runtime | None = None,
+        skip_on_enter: bool = False,
+    ) -> NewStateData:
+        """Выполнение состояния без генерации исключения при переходе.
+
+        Parameters
+        ----------
+        runtime: Runtime | None
+            данные экземпляра машины: метрики, очередь событий, колесо
+            таймеров, контекст
+        skip_on_enter: bool
+            не выполнять on_enter, например при продолжении работы из
+            снимка
+
+        Returns
+        -------
+        Данные перехода в новое состояние
+
+        Raises
+        ------
+        StateMachineError
+            состояние завершилось без перехода, или ошибка в стадии
+        """
+        runtime = runtime or _EMPTY_RUNTIME
+        metrics = (
+            None
+            if runtime.metrics is None
+            else runtime.metrics.state(self.__name)
+        )
+        start = time.perf_counter()
+        if metrics is not None:
+            metrics.entries += 1
+        new_state_data: NewStateData | None = None
+        if not skip_on_enter:
+            new_state_data = await self.__run_stage(
+                self.__on_enter,
+                None if metrics is None else metrics.on_enter,
+                runtime,
+            )
+        if new_state_data is None:
+            new_state_data = await self.__run_on_run(
+                None if metrics is None else metrics.on_run,
+                runtime,
+            )
+        exit_state_data = await self.__run_stage(
+            self.__on_exit,
+            None if metrics is None else metrics.on_exit,
+            runtime,
+        )
+        if exit_state_data is not None:
+            new_state_data = exit_state_data
+        if metrics is not None:
+            metrics.duration.observe(time.perf_counter() - start)
+        if new_state_data is None:
             raise StateMachineError(
                 EXC_COMPL_NO_NEWSTATE.format(name=self.__name),
             )
-        raise NewStateException.reraise(
-            new_state_data=self.__new_state_data,
+        return NewStateData(
             active_state=self.__name,
+            new_state=new_state_data.new_state,
+            cause=new_state_data.cause,
+        )
+
+    async def run(self) -> None:
+        """Задача для асинхронного выполнения, вызывается из StateMachine.
+
+        Переход в новое состояние передается через NewStateException.
+        """
+        new_state_data = await self.execute()
+        raise NewStateException(
+            new_state=new_state_data.new_state,
+            new_state_data=new_state_data,
+        )
+
+    async def execute_stage(
+        self,
+        stage: Literal["on_enter", "on_run", "on_exit"],
+        runtime: Runtime | None = None,
+    ) -> NewStateData | None:
+        """Выполнение одной стадии, для родительских состояний.
+
+        Returns
+        -------
+        Данные перехода, или None, если стадия завершилась без перехода
+        """
+        stages = {
+            "on_enter": self.__on_enter,
+            "on_run": self.__on_run,
+            "on_exit": self.__on_exit,
+        }
+        return await self.__run_stage(
+            stages[stage],
+            None,
+            runtime or _EMPTY_RUNTIME,
         )
 
     def config_logging(self, logging_level: int) -> Self:
-        """Конфигурировать уровень логгирования."""
+        """Конфигурировать уровень логгирования, включая родителей."""
+        if self.__parent is not None:
+            self.__parent.config_logging(logging_level)
+        self.__on_enter.config_logging(logging_level)
+        self.__on_run.config_logging(logging_level)
+        self.__on_exit.config_logging(logging_level)
         return self
 
-    async def __run_on_enter(self) -> None:
-        state_machine_error: str | None = None
-        try:
-            await self.__on_enter.run()
-        except* NewStateException as exc_gr:
-            self.__new_state_data = exc_group_to_exc(exc_gr).exception_data
-        except* StateMachineError as exc_gr:
-            state_machine_error = exc_group_to_exc(exc_gr).message
-        if state_machine_error is not None:
-            raise StateMachineError(state_machine_error)
-
-    async def __run_on_run(self) -> None:
-        if self.__new_state_data is not None:
-            return
-        state_machine_error: str | None = None
-        try:
-            await self.__on_run.run()
-        except* NewStateException as exc_gr:
-            self.__new_state_data = exc_group_to_exc(exc_gr).exception_data
-        except* StateMachineError as exc_gr:
-            state_machine_error = exc_group_to_exc(exc_gr).message
-        if state_machine_error is not None:
-            raise StateMachineError(state_machine_error)
-
-    async def __run_on_exit(self) -> None:
-        state_machine_error: str | None = None
+    async def __run_on_run(
+        self,
+        metrics: StageMetrics | None,
+        runtime: Runtime,
+    ) -> NewStateData | None:
+        """Стадия on_run параллельно с событиями и переходами родителей.
+
+        Приоритет: переход родителя, событие, результат on_run. Очередь
+        событий машины читается в каждом состоянии: событие без перехода
+        в этом состоянии отбрасывается, а не ждет следующего.
+        """
+        events = runtime.events
+        interrupt = runtime.interrupt
+        if events is None and interrupt is None:
+            return await self.__run_stage(self.__on_run, metrics, runtime)
+        own = [
+            asyncio.ensure_future(
+                self.__run_stage(self.__on_run, metrics, runtime),
+            ),
+        ]
+        if events is not None:
+            own.append(asyncio.ensure_future(self.__wait_event(events)))
         try:
-            await self.__on_exit.run()
-        except* NewStateException as exc_gr:
-            self.__new_state_data = exc_group_to_exc(exc_gr).exception_data
-        except* StateMachineError as exc_gr:
-            state_machine_error = exc_group_to_exc(exc_gr).message
-        if state_machine_error is not None:
-            raise StateMachineError(state_machine_error)
+            await asyncio.wait(
+                own if interrupt is None else (*own, interrupt),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            # стадия не завершается, пока задачи не остановлены
+            for task in own:
+                task.cancel()
+            await asyncio.wait(own)
+        if interrupt is not None and interrupt.done():
+            discard_results(own)
+            # переход принят, следующий ожидается в новом future
+            runtime.interrupt = asyncio.get_running_loop().create_future()
+            return interrupt.result()
+        on_run = own[0]
+        if len(own) > 1 and not own[1].cancelled():
+            discard_results((on_run,))
+            return own[1].result()
+        return on_run.result()
+
+    async def __wait_event(
+        self,
+        events: "asyncio.Queue[TEvent]",
+    ) -> NewStateData:
+        """Ожидание события с переходом из текущего состояния."""
+        while True:  # noqa: WPS457
+            event = await events.get()
+            events.task_done()
+            new_state = self.__events.get(event)
+            if new_state is not None:
+                return NewStateData(
+                    active_state=self.__name,
+                    new_state=new_state,
+                    cause=TransitionCause.event,
+                )
+            logger.debug(
+                "State {name}, event {event} ignored",
+                name=self.__name,
+                event=event,
+            )
+
+    async def __run_stage(
+        self,
+        stage: StageCallbacks,
+        metrics: StageMetrics | None,
+        runtime: Runtime,
+    ) -> NewStateData | None:
+        return await stage.execute(
+            metrics,
+            runtime.timer_wheel,
+            runtime.context_args,
+            runtime.recorder,
+        )
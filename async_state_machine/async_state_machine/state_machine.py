@@ -1,86 +1,698 @@
 """Диаграмма состояний."""
 
 import asyncio
-from typing import Final, Iterable, Self, Type
+import time
+from collections.abc import Iterable, Mapping
+from types import MappingProxyType
+from typing import Any, Final, Self, Type
 
-from .const import INFINITE_CORO_SLEEP
-from .exceptions import NewStateException, StateMachineError
+from .active_parents import ActiveParents
+from .exceptions import NewStateData, StateMachineError
+from .history import TransitionHistory, TransitionRecord
+from .metrics import MachineMetrics, MetricsSnapshot
+from .runtime import Runtime
+from .shared import cancel_and_wait
+from .snapshot import decode_snapshot, encode_snapshot
 from .state import State, StateRunner
+from .state_machine_template import StateMachineTemplate
 from .states_enum import StatesEnum
+from .timer_wheel import TimerWheel
+from .trace import TraceRecorder
+from .transition_policy import TransitionPolicy
+from .typings import TEvent
 
-EXC_NAME_NOT_FOUND: Final[str] = "State with name {name} not found."
-EXC_NOT_USED_STATES: Final[str] = "Need to define states: {states}"
-EXC_REUSE_STATE: Final[str] = "Several use state with name: {name}"
+DEFAULT_EVENTS_QUEUE_SIZE: Final[int] = 1000
+
+EXC_EVENTS_QUEUE_FULL: Final[str] = "Events queue is full, event: {event}"
+EXC_REGION_EXISTS: Final[str] = "Region already exists: {name}"
+EXC_REGION_NOT_FOUND: Final[str] = "Region not found: {name}"
+EXC_NOT_STEPPABLE: Final[str] = (
+    "State machine with parent states or regions can only be run with run()"
+)
 
 
 class StateMachine(object):
     """Диаграмма состояний."""
 
+    __slots__ = (
+        "__template",
+        "__active_state",
+        "__active_id",
+        "__transition_policy",
+        "__runtime",
+        "__history",
+        "__skip_on_enter",
+        "__transitions",
+        "__stepping",
+        "__entered",
+        "__regions",
+    )
+
     def __init__(
         self,
         states: Iterable[State],
         states_enum: Type[StatesEnum],
         init_state: StatesEnum,
+        context: Any = None,
     ) -> None:
-        """Определение диаграммы состояний."""
-        self.__active_state: StateRunner
-        self.__state_names: set[str]
-        self.__states: Iterable[StateRunner]
+        """Определение диаграммы состояний.
+
+        Для создания многих одинаковых машин используйте StateMachineTemplate
+        и StateMachine.from_template.
+
+        Parameters
+        ----------
+        states: Iterable[State]
+            состояния машины
+        states_enum: Type[StatesEnum]
+            перечисление всех состояний
+        init_state: StatesEnum
+            начальное состояние
+        context: Any
+            контекст машины. Передается первым аргументом функциям
+            состояний, для которых задан State.config_pass_context.
+        """
+        self.__init_instance(
+            StateMachineTemplate(
+                states=states,
+                states_enum=states_enum,
+                init_state=init_state,
+            ),
+            context,
+        )
+
+    @classmethod
+    def from_template(
+        cls,
+        template: StateMachineTemplate,
+        context: Any = None,
+    ) -> Self:
+        """Создание машины из скомпилированного шаблона.
 
-        self.__states = [state.build() for state in states]
-        self.__state_names = {state.value for state in states_enum}
-        self.__check_state_names()
-        self.__active_state = self.__set_init_state(init_state)
+        Состояния и граф переходов общие для всех машин шаблона, машина
+        хранит только активное состояние, контекст, метрики и очередь
+        событий. Данные экземпляра передаются в функции состояний через
+        context, без создания замыканий для каждой машины.
+        """
+        machine = cls.__new__(cls)
+        machine.__init_instance(template, context)  # noqa: WPS437
+        return machine
+
+    @property
+    def template(self) -> StateMachineTemplate:
+        """Шаблон, из которого создана машина."""
+        return self.__template
 
     @property
     def active_state(self) -> StatesEnum:
         """Активное состояние."""
         return self.__active_state.name
 
+    @property
+    def context(self) -> Any:
+        """Контекст машины, передается функциям состояний."""
+        return self.__runtime.context_args[0]
+
+    @property
+    def history(self) -> TransitionHistory | None:
+        """История переходов. None, если не ведется."""
+        return self.__history
+
+    @property
+    def regions(self) -> Mapping[str, "StateMachine"]:
+        """Параллельные области машины по имени."""
+        return MappingProxyType(self.__regions or {})
+
+    def region(self, name: str) -> "StateMachine":
+        """Параллельная область машины.
+
+        Raises
+        ------
+        StateMachineError
+            область не найдена
+        """
+        region = (self.__regions or {}).get(name)
+        if region is None:
+            raise StateMachineError(EXC_REGION_NOT_FOUND.format(name=name))
+        return region
+
     async def run(self) -> None:
-        """Задача для асинхронного выполнения."""
-        while True:
-            try:
-                await self.__active_state.run()
-            except NewStateException as exc:
-                new_state = exc.exception_data.new_state
-                self.__active_state = self.__find_state_by_name(new_state)
-            await asyncio.sleep(INFINITE_CORO_SLEEP)
+        """Задача для асинхронного выполнения.
+
+        Параллельные области выполняются в одном цикле с состояниями машины:
+        цикл ожидает активные состояния всех областей и, когда область
+        переходит в новое состояние, запускает следующее. Между состояниями
+        области не занимают задач. Ошибка в любой области останавливает все.
+        """
+        if not self.__regions:
+            await self.__run_states()
+            return
+        machines = self.__machines()
+        parents = {
+            machine: (
+                ActiveParents() if machine.__template.has_parents else None
+            )
+            for machine in machines
+        }
+        steps: dict[asyncio.Future[float | None], StateMachine] = {}
+        for machine in machines:
+            machine.__begin()
+            steps[
+                asyncio.ensure_future(
+                    machine.__step_after(None, parents[machine]),
+                )
+            ] = machine
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    steps,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for step in done:
+                    delay = step.result()
+                    machine = steps.pop(step)
+                    steps[
+                        asyncio.ensure_future(
+                            machine.__step_after(delay, parents[machine]),
+                        )
+                    ] = machine
+        finally:
+            await cancel_and_wait(steps)
+            for machine in machines:
+                await machine.__end(parents[machine])
+
+    @property
+    def steppable(self) -> bool:
+        """Машину можно выполнять по шагам через step.
+
+        Машины с родительскими состояниями или параллельными областями
+        выполняются только через run.
+        """
+        return not self.__template.has_parents and not self.__regions
+
+    async def step(self) -> float | None:
+        """Выполнить активное состояние и перейти в новое.
+
+        Для внешних планировщиков, например StateMachineGroup: между
+        шагами машина не занимает задачу и не ожидает таймер, паузу по
+        политике переходов выдерживает планировщик.
+
+        Returns
+        -------
+        Пауза перед следующим шагом, с, или None - следующий шаг сразу
+
+        Raises
+        ------
+        StateMachineError
+            машину нельзя выполнять по шагам, см. steppable, или ошибка в
+            состоянии
+        """
+        if not self.steppable:
+            raise StateMachineError(EXC_NOT_STEPPABLE)
+        if not self.__stepping:
+            self.__stepping = True
+            self.__begin()
+        return await self.__step(None)
+
+    async def __run_states(self) -> None:
+        """Цикл переходов между состояниями машины."""
+        parents = ActiveParents() if self.__template.has_parents else None
+        self.__begin()
+        try:
+            while True:
+                delay = await self.__step(parents)
+                if delay is not None:
+                    await self.__pause(delay)
+        finally:
+            await self.__end(parents)
+
+    def snapshot(
+        self,
+        include_context: bool = True,
+        include_history: bool = True,
+    ) -> bytes:
+        """Двоичный снимок машины.
+
+        Снимок содержит активное состояние и, по выбору, контекст (через
+        pickle) и историю переходов. Активные состояния и история
+        параллельных областей сохраняются вместе с машиной, контекст у них
+        общий с машиной. Для сохранения снимков многих машин в один файл -
+        save_snapshots.
+
+        Parameters
+        ----------
+        include_context: bool
+            сохранить контекст
+        include_history: bool
+            сохранить историю, если она ведется
+
+        Returns
+        -------
+        Данные снимка
+        """
+        return encode_snapshot(
+            self.__template.state_table,
+            self.active_state,
+            self.__runtime.context_args if include_context else (),
+            self.__history if include_history else None,
+            None if self.__regions is None else {
+                name: region.snapshot(
+                    include_context=False,
+                    include_history=include_history,
+                )
+                for name, region in self.__regions.items()
+            },
+        )
+
+    def restore(self, data: bytes, replay_on_enter: bool = False) -> Self:
+        """Восстановить машину из снимка перед запуском run.
+
+        Parameters
+        ----------
+        data: bytes
+            данные StateMachine.snapshot машины с тем же набором состояний
+        replay_on_enter: bool
+            выполнить on_enter восстановленного состояния при запуске.
+            По-умолчанию работа продолжается со стадии on_run.
+
+        Returns
+        -------
+        Измененный объект машины состояний
+
+        Raises
+        ------
+        StateMachineError
+            данные повреждены, снимок сделан для других состояний или
+            содержит область, которой нет у машины
+        """
+        snapshot = decode_snapshot(self.__template.state_table, data)
+        regions = [
+            (self.region(name), region_data)
+            for name, region_data in (snapshot.regions or {}).items()
+        ]
+        for region, region_data in regions:
+            region.restore(region_data, replay_on_enter)
+        self.__active_id = self.__template.graph.id_of(snapshot.active_state)
+        self.__active_state = self.__template.graph.runner(self.__active_id)
+        if snapshot.has_context:
+            self.config_context(snapshot.context)
+        if snapshot.history is not None:
+            self.__restore_history(snapshot.history)
+        self.__skip_on_enter = not replay_on_enter
+        return self
+
+    def config_transition_policy(self, policy: TransitionPolicy) -> Self:
+        """Конфигурировать паузу между переходами.
+
+        Parameters
+        ----------
+        policy: TransitionPolicy
+            политика передачи управления. По-умолчанию пауза 1 мс после
+            каждого перехода.
+
+        Returns
+        -------
+        Измененный объект машины состояний
+        """
+        self.__transition_policy = policy
+        for region in self.__event_regions(all_regions=True):
+            region.config_transition_policy(policy)
+        return self
+
+    async def send(self, event: TEvent) -> None:
+        """Передать внешнее событие, ожидая место в очереди.
+
+        Переходы по событиям задаются в State.config_event. Событие
+        получают также параллельные области с переходами по событиям.
+        """
+        for queue in self.__event_queues():
+            await queue.put(event)
+
+    async def send_many(self, events: Iterable[TEvent]) -> None:
+        """Передать несколько событий, ожидая место в очереди."""
+        queues = self.__event_queues()
+        for event in events:
+            for queue in queues:
+                if queue.full():
+                    await queue.put(event)
+                else:
+                    queue.put_nowait(event)
+
+    def post(self, event: TEvent) -> None:
+        """Передать внешнее событие без ожидания.
+
+        Событие получают все области или ни одна: если очередь машины или
+        любой области заполнена, событие никуда не передается.
+
+        Raises
+        ------
+        StateMachineError
+            очередь событий заполнена
+        """
+        queues = self.__event_queues()
+        if any(queue.full() for queue in queues):
+            raise StateMachineError(EXC_EVENTS_QUEUE_FULL.format(event=event))
+        for queue in queues:
+            queue.put_nowait(event)
+
+    def config_region(
+        self,
+        name: str,
+        template: StateMachineTemplate,
+    ) -> Self:
+        """Добавить параллельную область.
+
+        Область - машина из шаблона со своим активным состоянием, метриками
+        и историей. Контекст, колесо таймеров и политика переходов общие с
+        машиной, события передаются во все области, поэтому функции одной
+        области управляют другими через post / send машины. Области
+        выполняются циклом run машины, а не отдельными задачами run.
+
+        Parameters
+        ----------
+        name: str
+            имя области
+        template: StateMachineTemplate
+            состояния области
+
+        Returns
+        -------
+        Измененный объект машины состояний
+
+        Raises
+        ------
+        StateMachineError
+            область с таким именем уже есть
+        """
+        if self.__regions is None:
+            self.__regions = {}
+        if name in self.__regions:
+            raise StateMachineError(EXC_REGION_EXISTS.format(name=name))
+        region = StateMachine.from_template(template, self.context)
+        region.config_timer_wheel(self.__runtime.timer_wheel)
+        region.config_transition_policy(self.__transition_policy)
+        self.__regions[name] = region
+        return self
+
+    def metrics_snapshot(self) -> MetricsSnapshot | None:
+        """Снимок метрик.
+
+        Количество входов в состояния, длительность состояний и стадий,
+        таймауты и переходы. None, если метрики отключены.
+        """
+        if self.__runtime.metrics is None:
+            return None
+        return self.__runtime.metrics.snapshot()
+
+    def config_metrics(self, enabled: bool) -> Self:
+        """Включить или отключить сбор метрик. По-умолчанию включен.
+
+        После отключения и повторного включения метрики собираются заново.
+        """
+        if not enabled:
+            self.__runtime.metrics = None
+        elif self.__runtime.metrics is None:
+            self.__runtime.metrics = MachineMetrics(self.__template.states)
+        return self
+
+    def config_history(self, capacity: int | None) -> Self:
+        """Вести историю последних capacity переходов.
+
+        None - не вести, по-умолчанию. Буфер выделяется сразу, запись
+        перехода не создает объектов. Накопленная история отбрасывается.
+        """
+        self.__history = (
+            None if capacity is None else TransitionHistory(capacity)
+        )
+        return self
+
+    def config_trace(self, path: str | None) -> Self:
+        """Записывать трассировку выполнения в файл path.
+
+        Записываются начало и конец стадий, таймауты и переходы, включая
+        стадии родительских состояний. Отчет по файлу строится без
+        повторного выполнения функций: python -m async_state_machine path.
+        None - закрыть файл и не вести трассировку, по-умолчанию.
+        Параллельные области не трассируются.
+
+        Файл закрывается по завершении run и дописывается при следующем
+        запуске. При выполнении через step файл закрывает config_trace(None).
+        """
+        recorder = self.__runtime.recorder
+        if recorder is not None:
+            recorder.close()
+        self.__runtime.recorder = None
+        if path is not None:
+            runners = self.__template.states.values()
+            self.__runtime.recorder = TraceRecorder(
+                path,
+                {
+                    *self.__template.states,
+                    *(
+                        parent.name
+                        for runner in runners
+                        for parent in runner.ancestors
+                    ),
+                },
+            )
+        return self
+
+    def config_events_queue(self, maxsize: int) -> Self:
+        """Размер очереди внешних событий. По-умолчанию 1000.
+
+        Накопленные события отбрасываются.
+        """
+        self.__runtime.events = asyncio.Queue(maxsize)
+        return self
+
+    def config_context(self, context: Any) -> Self:
+        """Заменить контекст машины.
+
+        Новый контекст получат функции, вызванные после изменения.
+        """
+        self.__runtime.context_args = (context,)
+        for region in self.__event_regions(all_regions=True):
+            region.config_context(context)
+        return self
+
+    def config_timer_wheel(self, timer_wheel: TimerWheel | None) -> Self:
+        """Использовать общее колесо таймеров.
+
+        На колесе отсчитываются паузы между переходами и таймауты стадий.
+        Вызывается из StateMachineGroup.
+        """
+        self.__runtime.timer_wheel = timer_wheel
+        for region in self.__event_regions(all_regions=True):
+            region.config_timer_wheel(timer_wheel)
+        return self
 
     def config_logging(self, logging_level: int) -> Self:
-        """Конфигурировать уровень логгирования."""
-        # log.setLevel(logging_level)
-        for state in self.__states:
+        """Конфигурировать уровень логгирования всех состояний.
+
+        Состояния общие для машин, созданных из одних объектов State, поэтому
+        уровень изменяется и для них.
+        """
+        for state in self.__template.states.values():
             state.config_logging(logging_level)
+        for region in self.__event_regions(all_regions=True):
+            region.config_logging(logging_level)
         return self
 
-    def __set_init_state(self, init_state: StatesEnum) -> StateRunner:
-        for state in self.__states:
-            if state.name == init_state:
-                return state
-        raise ValueError(
-            "Init state {0} not found in states array".format(init_state),
+    def __queues_events(self) -> bool:
+        """События нужны состояниям самой машины.
+
+        Машина с областями не копит события, если ее состояния их не
+        обрабатывают.
+        """
+        return self.__template.has_events or not self.__regions
+
+    def __event_regions(
+        self,
+        all_regions: bool = False,
+    ) -> "tuple[StateMachine, ...]":
+        """Области для передачи событий или настроек."""
+        if not self.__regions:
+            return ()
+        return tuple(
+            region
+            for region in self.__regions.values()
+            if all_regions or region.template.has_events
         )
 
-    def __check_state_names(self) -> None:
-        names = self.__extract_names()
-        if len(names) != len(self.__state_names):
-            not_used_states = self.__state_names.difference(names)
-            raise StateMachineError(
-                EXC_NOT_USED_STATES.format(states=not_used_states),
+    def __machines(self) -> "list[StateMachine]":
+        """Машина и все ее области, включая вложенные."""
+        machines: list[StateMachine] = [self]
+        for region in (self.__regions or {}).values():
+            machines.extend(region.__machines())
+        return machines
+
+    def __event_queues(self) -> "list[asyncio.Queue[TEvent]]":
+        """Очереди машины и областей, получающие внешние события."""
+        queues = [self.__get_event_queue()] if self.__queues_events() else []
+        for region in self.__event_regions():
+            queues.extend(region.__event_queues())
+        return queues
+
+    def __restore_history(self, records: tuple[TransitionRecord, ...]) -> None:
+        """История из снимка, буфер не меньше сохраненной истории."""
+        if not records:
+            return
+        capacity = len(records)
+        if self.__history is not None:
+            capacity = max(capacity, self.__history.capacity)
+        self.__history = TransitionHistory(capacity)
+        for record in records:
+            self.__history.record(*record)
+
+    def __begin(self) -> None:
+        """Подготовка к выполнению состояний."""
+        self.__entered = time.perf_counter()
+        if self.__template.has_events:
+            self.__get_event_queue()
+        if self.__runtime.recorder is not None:
+            self.__runtime.recorder.start(self.__active_state.name)
+
+    async def __end(self, parents: ActiveParents | None) -> None:
+        """Завершение выполнения состояний."""
+        runtime = self.__runtime
+        if parents is not None:
+            await parents.close(runtime)
+        if runtime.recorder is not None:
+            runtime.recorder.close()
+
+    async def __step_after(
+        self,
+        delay: float | None,
+        parents: ActiveParents | None,
+    ) -> float | None:
+        """Шаг после паузы по политике переходов."""
+        if delay is not None:
+            await self.__pause(delay)
+        return await self.__step(parents)
+
+    async def __step(self, parents: ActiveParents | None) -> float | None:
+        """Выполнение активного состояния и переход.
+
+        Returns
+        -------
+        Пауза по политике переходов или None
+        """
+        skip_on_enter = self.__skip_on_enter
+        self.__skip_on_enter = False
+        new_state_data: NewStateData | None = None
+        if parents is not None:
+            new_state_data = await self.__switch_parents(
+                parents,
+                skip_on_enter,
+            )
+        if new_state_data is None:
+            new_state_data = await self.__active_state.execute(
+                self.__runtime,
+                skip_on_enter,
+            )
+        self.__move(new_state_data)
+        policy = self.__transition_policy
+        self.__transitions += 1
+        if self.__transitions < policy.transitions_per_yield:
+            return None
+        self.__transitions = 0
+        return policy.delay
+
+    def __move(self, new_state_data: NewStateData) -> None:
+        """Переход в новое состояние с записью метрик и истории."""
+        self.__active_id = self.__template.graph.next_state(
+            self.__active_id,
+            new_state_data.new_state,
+        )
+        self.__active_state = self.__template.graph.runner(self.__active_id)
+        metrics = self.__runtime.metrics
+        if metrics is not None:
+            now = time.perf_counter()
+            if new_state_data.active_state is not None:
+                metrics.record_transition(
+                    new_state_data.active_state,
+                    new_state_data.new_state,
+                    now - self.__entered,
+                )
+            self.__entered = now
+        if self.__history is not None:
+            self.__history.record(
+                asyncio.get_running_loop().time(),
+                new_state_data.active_state,
+                new_state_data.new_state,
+                new_state_data.cause,
+            )
+        recorder = self.__runtime.recorder
+        if recorder is not None:
+            recorder.transition(
+                new_state_data.active_state,
+                new_state_data.new_state,
+                new_state_data.cause,
             )
 
-    def __extract_names(self) -> set[str]:
-        names: set[str] = set()
-        for state in self.__states:
-            name = state.name.value
-            if name in names:
-                raise StateMachineError(EXC_REUSE_STATE.format(name=name))
-            names.add(name)
-        return names
-
-    def __find_state_by_name(self, name: StatesEnum) -> StateRunner:
-        for state in self.__states:
-            if state.name == name:
-                return state
-        raise StateMachineError(EXC_NAME_NOT_FOUND.format(name=name))
+    async def __switch_parents(
+        self,
+        parents: ActiveParents,
+        skip_on_enter: bool,
+    ) -> NewStateData | None:
+        """Вход и выход из родителей активного состояния."""
+        new_state_data = await parents.switch(
+            self.__active_state,
+            self.__runtime,
+            skip_on_enter,
+        )
+        if new_state_data is None:
+            return None
+        return NewStateData(
+            active_state=self.__active_state.name,
+            new_state=new_state_data.new_state,
+            cause=new_state_data.cause,
+        )
+
+    async def __pause(self, delay: float) -> None:
+        timer_wheel = self.__runtime.timer_wheel
+        if delay and timer_wheel is not None:
+            await timer_wheel.sleep(delay)
+            return
+        await asyncio.sleep(delay)
+
+    def __get_event_queue(self) -> "asyncio.Queue[TEvent]":
+        """Очередь событий, создается при первом использовании."""
+        events = self.__runtime.events
+        if events is None:
+            events = asyncio.Queue[TEvent](DEFAULT_EVENTS_QUEUE_SIZE)
+            self.__runtime.events = events
+        return events
+
+    def __init_instance(
+        self,
+        template: StateMachineTemplate,
+        context: Any,
+    ) -> None:
+        """Данные экземпляра машины."""
+        self.__template: StateMachineTemplate
+        self.__active_state: StateRunner
+        self.__active_id: int
+        self.__transition_policy: TransitionPolicy
+        self.__runtime: Runtime
+        self.__history: TransitionHistory | None
+        self.__skip_on_enter: bool
+        self.__transitions: int
+        self.__stepping: bool
+        self.__entered: float
+        self.__regions: dict[str, StateMachine] | None
+
+        self.__template = template
+        self.__active_id = template.graph.id_of(template.init_state)
+        self.__active_state = template.graph.runner(self.__active_id)
+        self.__transition_policy = TransitionPolicy()
+        self.__runtime = Runtime(
+            metrics=MachineMetrics(template.states),
+            context=context,
+        )
+        self.__history = None
+        self.__skip_on_enter = False
+        self.__transitions = 0
+        self.__stepping = False
+        self.__entered = 0
+        self.__regions = None
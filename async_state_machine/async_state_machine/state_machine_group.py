@@ -0,0 +1,197 @@
+"""Группа машин состояний на одном цикле событий."""
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable
+from typing import Any, Final, Self
+
+from loguru import logger
+
+from .metrics import HistogramSnapshot, LoopLagMonitor
+from .shared import cancel_and_wait
+from .state_machine import StateMachine
+from .timer_wheel import TimerEntry, TimerWheel
+
+
+class StateMachineGroup(object):
+    """Группа машин состояний на одном цикле событий.
+
+    Машины выполняются по шагам (StateMachine.step) из общей очереди
+    готовых: задача создается только на время выполнения одного
+    состояния, паузы между переходами выдерживает общее колесо таймеров,
+    после чего машина снова ставится в очередь. Машина между шагами - это
+    только объект в очереди или запись в колесе. Машины с родительскими
+    состояниями или областями выполняются отдельной задачей run.
+    """
+
+    def __init__(
+        self,
+        machines: Iterable[StateMachine] = (),
+        timer_wheel: TimerWheel | None = None,
+    ) -> None:
+        """Группа машин состояний на одном цикле событий.
+
+        Parameters
+        ----------
+        machines: Iterable[StateMachine]
+            машины для запуска
+        timer_wheel: TimerWheel | None
+            общее колесо таймеров. Если не задано, создается новое.
+        """
+        self.__timer_wheel: TimerWheel
+        self.__ready: deque[StateMachine]
+        self.__wakeup: asyncio.Event
+        self.__machines: set[StateMachine]
+        self.__pending: dict[StateMachine, TimerEntry | None]
+        self.__started: set[StateMachine]
+        self.__tasks: dict[StateMachine, asyncio.Task[float | None]]
+        self.__loop_lag: LoopLagMonitor | None
+
+        self.__timer_wheel = timer_wheel or TimerWheel()
+        self.__ready = deque()
+        self.__wakeup = asyncio.Event()
+        self.__machines = set()
+        self.__pending = {}
+        self.__started = set()
+        self.__tasks = {}
+        self.__loop_lag = None
+        for machine in machines:
+            self.add(machine)
+
+    @property
+    def timer_wheel(self) -> TimerWheel:
+        """Общее колесо таймеров."""
+        return self.__timer_wheel
+
+    @property
+    def running(self) -> int:
+        """Количество запущенных и не остановленных машин."""
+        return len(self.__started)
+
+    @property
+    def active_tasks(self) -> int:
+        """Количество задач, выполняющих состояния машин сейчас."""
+        return len(self.__tasks)
+
+    def loop_lag_snapshot(self) -> HistogramSnapshot | None:
+        """Снимок задержек цикла событий. None, если не измеряется."""
+        if self.__loop_lag is None:
+            return None
+        return self.__loop_lag.snapshot()
+
+    def config_loop_lag(self, interval: float | None) -> Self:
+        """Измерять задержку цикла событий с периодом interval, с.
+
+        None - не измерять, по-умолчанию. Изменение вступает в силу при
+        следующем запуске run.
+        """
+        self.__loop_lag = None if interval is None else LoopLagMonitor(interval)
+        return self
+
+    def add(self, machine: StateMachine) -> Self:
+        """Добавить машину в очередь на запуск."""
+        if machine in self.__machines:
+            return self
+        machine.config_timer_wheel(self.__timer_wheel)
+        self.__machines.add(machine)
+        self.__schedule(machine)
+        return self
+
+    def remove(self, machine: StateMachine) -> Self:
+        """Остановить машину.
+
+        Машина, ожидающая в очереди или паузе, больше не запускается.
+        """
+        self.__machines.discard(machine)
+        self.__started.discard(machine)
+        entry = self.__pending.pop(machine, None)
+        if entry is not None:
+            entry.cancel()
+        task = self.__tasks.pop(machine, None)
+        if task is not None:
+            task.cancel()
+        return self
+
+    async def run(self) -> None:
+        """Задача для асинхронного выполнения.
+
+        Ошибка одной машины не останавливает остальные.
+        """
+        loop_lag = (
+            None
+            if self.__loop_lag is None
+            else asyncio.create_task(self.__loop_lag.run())
+        )
+        try:
+            while True:  # noqa: WPS457
+                await self.__wakeup.wait()
+                self.__wakeup.clear()
+                # машины, поставленные в очередь во время обработки,
+                # запускаются на следующей итерации цикла событий
+                for _ in range(len(self.__ready)):
+                    self.__start(self.__ready.popleft())
+        finally:
+            tasks: list[asyncio.Future[Any]] = list(self.__tasks.values())
+            if loop_lag is not None:
+                tasks.append(loop_lag)
+            self.__tasks.clear()
+            self.__started.clear()
+            await cancel_and_wait(tasks)
+
+    def __schedule(self, machine: StateMachine) -> None:
+        """Поставить машину в очередь готовых."""
+        self.__pending[machine] = None
+        self.__ready.append(machine)
+        self.__wakeup.set()
+
+    def __start(self, machine: StateMachine) -> None:
+        # в очереди могут остаться записи удаленных и добавленных снова
+        # машин - запускается только ожидающая запуска
+        if self.__pending.get(machine, _MISSING) is not None:
+            return
+        del self.__pending[machine]  # noqa: WPS420
+        self.__started.add(machine)
+        task: asyncio.Task[float | None] = asyncio.create_task(
+            machine.step() if machine.steppable else _run(machine),
+        )
+        self.__tasks[machine] = task
+        task.add_done_callback(lambda done: self.__on_done(machine, done))
+
+    def __on_done(
+        self,
+        machine: StateMachine,
+        task: "asyncio.Task[float | None]",
+    ) -> None:
+        if self.__tasks.get(machine) is not task:
+            return
+        self.__tasks.pop(machine)
+        if task.cancelled():
+            self.remove(machine)
+            return
+        exc = task.exception()
+        if exc is not None:
+            self.remove(machine)
+            logger.error(
+                "State machine stopped with error: {exc!r}",
+                exc=exc,
+            )
+            return
+        delay = task.result()
+        if not machine.steppable:
+            self.remove(machine)
+        elif delay:
+            self.__pending[machine] = self.__timer_wheel.call_later(
+                delay,
+                lambda: self.__schedule(machine),
+            )
+        else:
+            self.__schedule(machine)
+
+
+_MISSING: Final[object] = object()
+
+
+async def _run(machine: StateMachine) -> float | None:
+    """Машина, которую нельзя выполнять по шагам."""
+    await machine.run()
+    return None
@@ -0,0 +1,171 @@
+"""Скомпилированное определение машины состояний."""
+
+from collections.abc import Iterable, Mapping
+from types import MappingProxyType
+from typing import Final, Type
+
+from .exceptions import StateMachineError
+from .snapshot import StateTable
+from .state import State, StateRunner
+from .states_enum import StatesEnum
+from .transition_graph import TransitionGraph
+
+EXC_INIT_NOT_FOUND: Final[str] = "Init state {name} not found in states array"
+EXC_NOT_USED_STATES: Final[str] = "Need to define states: {states}"
+EXC_REUSE_STATE: Final[str] = "Several use state with name: {name}"
+EXC_TARGET_NOT_FOUND: Final[
+    str
+] = "State {name} refers to unknown target state {target}"
+EXC_PARENT_IS_STATE: Final[
+    str
+] = "State {name} is used both as a state and as a parent"
+
+
+class StateMachineTemplate(object):
+    """Скомпилированное определение машины состояний.
+
+    Состояния создаются, перечисление и граф переходов проверяются один раз.
+    Машины из шаблона создаются StateMachine.from_template и хранят только
+    данные экземпляра.
+    """
+
+    __slots__ = (
+        "__states",
+        "__graph",
+        "__init_state",
+        "__has_events",
+        "__has_parents",
+        "__state_table",
+    )
+
+    def __init__(
+        self,
+        states: Iterable[State],
+        states_enum: Type[StatesEnum],
+        init_state: StatesEnum,
+    ) -> None:
+        """Скомпилированное определение машины состояний.
+
+        Parameters
+        ----------
+        states: Iterable[State]
+            определения состояний
+        states_enum: Type[StatesEnum]
+            перечисление, все состояния которого должны быть определены
+        init_state: StatesEnum
+            начальное состояние
+
+        Raises
+        ------
+        StateMachineError
+            ошибка в определении состояний или графа переходов
+        ValueError
+            начальное состояние не определено
+        """
+        self.__states: Mapping[StatesEnum, StateRunner]
+        self.__graph: TransitionGraph
+        self.__init_state: StatesEnum
+        self.__has_events: bool
+        self.__has_parents: bool
+        self.__state_table: StateTable
+
+        self.__states = self.__build_index(states)
+        self.__has_parents = self.__check_parents()
+        self.__check_state_names({state.value for state in states_enum})
+        self.__check_targets()
+        if init_state not in self.__states:
+            raise ValueError(EXC_INIT_NOT_FOUND.format(name=init_state))
+        self.__init_state = init_state
+        self.__graph = TransitionGraph(self.__states, init_state)
+        self.__has_events = any(
+            runner.events for runner in self.__states.values()
+        )
+        self.__state_table = StateTable(self.__states)
+
+    @property
+    def states(self) -> Mapping[StatesEnum, StateRunner]:
+        """Состояния по имени."""
+        return self.__states
+
+    @property
+    def graph(self) -> TransitionGraph:
+        """Граф переходов."""
+        return self.__graph
+
+    @property
+    def init_state(self) -> StatesEnum:
+        """Начальное состояние."""
+        return self.__init_state
+
+    @property
+    def has_events(self) -> bool:
+        """Есть состояния с переходами по внешним событиям."""
+        return self.__has_events
+
+    @property
+    def has_parents(self) -> bool:
+        """Есть вложенные состояния."""
+        return self.__has_parents
+
+    @property
+    def state_table(self) -> StateTable:
+        """Нумерация состояний для снимков."""
+        return self.__state_table
+
+    def __build_index(
+        self,
+        states: Iterable[State],
+    ) -> Mapping[StatesEnum, StateRunner]:
+        """Индекс состояний по имени."""
+        index: dict[StatesEnum, StateRunner] = {}
+        for state in states:
+            runner = state.build()
+            if runner.name in index:
+                raise StateMachineError(
+                    EXC_REUSE_STATE.format(name=runner.name.value),
+                )
+            index[runner.name] = runner
+        return MappingProxyType(index)
+
+    def __check_parents(self) -> bool:
+        """Родительские состояния не должны быть состояниями машины."""
+        has_parents = False
+        for state in self.__states.values():
+            for parent in state.ancestors:
+                has_parents = True
+                if parent.name in self.__states:
+                    raise StateMachineError(
+                        EXC_PARENT_IS_STATE.format(name=parent.name),
+                    )
+        return has_parents
+
+    def __check_state_names(self, state_names: set[str]) -> None:
+        """Все состояния перечисления определены.
+
+        Имена родительских состояний могут входить в то же перечисление.
+        """
+        names = {name.value for name in self.__states}
+        names.update(
+            state_names.intersection(
+                parent.name.value
+                for state in self.__states.values()
+                for parent in state.ancestors
+            ),
+        )
+        if len(names) != len(state_names):
+            not_used_states = state_names.difference(names)
+            raise StateMachineError(
+                EXC_NOT_USED_STATES.format(states=not_used_states),
+            )
+
+    def __check_targets(self) -> None:
+        """Проверка известных до запуска переходов."""
+        for state in self.__states.values():
+            for target in state.targets:
+                if target not in self.__states:
+                    raise StateMachineError(
+                        EXC_TARGET_NOT_FOUND.format(
+                            name=state.name,
+                            target=target,
+                        ),
+                    )
@@ -5,3 +5,14 @@ from enum import StrEnum
 
 class StatesEnum(StrEnum):
     """Перечисление состояний."""
+
+
+def as_state(value: object) -> StatesEnum | None:
+    """Состояние для перехода из результата функции.
+
+    Переходом считается только член StatesEnum; другие значения, которые
+    функции возвращали до появления переходов через return, игнорируются.
+    """
+    if isinstance(value, StatesEnum):
+        return value
+    return None
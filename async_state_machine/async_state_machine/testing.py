@@ -0,0 +1,100 @@
+"""Виртуальное время для тестов машин состояний.
+
+Цикл событий VirtualTimeLoop не ждет таймеры в реальном времени: когда
+готовых задач нет, часы цикла сразу переводятся на ближайший таймер.
+Таймауты, периоды и asyncio.sleep любой длительности выполняются за
+миллисекунды, а порядок переходов определяется только временем таймеров.
+
+Пример::
+
+    from async_state_machine import testing
+
+    testing.run(testing.run_for(machine, 3600))
+    assert machine.active_state == States.offline
+"""
+
+import asyncio
+import selectors
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from .state_machine import StateMachine
+
+T = TypeVar("T")
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Селектор, переводящий часы вместо ожидания."""
+
+    def __init__(self, start: float) -> None:
+        super().__init__()
+        self.now: float = start
+
+    def select(
+        self,
+        timeout: float | None = None,
+    ) -> list[tuple[selectors.SelectorKey, int]]:
+        ready = super().select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            # таймеров нет - ждем ввода-вывода или потоков в реальном времени
+            return super().select(None)
+        self.now += timeout
+        return []
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Цикл событий с виртуальными часами.
+
+    Время loop.time() меняется только тогда, когда все задачи ожидают
+    таймеров. Ввод-вывод и функции в потоках (offload) выполняются в
+    реальном времени, и пока они работают, часы могут уйти вперед до
+    следующего таймера. Метрики длительности функций по-прежнему
+    измеряют реальное время.
+
+    Parameters
+    ----------
+    start: float
+        начальное время часов
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        """Цикл событий с виртуальными часами."""
+        self.__selector = _VirtualSelector(start)
+        super().__init__(self.__selector)
+
+    def time(self) -> float:
+        """Виртуальное время."""
+        return self.__selector.now
+
+
+def run(main: Coroutine[Any, Any, T], start: float = 0.0) -> T:
+    """Выполнить корутину в цикле с виртуальными часами.
+
+    Аналог asyncio.run для тестов.
+
+    Parameters
+    ----------
+    main: Coroutine
+        корутина, например StateMachine.run или StateRunner.run
+    start: float
+        начальное время часов
+
+    Returns
+    -------
+    Результат корутины
+    """
+    with asyncio.Runner(loop_factory=lambda: VirtualTimeLoop(start)) as runner:
+        return runner.run(main)
+
+
+async def run_for(machine: StateMachine, duration: float) -> None:
+    """Выполнять машину в течение duration секунд и остановить.
+
+    Ошибки машины, возникшие раньше, генерируются.
+    """
+    try:
+        await asyncio.wait_for(machine.run(), duration)
+    except asyncio.TimeoutError:
+        return
@@ -0,0 +1,268 @@
+"""Хешированное колесо таймеров, общее для многих машин состояний."""
+
+import asyncio
+import math
+from collections.abc import Callable
+from types import TracebackType
+from typing import Final, Self
+
+EXC_WRONG_RESOLUTION: Final[str] = "Resolution must be positive: {value}"
+EXC_WRONG_SLOTS: Final[str] = "Slots count must be positive: {value}"
+
+DEFAULT_RESOLUTION: Final[float] = 0.001
+DEFAULT_SLOTS: Final[int] = 512
+
+
+class TimerEntry(object):
+    """Запись в колесе таймеров."""
+
+    __slots__ = ("__callback", "__wheel", "rounds", "cancelled")
+
+    def __init__(
+        self,
+        callback: Callable[[], None],
+        wheel: "TimerWheel",
+        rounds: int,
+    ) -> None:
+        """Запись в колесе таймеров."""
+        self.__callback: Callable[[], None]
+        self.__wheel: TimerWheel
+        self.rounds: int
+        self.cancelled: bool
+
+        self.__callback = callback
+        self.__wheel = wheel
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Отменить таймер."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.__wheel.discard()
+
+    def fire(self) -> None:
+        """Вызвать функцию таймера."""
+        self.cancelled = True
+        self.__callback()
+
+
+class TimerWheel(object):
+    """Хешированное колесо таймеров.
+
+    Все таймеры обслуживаются одним asyncio.TimerHandle на такт, поэтому
+    стоимость таймеров не растет с количеством машин состояний. Точность
+    срабатывания ограничена разрешением колеса.
+    """
+
+    def __init__(
+        self,
+        resolution: float = DEFAULT_RESOLUTION,
+        slots: int = DEFAULT_SLOTS,
+    ) -> None:
+        """Хешированное колесо таймеров.
+
+        Parameters
+        ----------
+        resolution: float
+            длительность одного такта, с
+        slots: int
+            количество ячеек колеса
+
+        Raises
+        ------
+        ValueError
+            неправильные параметры
+        """
+        self.__resolution: float
+        self.__slots: list[list[TimerEntry]]
+        self.__cursor: int
+        self.__cursor_time: float
+        self.__count: int
+        self.__handle: asyncio.TimerHandle | None
+
+        if resolution <= 0:
+            raise ValueError(EXC_WRONG_RESOLUTION.format(value=resolution))
+        if slots <= 0:
+            raise ValueError(EXC_WRONG_SLOTS.format(value=slots))
+        self.__resolution = resolution
+        self.__slots = [[] for _ in range(slots)]
+        self.__cursor = 0
+        self.__cursor_time = 0
+        self.__count = 0
+        self.__handle = None
+
+    @property
+    def pending(self) -> int:
+        """Количество активных таймеров."""
+        return self.__count
+
+    def call_later(
+        self,
+        delay: float,
+        callback: Callable[[], None],
+    ) -> TimerEntry:
+        """Вызвать функцию через delay секунд.
+
+        Parameters
+        ----------
+        delay: float
+            задержка, с. Округляется вверх до разрешения колеса.
+        callback: Callable[[], None]
+            функция для вызова
+
+        Returns
+        -------
+        Запись таймера, для отмены
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self.__handle is None:
+            self.__cursor_time = now
+        ticks = max(
+            1,
+            math.ceil((now + delay - self.__cursor_time) / self.__resolution),
+        )
+        slots_count = len(self.__slots)
+        entry = TimerEntry(
+            callback=callback,
+            wheel=self,
+            rounds=(ticks - 1) // slots_count,
+        )
+        self.__slots[(self.__cursor + ticks) % slots_count].append(entry)
+        self.__count += 1
+        # такт колеса переносится, если новый таймер раньше запланированного
+        due = self.__cursor_time + min(ticks, slots_count) * self.__resolution
+        if self.__handle is None or due < self.__handle.when():
+            if self.__handle is not None:
+                self.__handle.cancel()
+            self.__handle = loop.call_at(due, self.__tick)
+        return entry
+
+    async def sleep(self, delay: float) -> None:
+        """Аналог asyncio.sleep на общем колесе таймеров."""
+        future = asyncio.get_running_loop().create_future()
+        entry = self.call_later(delay, lambda: _set_done(future))
+        try:
+            await future
+        finally:
+            entry.cancel()
+
+    def timeout(self, delay: float | None) -> "WheelTimeout":
+        """Аналог asyncio.timeout на общем колесе таймеров."""
+        return WheelTimeout(self, delay)
+
+    def discard(self) -> None:
+        """Учесть отмену таймера, вызывается из TimerEntry."""
+        self.__count -= 1
+
+    def __tick(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slots_count = len(self.__slots)
+        while self.__count and self.__cursor_time + self.__resolution <= now:
+            self.__cursor = (self.__cursor + 1) % slots_count
+            self.__cursor_time += self.__resolution
+            self.__slots[self.__cursor] = self.__process(
+                self.__slots[self.__cursor],
+            )
+        if self.__count:
+            self.__handle = loop.call_at(
+                self.__cursor_time + self.__next_gap() * self.__resolution,
+                self.__tick,
+            )
+        else:
+            self.__handle = None
+
+    def __next_gap(self) -> int:
+        """Количество тактов до следующей непустой ячейки.
+
+        Пустые ячейки пропускаются без срабатывания таймера цикла событий;
+        не чаще одного раза за оборот колеса проверяются таймеры следующих
+        оборотов.
+        """
+        slots_count = len(self.__slots)
+        for gap in range(1, slots_count):
+            if self.__slots[(self.__cursor + gap) % slots_count]:
+                return gap
+        return slots_count
+
+    def __process(self, bucket: list[TimerEntry]) -> list[TimerEntry]:
+        """Обработка ячейки, возвращает таймеры следующих оборотов."""
+        remaining: list[TimerEntry] = []
+        for entry in bucket:
+            if entry.cancelled:
+                continue
+            if entry.rounds:
+                entry.rounds -= 1
+                remaining.append(entry)
+                continue
+            self.__count -= 1
+            entry.fire()
+        return remaining
+
+
+class WheelTimeout(object):
+    """Ограничение времени выполнения блока на колесе таймеров."""
+
+    def __init__(self, wheel: TimerWheel, delay: float | None) -> None:
+        """Ограничение времени выполнения блока на колесе таймеров."""
+        self.__wheel: TimerWheel
+        self.__delay: float | None
+        self.__task: asyncio.Task[object] | None
+        self.__cancelling: int
+        self.__entry: TimerEntry | None
+        self.__expired: bool
+
+        self.__wheel = wheel
+        self.__delay = delay
+        self.__task = None
+        self.__cancelling = 0
+        self.__entry = None
+        self.__expired = False
+
+    @property
+    def expired(self) -> bool:
+        """Время истекло."""
+        return self.__expired
+
+    async def __aenter__(self) -> Self:
+        """Запуск таймера."""
+        if self.__delay is not None:
+            self.__task = asyncio.current_task()
+            if self.__task is not None:
+                # отмена, запрошенная до входа, не относится к таймауту
+                self.__cancelling = self.__task.cancelling()
+            self.__entry = self.__wheel.call_later(
+                self.__delay,
+                self.__on_timeout,
+            )
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        """Остановка таймера, отмена задачи превращается в TimeoutError."""
+        if self.__entry is not None:
+            self.__entry.cancel()
+        if not self.__expired or self.__task is None:
+            return
+        uncancelled = self.__task.uncancel()
+        if uncancelled <= self.__cancelling:
+            if exc_type is asyncio.CancelledError:
+                raise TimeoutError from exc_val
+
+    def __on_timeout(self) -> None:
+        if self.__task is None:
+            return
+        self.__expired = True
+        self.__task.cancel()
+
+
+def _set_done(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,528 @@
+"""Запись и разбор трассировки выполнения машины состояний."""
+
+import asyncio
+import struct
+from collections.abc import Iterable
+from enum import IntEnum
+from types import TracebackType
+from typing import BinaryIO, Final, NamedTuple, Self
+
+from .exceptions import StateMachineError
+from .history import TransitionCause
+from .snapshot import NO_STATE, StateTable
+from .states_enum import StatesEnum
+
+EXC_WRONG_TRACE: Final[str] = "Wrong trace file: {path}"
+
+TRACE_MAGIC: Final[bytes] = b"ASMT"
+TRACE_VERSION: Final[int] = 1
+STAGES: Final[tuple[str, ...]] = ("on_enter", "on_run", "on_exit")
+DEFAULT_TOP: Final[int] = 10
+
+# magic, версия, количество состояний
+_HEADER: Final[struct.Struct] = struct.Struct("<4sBH")
+# длина имени состояния
+_NAME: Final[struct.Struct] = struct.Struct("<B")
+# время, вид записи, стадия или причина, состояние, новое состояние
+_RECORD: Final[struct.Struct] = struct.Struct("<dBBHH")
+
+
+class TraceKind(IntEnum):
+    """Вид записи трассировки."""
+
+    start = 0
+    stage_start = 1
+    stage_end = 2
+    timeout = 3
+    transition = 4
+
+
+class TraceEvent(NamedTuple):
+    """Запись трассировки.
+
+    Для записей стадий заполнено stage, для переходов - new_state и
+    cause. Для start state - начальное состояние.
+    """
+
+    time: float
+    kind: TraceKind
+    state: str
+    stage: str | None
+    new_state: str | None
+    cause: TransitionCause | None
+
+
+class TraceRecorder(object):
+    """Запись трассировки машины в двоичный файл.
+
+    Записи фиксированного размера дописываются в буферизованный файл по
+    мере выполнения: начало и конец стадий, таймауты и переходы. Время -
+    loop.time(). Файл читается read_trace, отчет - analyze_trace или
+    python -m async_state_machine.
+
+    Закрытый файл открывается для дописывания при следующем start, поэтому
+    машина закрывает его по завершении run и продолжает запись при
+    повторном запуске. Используется и как контекстный менеджер.
+
+    Parameters
+    ----------
+    path: str
+        путь к файлу трассировки
+    states: Iterable[StatesEnum]
+        все состояния машины, включая родительские
+    """
+
+    __slots__ = ("__path", "__file", "__table")
+
+    def __init__(self, path: str, states: Iterable[StatesEnum]) -> None:
+        """Запись трассировки машины в двоичный файл."""
+        self.__path: str
+        self.__file: BinaryIO
+        self.__table: StateTable
+
+        self.__path = path
+        self.__table = StateTable(states)
+        names = [state.name.encode() for state in self.__table.states]
+        self.__file = open(path, "wb")  # noqa: WPS515, SIM115
+        self.__file.write(
+            _HEADER.pack(TRACE_MAGIC, TRACE_VERSION, len(names)),
+        )
+        for name in names:
+            self.__file.write(_NAME.pack(len(name)))
+            self.__file.write(name)
+
+    def __enter__(self) -> Self:
+        """Запись до выхода из блока with."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Закрыть файл трассировки."""
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """Файл трассировки закрыт."""
+        return self.__file.closed
+
+    def start(self, state: StatesEnum) -> None:
+        """Запуск машины из состояния state.
+
+        Закрытый файл открывается для дописывания.
+        """
+        if self.__file.closed:
+            self.__file = open(self.__path, "ab")  # noqa: WPS515, SIM115
+        self.__write(TraceKind.start, 0, state, None)
+
+    def stage_start(self, state: StatesEnum, stage: str) -> None:
+        """Начало стадии."""
+        self.__write(TraceKind.stage_start, STAGES.index(stage), state, None)
+
+    def stage_end(self, state: StatesEnum, stage: str) -> None:
+        """Конец стадии, в том числе отмененной или с ошибкой."""
+        self.__write(TraceKind.stage_end, STAGES.index(stage), state, None)
+
+    def timeout(self, state: StatesEnum, stage: str) -> None:
+        """Таймаут стадии."""
+        self.__write(TraceKind.timeout, STAGES.index(stage), state, None)
+
+    def transition(
+        self,
+        active_state: StatesEnum | None,
+        new_state: StatesEnum,
+        cause: TransitionCause,
+    ) -> None:
+        """Переход между состояниями."""
+        self.__write(TraceKind.transition, cause, active_state, new_state)
+
+    def flush(self) -> None:
+        """Записать буфер в файл."""
+        self.__file.flush()
+
+    def close(self) -> None:
+        """Закрыть файл трассировки. Повторный вызов ничего не делает."""
+        self.__file.close()
+
+    def __write(
+        self,
+        kind: TraceKind,
+        code: int,
+        state: StatesEnum | None,
+        new_state: StatesEnum | None,
+    ) -> None:
+        self.__file.write(
+            _RECORD.pack(
+                asyncio.get_running_loop().time(),
+                kind,
+                code,
+                self.__table.index(state),
+                self.__table.index(new_state),
+            ),
+        )
+
+
+def read_trace(path: str) -> list[TraceEvent]:
+    """Прочитать файл трассировки.
+
+    Неполная последняя запись, например после аварийной остановки,
+    отбрасывается.
+
+    Raises
+    ------
+    StateMachineError
+        файл не является трассировкой
+    """
+    with open(path, "rb") as trace_file:
+        data = memoryview(trace_file.read())
+    try:
+        magic, version, count = _HEADER.unpack_from(data)
+    except struct.error:
+        raise StateMachineError(EXC_WRONG_TRACE.format(path=path)) from None
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise StateMachineError(EXC_WRONG_TRACE.format(path=path))
+    position = _HEADER.size
+    names: list[str] = []
+    for _ in range(count):
+        (size,) = _NAME.unpack_from(data, position)
+        position += _NAME.size
+        names.append(bytes(data[position:position + size]).decode())
+        position += size
+    end = position + (len(data) - position) // _RECORD.size * _RECORD.size
+    try:
+        return [
+            _decode_record(names, fields)
+            for fields in _RECORD.iter_unpack(data[position:end])
+        ]
+    except (IndexError, ValueError):
+        raise StateMachineError(EXC_WRONG_TRACE.format(path=path)) from None
+
+
+class StateStats(NamedTuple):
+    """Время в состоянии."""
+
+    state: str
+    visits: int
+    total: float
+    max: float
+
+
+class StageStats(NamedTuple):
+    """Время выполнения стадии."""
+
+    state: str
+    stage: str
+    runs: int
+    timeouts: int
+    total: float
+    max: float
+
+
+class TransitionStats(NamedTuple):
+    """Время в состоянии active_state перед переходом в new_state."""
+
+    active_state: str
+    new_state: str
+    transitions: int
+    total: float
+
+
+class PathSegment(NamedTuple):
+    """Участок критического пути.
+
+    segment - стадия "state|stage" или переход "state -> new_state",
+    intervals - количество интервалов участка, share - доля времени
+    трассировки.
+    """
+
+    segment: str
+    intervals: int
+    total: float
+    share: float
+
+
+class TransitionLatency(NamedTuple):
+    """Задержка перехода.
+
+    От завершения стадии, запросившей переход, до начала первой стадии
+    после перехода: включает on_exit и паузу политики переходов.
+    """
+
+    time: float
+    active_state: str
+    new_state: str
+    cause: TransitionCause
+    latency: float
+
+
+class TraceReport(NamedTuple):
+    """Отчет по трассировке."""
+
+    duration: float
+    states: tuple[StateStats, ...]
+    stages: tuple[StageStats, ...]
+    critical_path: tuple[PathSegment, ...]
+    slowest_transitions: tuple[TransitionStats, ...]
+    worst_latencies: tuple[TransitionLatency, ...]
+
+
+def analyze_trace(
+    events: Iterable[TraceEvent],
+    top: int = DEFAULT_TOP,
+) -> TraceReport:
+    """Отчет по трассировке без повторного выполнения функций.
+
+    Parameters
+    ----------
+    events: Iterable[TraceEvent]
+        записи read_trace
+    top: int
+        количество записей в critical_path, slowest_transitions и
+        worst_latencies
+
+    Returns
+    -------
+    Время по состояниям и стадиям, критический путь, переходы, на которые
+    приходится больше всего времени (slowest_transitions), и наибольшие
+    задержки переходов
+
+    Критический путь - цепочка интервалов, которые последовательно
+    определяют время работы машины: стадии активного состояния, on_enter
+    и on_exit родителей и промежутки переходов без стадий. on_run
+    родителя выполняется параллельно с дочерними состояниями и в путь не
+    входит. В отчете интервалы сгруппированы по участкам и упорядочены по
+    суммарному времени.
+    """
+    analyzer = _Analyzer()
+    for event in events:
+        analyzer.feed(event)
+    return analyzer.report(top)
+
+
+class _Analyzer(object):
+    """Накопление статистики по записям трассировки."""
+
+    __slots__ = (
+        "__first",
+        "__last",
+        "__active",
+        "__entered",
+        "__decided",
+        "__pending_decided",
+        "__pending",
+        "__stage_starts",
+        "__states",
+        "__stages",
+        "__timeouts",
+        "__transitions",
+        "__latencies",
+        "__open",
+        "__path",
+        "__path_last",
+    )
+
+    def __init__(self) -> None:
+        self.__first: float | None = None
+        self.__last = 0.0
+        self.__active: str | None = None
+        self.__entered = 0.0
+        self.__decided = 0.0
+        self.__pending: TraceEvent | None = None
+        self.__pending_decided = 0.0
+        self.__stage_starts: dict[tuple[str, str], float] = {}
+        self.__states: dict[str, list[float]] = {}
+        self.__stages: dict[tuple[str, str], list[float]] = {}
+        self.__timeouts: dict[tuple[str, str], int] = {}
+        self.__transitions: dict[tuple[str, str], list[float]] = {}
+        self.__latencies: list[TransitionLatency] = []
+        self.__open: list[tuple[str, str]] = []
+        self.__path: dict[str, list[float]] = {}
+        self.__path_last: str | None = None
+
+    def feed(self, event: TraceEvent) -> None:
+        if self.__first is None:
+            self.__first = event.time
+        previous = self.__last
+        self.__last = event.time
+        self.__path_interval(event, previous)
+        if event.kind == TraceKind.start:
+            # повторный запуск машины завершает предыдущее посещение
+            if self.__active is not None:
+                self.__leave(previous)
+            self.__open.clear()
+            self.__stage_starts.clear()
+            self.__path_last = None
+            self.__enter(event.state, event.time)
+        elif event.kind == TraceKind.transition:
+            self.__transition(event)
+        elif event.stage is not None:
+            self.__stage(event, event.stage)
+
+    def report(self, top: int) -> TraceReport:
+        if self.__pending is not None:
+            self.__latency(self.__pending.time)
+        if self.__active is not None:
+            self.__leave(self.__last)
+        return TraceReport(
+            duration=self.__last - (self.__first or 0),
+            states=tuple(
+                StateStats(state, len(times), sum(times), max(times))
+                for state, times in sorted(self.__states.items())
+            ),
+            stages=tuple(
+                StageStats(
+                    state=key[0],
+                    stage=key[1],
+                    runs=len(times),
+                    timeouts=self.__timeouts.get(key, 0),
+                    total=sum(times),
+                    max=max(times),
+                )
+                for key, times in sorted(self.__stages.items())
+            ),
+            critical_path=self.__critical_path(top),
+            slowest_transitions=tuple(
+                sorted(
+                    (
+                        TransitionStats(
+                            key[0],
+                            key[1],
+                            len(times),
+                            sum(times),
+                        )
+                        for key, times in self.__transitions.items()
+                    ),
+                    key=lambda transition: transition.total,
+                    reverse=True,
+                )[:top],
+            ),
+            worst_latencies=tuple(
+                sorted(
+                    self.__latencies,
+                    key=lambda latency: latency.latency,
+                    reverse=True,
+                )[:top],
+            ),
+        )
+
+    def __critical_path(self, top: int) -> tuple[PathSegment, ...]:
+        duration = self.__last - (self.__first or 0)
+        segments = sorted(
+            self.__path.items(),
+            key=lambda item: sum(item[1]),
+            reverse=True,
+        )
+        return tuple(
+            PathSegment(
+                segment=segment,
+                intervals=len(times),
+                total=sum(times),
+                share=sum(times) / duration if duration else 0,
+            )
+            for segment, times in segments[:top]
+        )
+
+    def __path_interval(self, event: TraceEvent, previous: float) -> None:
+        """Отнести интервал до записи event к участку критического пути."""
+        if event.time <= previous or self.__active is None:
+            return
+        segment = self.__path_segment(event)
+        if segment is None:
+            return
+        times = self.__path.setdefault(segment, [])
+        if times and self.__path_last == segment:
+            times[-1] += event.time - previous
+        else:
+            times.append(event.time - previous)
+        self.__path_last = segment
+
+    def __path_segment(self, event: TraceEvent) -> str | None:
+        """Участок, который выполнялся перед записью event."""
+        for state, stage in reversed(self.__open):
+            if state == self.__active or stage != "on_run":
+                return f"{state}|{stage}"
+        transition = self.__pending
+        if transition is None and event.kind == TraceKind.transition:
+            transition = event
+        if transition is None or event.kind == TraceKind.start:
+            return None
+        return f"{transition.state} -> {transition.new_state}"
+
+    def __enter(self, state: str, time: float) -> None:
+        self.__active = state
+        self.__entered = time
+        self.__decided = time
+
+    def __leave(self, time: float) -> float:
+        assert self.__active is not None  # noqa: S101
+        duration = time - self.__entered
+        self.__states.setdefault(self.__active, []).append(duration)
+        return duration
+
+    def __transition(self, event: TraceEvent) -> None:
+        assert event.new_state is not None  # noqa: S101
+        if self.__active is not None:
+            duration = self.__leave(event.time)
+            self.__transitions.setdefault(
+                (event.state, event.new_state),
+                [],
+            ).append(duration)
+        self.__pending = event
+        self.__pending_decided = self.__decided
+        self.__enter(event.new_state, event.time)
+
+    def __stage(self, event: TraceEvent, stage: str) -> None:
+        key = (event.state, stage)
+        if event.kind == TraceKind.stage_start:
+            if self.__pending is not None:
+                self.__latency(event.time)
+            self.__stage_starts[key] = event.time
+            self.__open.append(key)
+        elif event.kind == TraceKind.timeout:
+            self.__timeouts[key] = self.__timeouts.get(key, 0) + 1
+        elif key in self.__stage_starts:
+            self.__open.remove(key)
+            start = self.__stage_starts.pop(key)
+            self.__stages.setdefault(key, []).append(event.time - start)
+            if event.state == self.__active and stage != "on_exit":
+                self.__decided = event.time
+
+    def __latency(self, time: float) -> None:
+        transition = self.__pending
+        assert transition is not None  # noqa: S101
+        assert transition.new_state is not None  # noqa: S101
+        assert transition.cause is not None  # noqa: S101
+        self.__latencies.append(
+            TransitionLatency(
+                time=transition.time,
+                active_state=transition.state,
+                new_state=transition.new_state,
+                cause=transition.cause,
+                latency=time - self.__pending_decided,
+            ),
+        )
+        self.__pending = None
+
+
+def _decode_record(
+    names: list[str],
+    fields: tuple[float, int, int, int, int],
+) -> TraceEvent:
+    time, kind, code, state, new_state = fields
+    trace_kind = TraceKind(kind)
+    is_transition = trace_kind == TraceKind.transition
+    return TraceEvent(
+        time=time,
+        kind=trace_kind,
+        state="" if state == NO_STATE else names[state],
+        stage=(
+            STAGES[code]
+            if trace_kind not in {TraceKind.start, TraceKind.transition}
+            else None
+        ),
+        new_state=None if new_state == NO_STATE else names[new_state],
+        cause=TransitionCause(code) if is_transition else None,
+    )
@@ -0,0 +1,131 @@
+"""Скомпилированный граф переходов."""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Final
+
+from .exceptions import StateMachineError
+from .state import StateRunner
+from .states_enum import StatesEnum
+
+EXC_NAME_NOT_FOUND: Final[str] = "State with name {name} not found."
+EXC_NOT_ALLOWED: Final[
+    str
+] = "Transition from {name} to {target} is not allowed."
+EXC_DEAD_END: Final[str] = "State {name} has no allowed transitions."
+EXC_UNREACHABLE: Final[
+    str
+] = "States unreachable from {name}: {states}"
+
+
+class TransitionGraph(object):
+    """Скомпилированный граф переходов.
+
+    Состояниям присваиваются плотные целочисленные номера, разрешенные
+    переходы каждого состояния хранятся битовой маской. Граф создается и
+    проверяется один раз, переход - индексация кортежа и проверка бита.
+    """
+
+    def __init__(
+        self,
+        states: Mapping[StatesEnum, StateRunner],
+        init_state: StatesEnum,
+    ) -> None:
+        """Скомпилированный граф переходов.
+
+        Parameters
+        ----------
+        states: Mapping[StatesEnum, StateRunner]
+            все состояния машины
+        init_state: StatesEnum
+            начальное состояние, для проверки достижимости
+
+        Raises
+        ------
+        StateMachineError
+            граф содержит тупики или недостижимые состояния
+        """
+        self.__ids: Mapping[StatesEnum, int]
+        self.__runners: tuple[StateRunner, ...]
+        self.__masks: tuple[int | None, ...]
+
+        self.__runners = tuple(states.values())
+        self.__ids = MappingProxyType(
+            {runner.name: index for index, runner in enumerate(self.__runners)},
+        )
+        self.__masks = tuple(
+            self.__compile_mask(runner) for runner in self.__runners
+        )
+        self.__check_dead_ends()
+        if init_state in self.__ids and None not in self.__masks:
+            self.__check_reachability(self.__ids[init_state])
+
+    def id_of(self, name: StatesEnum) -> int:
+        """Номер состояния."""
+        state_id = self.__ids.get(name)
+        if state_id is None:
+            raise StateMachineError(EXC_NAME_NOT_FOUND.format(name=name))
+        return state_id
+
+    def runner(self, state_id: int) -> StateRunner:
+        """Состояние по номеру."""
+        return self.__runners[state_id]
+
+    def next_state(self, active_id: int, new_state: StatesEnum) -> int:
+        """Номер нового состояния, с проверкой разрешенных переходов.
+
+        Raises
+        ------
+        StateMachineError
+            состояние не найдено или переход не разрешен
+        """
+        new_id = self.id_of(new_state)
+        mask = self.__masks[active_id]
+        if mask is not None and not mask >> new_id & 1:
+            raise StateMachineError(
+                EXC_NOT_ALLOWED.format(
+                    name=self.__runners[active_id].name,
+                    target=new_state,
+                ),
+            )
+        return new_id
+
+    def __compile_mask(self, runner: StateRunner) -> int | None:
+        """Битовая маска разрешенных переходов, None - без ограничений."""
+        allowed = runner.allowed_targets
+        if allowed is None:
+            return None
+        mask = 0
+        for target in allowed:
+            mask |= 1 << self.id_of(target)
+        return mask
+
+    def __check_dead_ends(self) -> None:
+        for runner, mask in zip(self.__runners, self.__masks):
+            if mask == 0:
+                raise StateMachineError(EXC_DEAD_END.format(name=runner.name))
+
+    def __check_reachability(self, init_id: int) -> None:
+        visited = 1 << init_id
+        stack = [init_id]
+        while stack:
+            mask = self.__masks[stack.pop()] or 0
+            new_ids = mask & ~visited
+            visited |= new_ids
+            stack.extend(
+                index
+                for index in range(len(self.__runners))
+                if new_ids >> index & 1
+            )
+        unreachable = [
+            runner.name.value
+            for index, runner in enumerate(self.__runners)
+            if not visited >> index & 1
+        ]
+        if unreachable:
+            raise StateMachineError(
+                EXC_UNREACHABLE.format(
+                    name=self.__runners[init_id].name,
+                    states=sorted(unreachable),
+                ),
+            )
@@ -0,0 +1,45 @@
+"""Политика передачи управления циклу событий между переходами."""
+
+from dataclasses import dataclass
+from typing import Final, Self
+
+from .const import INFINITE_CORO_SLEEP
+
+EXC_WRONG_BUDGET: Final[str] = "Transitions budget must be positive: {budget}"
+EXC_WRONG_DELAY: Final[str] = "Delay must not be negative: {delay}"
+
+
+@dataclass(frozen=True)
+class TransitionPolicy(object):
+    """Политика передачи управления циклу событий между переходами.
+
+    После каждых transitions_per_yield переходов StateMachine выполняет
+    asyncio.sleep(delay).
+    """
+
+    delay: float = INFINITE_CORO_SLEEP
+    transitions_per_yield: int = 1
+
+    def __post_init__(self) -> None:
+        """Проверка параметров."""
+        if self.delay < 0:
+            raise ValueError(EXC_WRONG_DELAY.format(delay=self.delay))
+        if self.transitions_per_yield < 1:
+            raise ValueError(
+                EXC_WRONG_BUDGET.format(budget=self.transitions_per_yield),
+            )
+
+    @classmethod
+    def immediate(cls) -> Self:
+        """После каждого перехода только asyncio.sleep(0)."""
+        return cls(delay=0, transitions_per_yield=1)
+
+    @classmethod
+    def fixed_delay(cls, delay: float = INFINITE_CORO_SLEEP) -> Self:
+        """Пауза delay после каждого перехода. Поведение по-умолчанию."""
+        return cls(delay=delay, transitions_per_yield=1)
+
+    @classmethod
+    def budget(cls, transitions: int) -> Self:
+        """asyncio.sleep(0) после каждых transitions переходов."""
+        return cls(delay=0, transitions_per_yield=transitions)
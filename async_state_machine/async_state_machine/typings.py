@@ -1,6 +1,27 @@
 """Типы данных для подксказок типов."""
 
-from collections.abc import Awaitable, Callable, Iterable
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping
+from typing import Any
 
-TCallback = Callable[[], Awaitable[None]]
+from .states_enum import StatesEnum
+
+# функция может вернуть состояние для перехода вместо NewStateException
+# и может принимать контекст машины первым аргументом, см.
+# State.config_pass_context
+TCallback = (
+    Callable[[], Awaitable[StatesEnum | None]]
+    | Callable[[Any], Awaitable[StatesEnum | None]]
+)
 TCallbackCollection = Iterable[TCallback]
+TCoroWrapper = Callable[
+    [TCallback, tuple[Any, ...]],
+    Awaitable[StatesEnum | None],
+]
+TTrigger = (
+    asyncio.Event | asyncio.Queue[Any] | asyncio.Future[Any] | float | int
+)
+# триггер экземпляра машины по ее контексту
+TTriggerFactory = Callable[[Any], TTrigger]
+TEvent = Hashable
+TEventTable = Mapping[TEvent, StatesEnum]
@@ -0,0 +1,73 @@
+"""Запуск набора замеров.
+
+python -m benchmarks [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from importlib import metadata
+from typing import Any
+
+from .suite import BenchmarkResult, run_suite
+
+
+def _package_version() -> str:
+    try:
+        return metadata.version("async_state_machine")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _report(results: list[BenchmarkResult]) -> dict[str, Any]:
+    return {
+        "package_version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": [result._asdict() for result in results],
+    }
+
+
+def _compare(report: dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {item["name"]: item for item in baseline["results"]}
+    for item in report["results"]:
+        base = previous.get(item["name"])
+        if base is None or not base["value"]:
+            continue
+        print(
+            "{0:<40} {1:>12.2f} {2:>12.2f} {3:<4} x{4:.2f}".format(
+                item["name"],
+                base["value"],
+                item["value"],
+                item["unit"],
+                item["value"] / base["value"],
+            ),
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    """Запуск замеров, результат в формате JSON."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--output", help="файл для сохранения результатов")
+    parser.add_argument("--compare", help="файл с результатами для сравнения")
+    args = parser.parse_args()
+
+    report = _report(run_suite())
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text)
+    else:
+        print(text)
+    if args.compare:
+        _compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
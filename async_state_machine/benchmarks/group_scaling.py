@@ -0,0 +1,106 @@
+"""Масштабирование StateMachineGroup: 1k, 10k и 100k машин.
+
+Запуск: python -m benchmarks.group_scaling [количество ...]
+"""
+
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+
+import async_state_machine as sm
+
+from .shared import Counter, ring_machine
+
+MACHINE_COUNTS = (1000, 10000, 100000)
+DURATION = 2.0
+MEMORY_DURATION = 0.2
+
+
+def _build(count: int, counter: Counter) -> tuple[list[sm.StateMachine], int]:
+    """Создание машин, возвращает машины и память на одну машину, байт."""
+    gc.collect()
+    tracemalloc.start()
+    machines = [ring_machine(2, counter) for _ in range(count)]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return machines, memory // count
+
+
+async def _run_tasks(machines: list[sm.StateMachine], duration: float) -> int:
+    """Каждая машина - отдельная задача со своими таймерами.
+
+    Возвращает память, занятую во время работы, байт.
+    """
+    tasks = [asyncio.create_task(machine.run()) for machine in machines]
+    try:
+        await asyncio.sleep(duration)
+        return _traced_memory()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _run_group(machines: list[sm.StateMachine], duration: float) -> int:
+    """Машины в группе, выполняются по шагам из общей очереди.
+
+    Возвращает память, занятую во время работы, байт.
+    """
+    group = sm.StateMachineGroup(machines)
+    task = asyncio.create_task(group.run())
+    try:
+        await asyncio.sleep(duration)
+        return _traced_memory()
+    finally:
+        task.cancel()
+        await asyncio.wait((task,))
+
+
+def _traced_memory() -> int:
+    if not tracemalloc.is_tracing():
+        return 0
+    memory, _ = tracemalloc.get_traced_memory()
+    return memory
+
+
+def _measure(count: int, group: bool) -> None:
+    counter = Counter()
+    machines, memory = _build(count, counter)
+    runner = _run_group if group else _run_tasks
+    # память во время работы - отдельным коротким запуском, tracemalloc
+    # замедляет переходы
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    running = asyncio.run(runner(machines, MEMORY_DURATION)) - baseline
+    tracemalloc.stop()
+    counter.value = 0
+    cpu_start = time.process_time()
+    asyncio.run(runner(machines, DURATION))
+    cpu = time.process_time() - cpu_start
+    print(
+        "{0:>7} machines {1:<6} memory={2:>6} B/machine "
+        "running={3:>6} B/machine transitions/s={4:>9.0f} "
+        "cpu={5:.2f} s".format(
+            count,
+            "group" if group else "tasks",
+            memory,
+            running // count,
+            counter.value / DURATION,
+            cpu,
+        ),
+    )
+
+
+def main() -> None:
+    """Запуск замеров."""
+    counts = [int(arg) for arg in sys.argv[1:]] or MACHINE_COUNTS
+    for count in counts:
+        _measure(count, group=False)
+        _measure(count, group=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Вспомогательные функции для замеров."""
+
+import functools
+
+import async_state_machine as sm
+from async_state_machine.typings import TCallback
+
+
+class Counter(object):
+    """Счетчик вызовов функций on_run."""
+
+    def __init__(self) -> None:
+        """Счетчик вызовов функций on_run."""
+        self.value: int = 0
+
+
+@functools.cache
+def ring_enum(count: int) -> type[sm.StatesEnum]:
+    """Перечисление из count состояний, общее для всех машин."""
+    return sm.StatesEnum(  # pyright: ignore
+        "BenchStates",
+        ["state_{0}".format(index) for index in range(count)],
+    )
+
+
+def ring_states(
+    count: int,
+    counter: Counter | None = None,
+) -> list[sm.State]:
+    """Кольцо из count состояний.
+
+    Функция on_run каждого состояния сразу возвращает следующее состояние.
+    """
+    members = list(ring_enum(count))
+    counter = counter or Counter()
+
+    def make_on_run(target: sm.StatesEnum) -> TCallback:
+        async def on_run() -> sm.StatesEnum:  # noqa: WPS430
+            counter.value += 1
+            return target
+
+        return on_run
+
+    return [
+        sm.State(
+            name=member,
+            on_run=[make_on_run(members[(index + 1) % count])],
+        )
+        for index, member in enumerate(members)
+    ]
+
+
+def ring_machine(
+    count: int,
+    counter: Counter | None = None,
+    states: list[sm.State] | None = None,
+) -> sm.StateMachine:
+    """Машина с кольцом из count состояний.
+
+    Если states не заданы, для машины создаются собственные состояния.
+    """
+    states_enum = ring_enum(count)
+    return sm.StateMachine(
+        states=states or ring_states(count, counter),
+        states_enum=states_enum,
+        init_state=list(states_enum)[0],
+    )
+
+
+def ring_template(count: int) -> sm.StateMachineTemplate:
+    """Шаблон машины с кольцом из count состояний."""
+    states_enum = ring_enum(count)
+    return sm.StateMachineTemplate(
+        states=ring_states(count),
+        states_enum=states_enum,
+        init_state=list(states_enum)[0],
+    )
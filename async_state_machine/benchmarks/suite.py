@@ -0,0 +1,221 @@
+"""Набор замеров производительности.
+
+Каждый замер возвращает BenchmarkResult; результаты сохраняются в JSON для
+сравнения между версиями.
+"""
+
+import asyncio
+import gc
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Final, NamedTuple
+
+import async_state_machine as sm
+from async_state_machine.state.coro_wrappers import CoroWrappers
+from async_state_machine.state.stage_callbacks import StageCallbacks
+from async_state_machine.typings import TCoroWrapper
+
+from .shared import Counter, ring_machine, ring_states, ring_template
+
+DURATION: Final[float] = 1.0
+STAGE_ITERATIONS: Final[int] = 5000
+STAGE_CALLBACKS: Final[tuple[int, ...]] = (0, 1, 5)
+MEMORY_MACHINES: Final[int] = 1000
+
+
+class BenchmarkResult(NamedTuple):
+    """Результат замера."""
+
+    name: str
+    value: float
+    unit: str
+
+
+class _States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+async def _noop() -> None:
+    """Функция без работы."""
+
+
+def transitions_per_second() -> list[BenchmarkResult]:
+    """Количество переходов в секунду без пауз между переходами."""
+
+    async def run() -> int:  # noqa: WPS430
+        counter = Counter()
+        machine = ring_machine(10, counter).config_transition_policy(
+            sm.TransitionPolicy.immediate(),
+        )
+        try:
+            await asyncio.wait_for(machine.run(), DURATION)
+        except asyncio.TimeoutError:
+            pass
+        return counter.value
+
+    return [
+        BenchmarkResult(
+            name="transitions_per_second",
+            value=asyncio.run(run()) / DURATION,
+            unit="1/s",
+        ),
+    ]
+
+
+def stage_overhead() -> list[BenchmarkResult]:
+    """Время StageCallbacks.execute для 0, 1 и N функций.
+
+    Без таймаута и с таймаутом, как у стадий on_enter и on_exit.
+    """
+    results: list[BenchmarkResult] = []
+    for timeout in (None, 2.0):
+        for count in STAGE_CALLBACKS:
+            stage = StageCallbacks(
+                callbacks=[_noop] * count if count else None,
+                timeout=timeout,
+                timeout_to_state=None,
+                name=_States.state_1,
+                stage="on_enter",
+                coro_wrapper=CoroWrappers.single,
+            )
+            elapsed = asyncio.run(_repeat(stage.execute))
+            results.append(
+                BenchmarkResult(
+                    name="stage_overhead[callbacks={0},timeout={1}]".format(
+                        count,
+                        timeout,
+                    ),
+                    value=elapsed / STAGE_ITERATIONS * 1e6,
+                    unit="us",
+                ),
+            )
+    return results
+
+
+def wait_for_cost() -> list[BenchmarkResult]:
+    """Стоимость asyncio.wait_for по сравнению с прямым вызовом."""
+
+    async def direct() -> None:  # noqa: WPS430
+        await _noop()
+
+    async def with_timeout() -> None:  # noqa: WPS430
+        await asyncio.wait_for(_noop(), timeout=1)
+
+    direct_time = asyncio.run(_repeat(direct))
+    timeout_time = asyncio.run(_repeat(with_timeout))
+    return [
+        BenchmarkResult(
+            name="wait_for_overhead",
+            value=(timeout_time - direct_time) / STAGE_ITERATIONS * 1e6,
+            unit="us",
+        ),
+    ]
+
+
+def idle_cpu() -> list[BenchmarkResult]:
+    """Загрузка процессора обертками on_run в простое."""
+    wrappers = (
+        ("infinite", CoroWrappers.infinite),
+        ("triggered", CoroWrappers.triggered(asyncio.Event())),
+    )
+    results: list[BenchmarkResult] = []
+    for name, wrapper in wrappers:
+        cpu_start = time.process_time()
+        asyncio.run(_idle(wrapper))
+        results.append(
+            BenchmarkResult(
+                name="idle_cpu[{0}]".format(name),
+                value=(time.process_time() - cpu_start) / DURATION * 100,
+                unit="%",
+            ),
+        )
+    return results
+
+
+def memory_per_machine() -> list[BenchmarkResult]:
+    """Память на одну машину из двух состояний.
+
+    С собственными объектами State у каждой машины и с общими.
+    """
+    shared = ring_states(2)
+    template = ring_template(2)
+    variants = (
+        ("own_states", lambda: ring_machine(2)),
+        ("shared_states", lambda: ring_machine(2, states=shared)),
+        ("template", lambda: sm.StateMachine.from_template(template)),
+    )
+    results: list[BenchmarkResult] = []
+    for name, factory in variants:
+        gc.collect()
+        tracemalloc.start()
+        machines = [factory() for _ in range(MEMORY_MACHINES)]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del machines  # noqa: WPS420
+        results.append(
+            BenchmarkResult(
+                name="memory_per_machine[{0}]".format(name),
+                value=memory / MEMORY_MACHINES,
+                unit="B",
+            ),
+        )
+    return results
+
+
+def construction_time() -> list[BenchmarkResult]:
+    """Время создания машины из 100 состояний."""
+    shared = ring_states(100)
+    template = ring_template(100)
+    variants = (
+        ("shared_states", lambda: ring_machine(100, states=shared)),
+        ("template", lambda: sm.StateMachine.from_template(template)),
+    )
+    results: list[BenchmarkResult] = []
+    for name, factory in variants:
+        start = time.perf_counter()
+        for _ in range(MEMORY_MACHINES):
+            factory()
+        results.append(
+            BenchmarkResult(
+                name="construction_time[{0}]".format(name),
+                value=(time.perf_counter() - start) / MEMORY_MACHINES * 1e6,
+                unit="us",
+            ),
+        )
+    return results
+
+
+SUITE: Final[tuple[Callable[[], list[BenchmarkResult]], ...]] = (
+    transitions_per_second,
+    stage_overhead,
+    wait_for_cost,
+    idle_cpu,
+    memory_per_machine,
+    construction_time,
+)
+
+
+def run_suite() -> list[BenchmarkResult]:
+    """Выполнить все замеры."""
+    results: list[BenchmarkResult] = []
+    for benchmark in SUITE:
+        results.extend(benchmark())
+    return results
+
+
+async def _repeat(coro_func: Callable[[], Awaitable[object]]) -> float:
+    """Время STAGE_ITERATIONS вызовов, с."""
+    start = time.perf_counter()
+    for _ in range(STAGE_ITERATIONS):
+        await coro_func()
+    return time.perf_counter() - start
+
+
+async def _idle(wrapper: TCoroWrapper) -> None:
+    """Работа обертки в течение DURATION."""
+    try:
+        await asyncio.wait_for(wrapper(_noop), DURATION)
+    except asyncio.TimeoutError:
+        pass
@@ -0,0 +1,42 @@
+"""Задержка перехода в зависимости от количества состояний.
+
+Запуск: python -m benchmarks.transition_latency
+"""
+
+import asyncio
+import time
+
+import async_state_machine as sm
+
+from .shared import Counter, ring_machine
+
+STATE_COUNTS = (10, 100, 1000)
+TRANSITIONS = 2000
+
+
+async def _measure(count: int) -> float:
+    """Среднее время одного перехода, с."""
+    counter = Counter()
+    machine = ring_machine(count, counter).config_transition_policy(
+        sm.TransitionPolicy.immediate(),
+    )
+    task = asyncio.create_task(machine.run())
+    start = time.perf_counter()
+    while counter.value < TRANSITIONS:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    return elapsed / counter.value
+
+
+def main() -> None:
+    """Запуск замеров."""
+    for count in STATE_COUNTS:
+        latency = asyncio.run(_measure(count))
+        print(
+            "states={0:>6} latency={1:.1f} us".format(count, latency * 1e6),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Пропускная способность переходов для разных TransitionPolicy.
+
+Запуск: python -m benchmarks.transition_throughput
+"""
+
+import asyncio
+
+import async_state_machine as sm
+
+from .shared import Counter, ring_machine
+
+DURATION = 1.0
+POLICIES = (
+    ("fixed_delay(1 ms)", sm.TransitionPolicy.fixed_delay()),
+    ("immediate", sm.TransitionPolicy.immediate()),
+    ("budget(10)", sm.TransitionPolicy.budget(10)),
+    ("budget(100)", sm.TransitionPolicy.budget(100)),
+)
+
+
+async def _measure(policy: sm.TransitionPolicy) -> float:
+    """Количество переходов в секунду."""
+    counter = Counter()
+    machine = ring_machine(10, counter).config_transition_policy(policy)
+    try:
+        await asyncio.wait_for(machine.run(), DURATION)
+    except asyncio.TimeoutError:
+        pass
+    return counter.value / DURATION
+
+
+def main() -> None:
+    """Запуск замеров."""
+    for name, policy in POLICIES:
+        throughput = asyncio.run(_measure(policy))
+        print("{0:<20} {1:>10.0f} transitions/s".format(name, throughput))
+
+
+if __name__ == "__main__":
+    main()
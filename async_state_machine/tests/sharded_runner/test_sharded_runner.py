@@ -0,0 +1,153 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Hashable
+from enum import Enum, auto
+
+import pytest
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    idle = sm.enum_auto()
+    working = sm.enum_auto()
+
+
+class Events(Enum):
+    """Перечень событий."""
+
+    start = auto()
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+def make_machine(key: Hashable) -> sm.StateMachine:
+    return sm.StateMachine(
+        states=[
+            sm.State(name=States.idle, on_run=[wait_forever]).config_event(
+                Events.start,
+                States.working,
+            ),
+            sm.State(name=States.working, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.idle,
+    )
+
+
+def _wait_state(
+    runner: sm.ShardedRunner,
+    key: Hashable,
+    state: States,
+) -> sm.StatesEnum:
+    """Состояние машины после перехода, но не дольше 2 с."""
+    active_state = runner.active_state(key)
+    for _ in range(200):
+        if active_state == state:
+            break
+        time.sleep(0.01)
+        active_state = runner.active_state(key)
+    return active_state
+
+
+def test_post_and_query() -> None:
+    """Машины распределяются по процессам и управляются из родителя."""
+    keys = [f"machine_{index}" for index in range(6)]
+    with sm.ShardedRunner(make_machine, workers=2) as runner:
+        for key in keys:
+            runner.add(key)
+        assert sorted(runner.keys()) == keys
+        assert {runner.shard_of(key) for key in keys} <= {0, 1}
+        assert runner.active_state(keys[0]) == States.idle
+
+        runner.post(keys[0], Events.start)
+        assert _wait_state(runner, keys[0], States.working) == States.working
+        assert runner.active_state(keys[1]) == States.idle
+
+        metrics = runner.metrics_snapshot(keys[0])
+        assert metrics is not None
+        assert metrics.transitions[States.idle][States.working] == 1
+
+        runner.remove(keys[0])
+        assert keys[0] not in runner.keys()
+    assert not runner.started
+
+
+def test_errors() -> None:
+    """Ошибки в процессе передаются в родительский процесс."""
+    runner = sm.ShardedRunner(make_machine, workers=1)
+    with pytest.raises(sm.StateMachineError):
+        runner.active_state("missing")
+    with runner:
+        runner.add("machine")
+        with pytest.raises(sm.StateMachineError):
+            runner.add("machine")
+        with pytest.raises(sm.StateMachineError):
+            runner.active_state("missing")
+
+
+def make_faulty_machine(key: Hashable) -> sm.StateMachine:
+    if key == "crash":
+        os._exit(1)  # noqa: WPS437
+    if key == "slow":
+        time.sleep(0.5)
+    return make_machine(key)
+
+
+def test_request_timeout() -> None:
+    """Запрос ждет ответа не дольше timeout, поздний ответ пропускается."""
+    runner = sm.ShardedRunner(make_faulty_machine, workers=1, timeout=0.1)
+    with runner:
+        with pytest.raises(sm.StateMachineError):
+            runner.add("slow")
+        time.sleep(0.5)
+        runner.add("fast")
+        assert runner.active_state("fast") == States.idle
+        assert sorted(runner.keys()) == ["fast", "slow"]
+
+
+def test_dead_worker() -> None:
+    """Запрос к завершившемуся процессу - ошибка, а не ожидание."""
+    with sm.ShardedRunner(make_faulty_machine, workers=1) as runner:
+        with pytest.raises(sm.StateMachineError):
+            runner.add("crash")
+        with pytest.raises(sm.StateMachineError):
+            runner.keys()
+
+
+def test_call() -> None:
+    """Запросы из асинхронного кода выполняются в потоке."""
+
+    async def main(runner: sm.ShardedRunner) -> sm.StatesEnum:
+        await runner.call(runner.add, "machine")
+        return await runner.call(runner.active_state, "machine")
+
+    with sm.ShardedRunner(make_machine, workers=1) as runner:
+        assert asyncio.run(main(runner)) == States.idle
+
+
+def test_shard_of_stable() -> None:
+    """Номер процесса не зависит от PYTHONHASHSEED."""
+    script = (
+        "import async_state_machine as sm;"
+        "runner = sm.ShardedRunner(print, workers=7);"
+        "print([runner.shard_of(f'key_{index}') for index in range(20)])"
+    )
+    shards = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(shards) == 1
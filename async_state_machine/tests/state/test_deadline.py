@@ -0,0 +1,60 @@
+import asyncio
+
+import async_state_machine as sm
+
+from async_state_machine.runtime import Runtime
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+def test_timeout_cancels_callbacks() -> None:
+    """После таймаута стадии все функции отменяются."""
+    calls: list[int] = []
+
+    async def on_run_fast() -> None:
+        calls.append(1)
+
+    async def on_run_slow() -> None:
+        await asyncio.sleep(1000)
+
+    state = sm.State(
+        name=States.state_1,
+        on_run=[on_run_fast, on_run_slow],
+    ).config_timeout_on_run(0.05, States.state_2)
+
+    async def run() -> None:
+        new_state_data = await state.build().execute()
+        assert new_state_data.new_state == States.state_2
+        count = len(calls)
+        await asyncio.sleep(0.02)
+        assert len(calls) == count
+
+    asyncio.run(run())
+
+
+def test_timeout_on_timer_wheel() -> None:
+    """Таймаут стадии на общем колесе таймеров."""
+    calls: list[int] = []
+
+    async def on_run_fast() -> None:
+        calls.append(1)
+
+    async def on_run_slow() -> None:
+        await asyncio.sleep(1000)
+
+    state = sm.State(
+        name=States.state_1,
+        on_run=[on_run_fast, on_run_slow],
+    ).config_timeout_on_run(0.05, States.state_2)
+
+    async def run() -> None:
+        wheel = sm.TimerWheel()
+        runner = state.build()
+        new_state_data = await runner.execute(Runtime(timer_wheel=wheel))
+        assert new_state_data.new_state == States.state_2
+        assert wheel.pending == 0
+
+    asyncio.run(run())
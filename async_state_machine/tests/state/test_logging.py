@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from loguru import logger
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+async def on_run() -> States:
+    return States.state_2
+
+
+def _collect(state: sm.State) -> list[str]:
+    messages: list[str] = []
+    logger.enable("async_state_machine")
+    sink_id = logger.add(messages.append, format="{message}")
+    try:
+        asyncio.run(state.build().execute())
+    finally:
+        logger.remove(sink_id)
+        logger.disable("async_state_machine")
+    return [message.strip() for message in messages]
+
+
+def test_debug_messages() -> None:
+    """Сообщения о стадиях формируются на уровне DEBUG."""
+    state = sm.State(name=States.state_1, on_run=[on_run]).config_logging(
+        logging.DEBUG,
+    )
+    messages = _collect(state)
+    assert "state_1|on_run|start" in messages
+    assert "state_1|on_run|end" in messages
+
+
+def test_messages_suppressed() -> None:
+    """На уровне выше DEBUG сообщения о стадиях не формируются."""
+    state = sm.State(name=States.state_1, on_run=[on_run]).config_logging(
+        logging.INFO,
+    )
+    assert _collect(state) == []
+
+
+def test_runner_config_logging() -> None:
+    """Уровень можно изменить у созданного состояния."""
+    runner = sm.State(name=States.state_1, on_run=[on_run]).build()
+    runner.config_logging(logging.WARNING)
+    messages: list[str] = []
+    logger.enable("async_state_machine")
+    sink_id = logger.add(messages.append, format="{message}")
+    try:
+        asyncio.run(runner.execute())
+    finally:
+        logger.remove(sink_id)
+        logger.disable("async_state_machine")
+    assert messages == []
+
+
+def test_default_no_messages() -> None:
+    """Без config_logging сообщения о стадиях не формируются."""
+    assert _collect(sm.State(name=States.state_1, on_run=[on_run])) == []
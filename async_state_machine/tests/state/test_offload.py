@@ -0,0 +1,107 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import async_state_machine as sm
+from async_state_machine.runtime import Runtime
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+    state_3 = sm.enum_auto()
+
+
+def blocking_to_state_2() -> States:
+    time.sleep(0.05)
+    return States.state_2
+
+
+def by_context(context: int) -> States:
+    return States.state_2 if context == 2 else States.state_3
+
+
+def test_thread_offload_does_not_block_loop() -> None:
+    """Синхронная функция выполняется в потоке, цикл событий свободен."""
+    ticks: list[int] = []
+
+    async def ticker() -> None:
+        while True:  # noqa: WPS457
+            ticks.append(1)
+            await asyncio.sleep(0.005)
+
+    state = sm.State(
+        name=States.state_1,
+        on_run=[sm.offload(blocking_to_state_2)],
+    ).build()
+
+    async def run() -> sm.StatesEnum:
+        task = asyncio.create_task(ticker())
+        new_state_data = await state.execute()
+        task.cancel()
+        return new_state_data.new_state
+
+    assert asyncio.run(run()) == States.state_2
+    assert len(ticks) > 3
+
+
+def test_offload_timeout() -> None:
+    """Таймаут стадии действует и для функции в пуле."""
+
+    def too_long() -> States:
+        time.sleep(0.2)
+        return States.state_2
+
+    state = (
+        sm.State(name=States.state_1, on_run=[sm.offload(too_long)])
+        .config_timeout_on_run(0.02, States.state_3)
+        .build()
+    )
+
+    new_state_data = asyncio.run(state.execute())
+    assert new_state_data.new_state == States.state_3
+
+
+def test_process_offload_with_context() -> None:
+    """Функция в пуле процессов получает контекст машины."""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        state = sm.State(
+            name=States.state_1,
+            on_run=[sm.offload(by_context, pool)],
+        ).config_pass_context().build()
+        new_state_data = asyncio.run(state.execute(Runtime(context=2)))
+    assert new_state_data.new_state == States.state_2
+
+
+def test_loop_lag_monitor() -> None:
+    """Блокирующая функция видна по задержке цикла событий."""
+    monitor = sm.LoopLagMonitor(interval=0.005)
+
+    async def run() -> None:
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(run())
+    assert monitor.max_lag >= 0.03
+    assert monitor.snapshot().samples > 0
+
+
+def test_group_loop_lag() -> None:
+    """Группа измеряет задержку цикла, если это настроено."""
+    group = sm.StateMachineGroup()
+    assert group.loop_lag_snapshot() is None
+    group.config_loop_lag(0.005)
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(group.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    snapshot = group.loop_lag_snapshot()
+    assert snapshot is not None
+    assert snapshot.samples > 0
@@ -1,5 +1,6 @@
 import asyncio
 import async_state_machine as sm
+from async_state_machine import testing
 
 from async_state_machine.state.stage_callbacks import (
     EXC_TIMEOUT_WITHOUT_TARGET,
@@ -36,7 +37,7 @@ def test_timeout_exc() -> None:
     )
 
     try:
-        asyncio.run(state.run())
+        testing.run(state.run())
     except sm.StateMachineError as exc:
         assert exc.message == EXC_TIMEOUT_WITHOUT_TARGET.format(
             base_msg=EXC_TIMEOUT.format(
@@ -60,7 +61,7 @@ def test_timeout_to_state() -> None:
     )
 
     try:
-        asyncio.run(state.run())
+        testing.run(state.run())
     except sm.NewStateException as exc:
         assert exc.exception_data.new_state == States.state_2
 
@@ -102,7 +103,7 @@ def test_callback_infinite() -> None:
     ).build()
 
     try:
-        asyncio.run(asyncio.wait_for(state.run(), 0.2))
+        testing.run(asyncio.wait_for(state.run(), 0.2))
     except sm.NewStateException as exc:
         assert exc.exception_data.new_state == States.state_2
     except asyncio.TimeoutError:
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine.state.coro_wrappers import CoroWrappers
+
+PERIOD = 0.04
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+def _run_periodic(
+    durations: list[float],
+    overrun: str = "skip",
+) -> list[float]:
+    """Моменты вызовов относительно входа в стадию.
+
+    Функция выполняется durations[n] секунд и переходит в state_2 после
+    последнего элемента.
+    """
+    times: list[float] = []
+
+    async def on_run() -> States | None:
+        loop = asyncio.get_running_loop()
+        times.append(loop.time())
+        await asyncio.sleep(durations[len(times) - 1])
+        if len(times) == len(durations):
+            return States.state_2
+        return None
+
+    state = (
+        sm.State(name=States.state_1, on_run=[on_run])
+        .config_period_on_run(PERIOD, overrun)  # type: ignore
+        .build()
+    )
+
+    async def run() -> float:
+        start = asyncio.get_running_loop().time()
+        new_state_data = await state.execute()
+        assert new_state_data.new_state == States.state_2
+        return start
+
+    start = asyncio.run(run())
+    return [moment - start for moment in times]
+
+
+def test_no_drift() -> None:
+    """Время выполнения функции не сдвигает моменты вызовов."""
+    times = _run_periodic([PERIOD / 2] * 6)
+    for index, moment in enumerate(times):
+        assert moment == pytest.approx(index * PERIOD, abs=PERIOD / 2)
+
+
+def test_overrun_skip() -> None:
+    """При опоздании пропущенные вызовы не выполняются."""
+    # второй вызов завершается после 3.5 периода, следующий вызов - в
+    # ближайший момент сетки, без вызовов подряд
+    times = _run_periodic([0, PERIOD * 2.5, 0, 0])
+    grid = round(times[2] / PERIOD)
+    assert grid >= 4
+    assert times[2] == pytest.approx(grid * PERIOD, abs=PERIOD / 4)
+    assert times[3] == pytest.approx((grid + 1) * PERIOD, abs=PERIOD / 4)
+
+
+def test_overrun_catch_up() -> None:
+    """При опоздании пропущенные вызовы выполняются подряд."""
+    times = _run_periodic([0, PERIOD * 2.5, 0, 0, 0], "catch_up")
+    assert times[3] - times[2] < PERIOD / 2
+    assert times[4] == pytest.approx(PERIOD * 4, abs=PERIOD / 2)
+
+
+def test_wrong_config() -> None:
+    """Неверный период или политика."""
+    with pytest.raises(ValueError):
+        CoroWrappers.periodic(0)
+    with pytest.raises(ValueError):
+        CoroWrappers.periodic(PERIOD, "wait")  # type: ignore
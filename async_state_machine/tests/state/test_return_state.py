@@ -0,0 +1,104 @@
+import asyncio
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+    state_3 = sm.enum_auto()
+
+
+def test_on_run_returns_state() -> None:
+    """Функция on_run возвращает новое состояние."""
+
+    async def on_run() -> States:
+        return States.state_2
+
+    state = sm.State(name=States.state_1, on_run=[on_run]).build()
+
+    new_state_data = asyncio.run(state.execute())
+    assert new_state_data.active_state == States.state_1
+    assert new_state_data.new_state == States.state_2
+
+
+def test_run_reraise() -> None:
+    """StateRunner.run генерирует NewStateException для совместимости."""
+
+    async def on_run() -> States:
+        return States.state_2
+
+    state = sm.State(name=States.state_1, on_run=[on_run]).build()
+
+    try:
+        asyncio.run(state.run())
+    except sm.NewStateException as exc:
+        assert exc.exception_data.new_state == States.state_2
+    else:
+        assert False
+
+
+def test_return_cancels_siblings() -> None:
+    """После возврата состояния остальные функции on_run отменяются."""
+    calls: list[int] = []
+
+    async def on_run_sibling() -> None:
+        calls.append(1)
+
+    async def on_run() -> States | None:
+        if len(calls) > 5:
+            return States.state_2
+        return None
+
+    async def run() -> None:
+        state = sm.State(
+            name=States.state_1,
+            on_run=[on_run, on_run_sibling],
+        ).build()
+        await state.execute()
+        count = len(calls)
+        await asyncio.sleep(0.05)
+        assert len(calls) == count
+
+    asyncio.run(run())
+
+
+def test_on_exit_overrides() -> None:
+    """Состояние, возвращенное из on_exit, имеет приоритет."""
+
+    async def on_run() -> States:
+        return States.state_2
+
+    async def on_exit() -> States:
+        return States.state_3
+
+    state = sm.State(
+        name=States.state_1,
+        on_run=[on_run],
+        on_exit=[on_exit],
+    ).build()
+
+    new_state_data = asyncio.run(state.execute())
+    assert new_state_data.new_state == States.state_3
+
+
+def test_non_state_return_ignored() -> None:
+    """Значение, не являющееся состоянием, не вызывает переход."""
+    readings: list[int] = []
+
+    async def read() -> int:
+        readings.append(len(readings))
+        if len(readings) > 3:
+            raise sm.NewStateException(States.state_2)
+        return len(readings)
+
+    async def read_sibling() -> int:
+        await asyncio.sleep(1000)
+        return 0
+
+    for on_run in ([read], [read, read_sibling]):
+        readings.clear()
+        state = sm.State(name=States.state_1, on_run=on_run).build()
+        new_state_data = asyncio.run(state.execute())
+        assert new_state_data.new_state == States.state_2
+        assert len(readings) == 4
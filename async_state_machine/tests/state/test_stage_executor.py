@@ -0,0 +1,135 @@
+import asyncio
+
+import async_state_machine as sm
+
+from async_state_machine.state.coro_wrappers import CoroWrappers
+from async_state_machine.state.stage_callbacks import StageCallbacks
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+def _stage(callbacks, timeout=None, timeout_to_state=None) -> StageCallbacks:
+    return StageCallbacks(
+        callbacks=callbacks,
+        timeout=timeout,
+        timeout_to_state=timeout_to_state,
+        name=States.state_1,
+        stage="on_enter",
+        coro_wrapper=CoroWrappers.single,
+    )
+
+
+def test_empty_stage() -> None:
+    """Стадия без функций завершается без перехода."""
+    assert asyncio.run(_stage(None).execute()) is None
+    assert asyncio.run(_stage([]).execute()) is None
+
+
+def test_single_in_current_task() -> None:
+    """Одна функция выполняется в задаче вызывающего кода."""
+    tasks: list[asyncio.Task[object] | None] = []
+
+    async def callback() -> States:
+        tasks.append(asyncio.current_task())
+        return States.state_2
+
+    async def run() -> None:
+        new_state_data = await _stage([callback]).execute()
+        assert new_state_data is not None
+        assert new_state_data.new_state == States.state_2
+        assert tasks == [asyncio.current_task()]
+
+    asyncio.run(run())
+
+
+def test_single_timeout() -> None:
+    """Таймаут одной функции."""
+
+    async def callback() -> None:
+        await asyncio.sleep(1000)
+
+    stage = _stage([callback], timeout=0.01, timeout_to_state=States.state_2)
+    new_state_data = asyncio.run(stage.execute())
+    assert new_state_data is not None
+    assert new_state_data.new_state == States.state_2
+
+
+def test_many_in_separate_tasks() -> None:
+    """Несколько функций выполняются в отдельных задачах."""
+    tasks: list[asyncio.Task[object] | None] = []
+
+    async def callback() -> None:
+        tasks.append(asyncio.current_task())
+
+    async def run() -> None:
+        assert await _stage([callback, callback]).execute() is None
+        assert asyncio.current_task() not in tasks
+        assert len(set(tasks)) == 2
+
+    asyncio.run(run())
+
+
+def _sibling(stopped: list[str]):
+    async def sibling() -> None:
+        try:
+            await asyncio.sleep(1000)
+        finally:
+            stopped.append("sibling")
+
+    return sibling
+
+
+def test_transition_cancels_siblings() -> None:
+    """Переход отменяет остальные функции до завершения стадии."""
+    stopped: list[str] = []
+
+    async def to_state_2() -> None:
+        await asyncio.sleep(0)
+        raise sm.NewStateException(States.state_2)
+
+    async def run() -> None:
+        stage = _stage([_sibling(stopped), to_state_2, _sibling(stopped)])
+        new_state_data = await stage.execute()
+        assert new_state_data is not None
+        assert new_state_data.new_state == States.state_2
+        assert stopped == ["sibling", "sibling"]
+        assert len(asyncio.all_tasks()) == 1
+
+    asyncio.run(run())
+
+
+def test_error_cancels_siblings() -> None:
+    """Исключение отменяет остальные функции и передается без группы."""
+    stopped: list[str] = []
+
+    async def failing() -> None:
+        raise RuntimeError("callback error")
+
+    async def run() -> None:
+        stage = _stage([failing, _sibling(stopped)])
+        try:
+            await stage.execute()
+        except RuntimeError as exc:
+            assert str(exc) == "callback error"
+        else:
+            assert False
+        assert stopped == ["sibling"]
+
+    asyncio.run(run())
+
+
+def test_first_declared_wins() -> None:
+    """Одновременные результаты выбираются по порядку объявления."""
+
+    async def to_state_1() -> States:
+        return States.state_1
+
+    async def to_state_2() -> States:
+        return States.state_2
+
+    new_state_data = asyncio.run(_stage([to_state_2, to_state_1]).execute())
+    assert new_state_data is not None
+    assert new_state_data.new_state == States.state_2
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from typing import Any
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine.state.coro_wrappers import EXC_WRONG_TRIGGER
+
+
+class States(sm.StatesEnum):
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+def test_event_trigger() -> None:
+    """Функция on_run вызывается только после установки события."""
+    calls: list[int] = []
+
+    async def on_run() -> None:
+        calls.append(1)
+        if len(calls) == 2:
+            raise sm.NewStateException(States.state_2)
+
+    async def run() -> None:
+        event = asyncio.Event()
+        state = (
+            sm.State(name=States.state_1, on_run=[on_run])
+            .config_trigger_on_run(event)
+            .build()
+        )
+        task = asyncio.create_task(state.run())
+        await asyncio.sleep(0.05)
+        assert calls == []
+        event.set()
+        await asyncio.sleep(0.01)
+        assert calls == [1]
+        event.set()
+        try:
+            await task
+        except sm.NewStateException as exc:
+            assert exc.exception_data.new_state == States.state_2
+
+    asyncio.run(run())
+
+
+def test_queue_trigger() -> None:
+    """Функция on_run вызывается на каждый элемент очереди."""
+    calls: list[int] = []
+
+    async def on_run() -> None:
+        calls.append(1)
+        if len(calls) == 3:
+            raise sm.NewStateException(States.state_2)
+
+    async def run() -> None:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        state = (
+            sm.State(name=States.state_1, on_run=[on_run])
+            .config_trigger_on_run(queue)
+            .build()
+        )
+        for item in range(3):
+            queue.put_nowait(item)
+        try:
+            await state.run()
+        except sm.NewStateException as exc:
+            assert exc.exception_data.new_state == States.state_2
+        assert queue.empty()
+
+    asyncio.run(run())
+
+
+def test_future_trigger() -> None:
+    """Функция on_run вызывается один раз после завершения future."""
+    calls: list[int] = []
+
+    async def on_run() -> None:
+        calls.append(1)
+
+    async def run() -> None:
+        future: asyncio.Future[None] = asyncio.Future()
+        state = (
+            sm.State(name=States.state_1, on_run=[on_run])
+            .config_trigger_on_run(future)
+            .config_timeout_on_run(0.1, States.state_2)
+            .build()
+        )
+        asyncio.get_running_loop().call_later(0.01, future.set_result, None)
+        try:
+            await state.run()
+        except sm.NewStateException as exc:
+            assert exc.exception_data.new_state == States.state_2
+        assert calls == [1]
+
+    asyncio.run(run())
+
+
+def test_idle_cpu() -> None:
+    """В простое обертка с триггером не нагружает процессор."""
+
+    async def on_run() -> None:
+        pass
+
+    state = (
+        sm.State(name=States.state_1, on_run=[on_run])
+        .config_trigger_on_run(asyncio.Event())
+        .config_timeout_on_run(0.3, States.state_2)
+        .build()
+    )
+    start = time.process_time()
+    try:
+        asyncio.run(state.run())
+    except sm.NewStateException:
+        pass
+    assert time.process_time() - start < 0.1
+
+
+class Context(object):
+    """Данные экземпляра машины."""
+
+    def __init__(self) -> None:
+        self.event = asyncio.Event()
+        self.calls = 0
+
+
+def test_trigger_factory_per_machine() -> None:
+    """Функция-триггер дает каждой машине шаблона свой триггер."""
+
+    async def on_run(context: Context) -> States:
+        context.calls += 1
+        return States.state_2
+
+    async def wait_forever() -> None:
+        await asyncio.sleep(1000)
+
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=States.state_1, on_run=[on_run])
+            .config_pass_context()
+            .config_trigger_on_run(lambda context: context.event),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    first = sm.StateMachine.from_template(template, Context())
+    second = sm.StateMachine.from_template(template, Context())
+
+    async def run() -> None:
+        tasks = [
+            asyncio.create_task(first.run()),
+            asyncio.create_task(second.run()),
+        ]
+        await asyncio.sleep(0.01)
+        first.context.event.set()
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+
+    asyncio.run(run())
+    assert first.active_state == States.state_2
+    assert first.context.calls == 1
+    assert second.active_state == States.state_1
+    assert second.context.calls == 0
+
+
+def test_queue_items_distributed() -> None:
+    """При нескольких функциях один элемент очереди - один вызов."""
+    calls: list[str] = []
+
+    def make_on_run(name: str):
+        async def on_run() -> None:
+            calls.append(name)
+
+        return on_run
+
+    async def run() -> None:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        state = (
+            sm.State(
+                name=States.state_1,
+                on_run=[make_on_run("a"), make_on_run("b")],
+            )
+            .config_trigger_on_run(queue)
+            .config_timeout_on_run(0.05, States.state_2)
+            .build()
+        )
+        for item in range(4):
+            queue.put_nowait(item)
+        await state.execute()
+
+    asyncio.run(run())
+    assert len(calls) == 4
+
+
+def test_wrong_trigger() -> None:
+    """Триггер неподдерживаемого типа отклоняется с TypeError."""
+
+    async def on_run() -> None:
+        pass
+
+    trigger: Any = "1"
+    state = sm.State(name=States.state_1, on_run=[on_run])
+    with pytest.raises(TypeError) as exc:
+        state.config_trigger_on_run(trigger)
+    assert str(exc.value) == EXC_WRONG_TRIGGER.format(trigger="1")
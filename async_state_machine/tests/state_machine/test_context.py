@@ -0,0 +1,124 @@
+import asyncio
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+class Context(object):
+    """Данные экземпляра машины."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.counter = 0
+
+
+async def count(context: Context) -> States | None:
+    context.counter += 1
+    if context.counter >= context.limit:
+        return States.state_2
+    return None
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+def test_context_per_instance() -> None:
+    """Машины одного шаблона получают собственный контекст."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=States.state_1, on_run=[count])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    context_1 = Context(limit=2)
+    context_2 = Context(limit=3)
+    machine_1 = sm.StateMachine.from_template(template, context=context_1)
+    machine_2 = sm.StateMachine.from_template(template, context=context_2)
+
+    async def run_for(machine: sm.StateMachine) -> None:
+        try:
+            await asyncio.wait_for(machine.run(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run() -> None:
+        await asyncio.gather(run_for(machine_1), run_for(machine_2))
+
+    asyncio.run(run())
+    assert machine_1.context is context_1
+    assert machine_1.active_state == States.state_2
+    assert machine_2.active_state == States.state_2
+    assert context_1.counter == 2
+    assert context_2.counter == 3
+
+
+def test_context_opt_in() -> None:
+    """Без config_pass_context функции вызываются без контекста."""
+    context = Context(limit=1)
+    calls: list[tuple[object, ...]] = []
+
+    async def variadic(*args: object) -> None:
+        calls.append(args)
+
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[count])
+            .config_pass_context(),
+            sm.State(
+                name=States.state_2,
+                on_enter=[variadic],
+                on_run=[wait_forever],
+            ),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+        context=context,
+    )
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(machine.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert calls == [()]
+    assert context.counter == 1
+    assert machine.active_state == States.state_2
+
+
+def test_config_context() -> None:
+    """Контекст можно заменить после создания машины."""
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[count])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    assert machine.context is None
+    context = Context(limit=1)
+    machine.config_context(context)
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(machine.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert machine.context is context
+    assert context.counter == 1
+    assert machine.active_state == States.state_2
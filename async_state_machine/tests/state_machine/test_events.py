@@ -0,0 +1,154 @@
+import asyncio
+from enum import Enum, auto
+
+import pytest
+
+import async_state_machine as sm
+
+from async_state_machine.state_machine import EXC_EVENTS_QUEUE_FULL
+from async_state_machine.state_machine_template import EXC_TARGET_NOT_FOUND
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    idle = sm.enum_auto()
+    working = sm.enum_auto()
+    stopped = sm.enum_auto()
+
+
+class Events(Enum):
+    """Перечень событий."""
+
+    start = auto()
+    stop = auto()
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+def test_send() -> None:
+    """Переход по внешнему событию."""
+
+    async def run() -> None:
+        state_machine = sm.StateMachine(
+            states=[
+                sm.State(name=States.idle, on_run=[wait_forever])
+                .config_event(Events.start, States.working),
+                sm.State(name=States.working, on_run=[wait_forever])
+                .config_event(Events.stop, States.stopped),
+                sm.State(name=States.stopped, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.idle,
+        ).config_transition_policy(sm.TransitionPolicy.immediate())
+        task = asyncio.create_task(state_machine.run())
+        await state_machine.send(Events.start)
+        await asyncio.sleep(0.01)
+        assert state_machine.active_state == States.working
+        state_machine.post(Events.stop)
+        await asyncio.sleep(0.01)
+        assert state_machine.active_state == States.stopped
+        task.cancel()
+
+    asyncio.run(run())
+
+
+def test_ignored_event() -> None:
+    """Событие без перехода в активном состоянии отбрасывается."""
+
+    async def run() -> None:
+        state_machine = sm.StateMachine(
+            states=[
+                sm.State(name=States.idle, on_run=[wait_forever])
+                .config_event(Events.start, States.working),
+                sm.State(name=States.working, on_run=[wait_forever])
+                .config_event(Events.stop, States.stopped),
+                sm.State(name=States.stopped, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.idle,
+        ).config_transition_policy(sm.TransitionPolicy.immediate())
+        task = asyncio.create_task(state_machine.run())
+        await state_machine.send_many([Events.stop, Events.start])
+        await asyncio.sleep(0.01)
+        assert state_machine.active_state == States.working
+        task.cancel()
+
+    asyncio.run(run())
+
+
+def test_queue_full() -> None:
+    """Переполнение очереди событий."""
+    state_machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.idle, on_run=[wait_forever])
+            .config_event(Events.start, States.working),
+            sm.State(name=States.working, on_run=[wait_forever]),
+            sm.State(name=States.stopped, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.idle,
+    ).config_events_queue(1)
+    state_machine.post(Events.start)
+    with pytest.raises(sm.StateMachineError) as exc:
+        state_machine.post(Events.stop)
+    assert exc.value.message == EXC_EVENTS_QUEUE_FULL.format(
+        event=Events.stop,
+    )
+
+
+def test_unknown_event_target() -> None:
+    """Переход по событию в неизвестное состояние."""
+
+    class OtherStates(sm.StatesEnum):
+        other = sm.enum_auto()
+
+    with pytest.raises(sm.StateMachineError) as exc:
+        sm.StateMachine(
+            states=[
+                sm.State(name=States.idle, on_run=[wait_forever]).config_event(
+                    Events.start,
+                    OtherStates.other,
+                ),
+                sm.State(name=States.working, on_run=[wait_forever]),
+                sm.State(name=States.stopped, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.idle,
+        )
+    assert exc.value.message == EXC_TARGET_NOT_FOUND.format(
+        name=States.idle,
+        target=OtherStates.other,
+    )
+
+
+def test_event_dropped_in_state_without_events() -> None:
+    """Событие в состоянии без переходов по событиям отбрасывается."""
+
+    async def to_working() -> States:
+        await asyncio.sleep(0.02)
+        return States.working
+
+    async def run() -> None:
+        state_machine = sm.StateMachine(
+            states=[
+                sm.State(name=States.idle, on_run=[to_working]),
+                sm.State(
+                    name=States.working,
+                    on_run=[wait_forever],
+                ).config_event(Events.stop, States.stopped),
+                sm.State(name=States.stopped, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.idle,
+        )
+        task = asyncio.create_task(state_machine.run())
+        await asyncio.sleep(0.005)
+        state_machine.post(Events.stop)
+        await asyncio.sleep(0.05)
+        assert state_machine.active_state == States.working
+        task.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import async_state_machine as sm
+
+from async_state_machine.transition_graph import (
+    EXC_DEAD_END,
+    EXC_NOT_ALLOWED,
+    EXC_UNREACHABLE,
+)
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+    state_3 = sm.enum_auto()
+
+
+async def to_state_2() -> States:
+    return States.state_2
+
+
+async def to_state_3() -> States:
+    return States.state_3
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+def test_declared_graph() -> None:
+    """Переходы по объявленному графу."""
+    state_machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2]).config_targets(
+                States.state_2,
+            ),
+            sm.State(name=States.state_2, on_run=[to_state_3]).config_targets(
+                States.state_3,
+            ),
+            sm.State(
+                name=States.state_3,
+                on_run=[wait_forever],
+            ).config_targets(States.state_1),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(state_machine.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert state_machine.active_state == States.state_3
+
+
+def test_not_allowed() -> None:
+    """Переход в необъявленное состояние."""
+    state_machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_3]).config_targets(
+                States.state_2,
+            ),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+            sm.State(name=States.state_3, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    with pytest.raises(sm.StateMachineError) as exc:
+        asyncio.run(state_machine.run())
+    assert exc.value.message == EXC_NOT_ALLOWED.format(
+        name=States.state_1,
+        target=States.state_3,
+    )
+
+
+def test_dead_end() -> None:
+    """Состояние без разрешенных переходов."""
+    with pytest.raises(sm.StateMachineError) as exc:
+        sm.StateMachine(
+            states=[
+                sm.State(name=States.state_1, on_run=[to_state_2]),
+                sm.State(
+                    name=States.state_2,
+                    on_run=[wait_forever],
+                ).config_targets(),
+                sm.State(name=States.state_3, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.state_1,
+        )
+    assert exc.value.message == EXC_DEAD_END.format(name=States.state_2)
+
+
+def test_unreachable() -> None:
+    """Недостижимое состояние при полностью объявленном графе."""
+    with pytest.raises(sm.StateMachineError) as exc:
+        sm.StateMachine(
+            states=[
+                sm.State(
+                    name=States.state_1,
+                    on_run=[to_state_2],
+                ).config_targets(States.state_2),
+                sm.State(
+                    name=States.state_2,
+                    on_run=[wait_forever],
+                ).config_targets(States.state_1),
+                sm.State(
+                    name=States.state_3,
+                    on_run=[wait_forever],
+                ).config_targets(States.state_1),
+            ],
+            states_enum=States,
+            init_state=States.state_1,
+        )
+    assert exc.value.message == EXC_UNREACHABLE.format(
+        name=States.state_1,
+        states=[States.state_3.value],
+    )
@@ -0,0 +1,176 @@
+import asyncio
+
+import async_state_machine as sm
+from async_state_machine import testing
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+async def to_state_2(counter: list[int]) -> States:
+    counter[0] += 1
+    return States.state_2
+
+
+async def to_state_1(counter: list[int]) -> States:
+    counter[0] += 1
+    return States.state_1
+
+
+def test_group_runs_machines() -> None:
+    """Все машины группы выполняют переходы."""
+    counters = [[0] for _ in range(10)]
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[to_state_1])
+            .config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+
+    async def run() -> None:
+        group = sm.StateMachineGroup(
+            sm.StateMachine.from_template(template, counter)
+            for counter in counters
+        )
+        try:
+            await asyncio.wait_for(group.run(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+        assert group.running == 0
+
+    asyncio.run(run())
+    assert all(counter[0] > 1 for counter in counters)
+
+
+def test_group_error_isolated() -> None:
+    """Ошибка одной машины не останавливает остальные."""
+    counter = [0]
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[to_state_1])
+            .config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+        context=counter,
+    )
+
+    async def on_run_fail() -> None:
+        raise sm.NewStateException("UNKNOWN_STATE")  # pyright: ignore
+
+    broken = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[on_run_fail]),
+            sm.State(name=States.state_2, on_run=[on_run_fail]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+
+    async def run() -> None:
+        group = sm.StateMachineGroup([broken, machine])
+        try:
+            await asyncio.wait_for(group.run(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert counter[0] > 1
+
+
+def test_group_add_while_running() -> None:
+    """Машины, добавленные во время работы, запускаются."""
+    counter = [0]
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[to_state_1])
+            .config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+        context=counter,
+    )
+
+    async def run() -> None:
+        group = sm.StateMachineGroup()
+        task = asyncio.create_task(group.run())
+        await asyncio.sleep(0.01)
+        group.add(machine)
+        await asyncio.sleep(0.05)
+        assert group.running == 1
+        group.remove(machine)
+        await asyncio.sleep(0)
+        assert group.running == 0
+        task.cancel()
+
+    asyncio.run(run())
+    assert counter[0] > 1
+
+
+def test_group_remove_queued() -> None:
+    """Машина, удаленная до запуска, не запускается."""
+    counter = [0]
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[to_state_1])
+            .config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+        context=counter,
+    )
+
+    async def run() -> None:
+        group = sm.StateMachineGroup([machine]).remove(machine)
+        try:
+            await asyncio.wait_for(group.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert counter[0] == 0
+
+
+def test_group_no_task_between_states() -> None:
+    """Между шагами машины не занимают задачи."""
+    counters = [[0] for _ in range(100)]
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2])
+            .config_pass_context(),
+            sm.State(name=States.state_2, on_run=[to_state_1])
+            .config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+
+    async def run() -> None:
+        group = sm.StateMachineGroup(
+            sm.StateMachine.from_template(template, counter)
+            for counter in counters
+        )
+        task = asyncio.create_task(group.run())
+        await asyncio.sleep(0.05)
+        # все машины в паузе между переходами
+        assert group.running == len(counters)
+        assert group.active_tasks == 0
+        task.cancel()
+        await asyncio.wait((task,))
+
+    testing.run(run())
+    assert all(counter[0] > 1 for counter in counters)
@@ -0,0 +1,239 @@
+import asyncio
+import gc
+from enum import Enum, auto
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine import testing
+from async_state_machine.active_parents import ActiveParents
+from async_state_machine.runtime import Runtime
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    connected = sm.enum_auto()
+    idle = sm.enum_auto()
+    reading = sm.enum_auto()
+    writing = sm.enum_auto()
+    offline = sm.enum_auto()
+
+
+class Events(Enum):
+    """Перечень событий."""
+
+    disconnect = auto()
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+async def to_reading() -> States:
+    await asyncio.sleep(0.001)
+    return States.reading
+
+
+async def to_writing() -> States:
+    await asyncio.sleep(0.001)
+    return States.writing
+
+
+async def to_idle() -> States:
+    await asyncio.sleep(0.001)
+    return States.idle
+
+
+async def to_offline() -> States:
+    await asyncio.sleep(0.001)
+    return States.offline
+
+
+def test_parent_survives_sibling_transitions() -> None:
+    """on_run родителя не перезапускается при переходах между детьми."""
+    log: list[str] = []
+
+    async def on_enter() -> None:
+        log.append("enter")
+
+    async def keepalive() -> None:
+        log.append("keepalive")
+        await asyncio.sleep(1000)
+
+    async def on_exit() -> None:
+        log.append("exit")
+
+    connected = sm.State(
+        name=States.connected,
+        on_enter=[on_enter],
+        on_run=[keepalive],
+        on_exit=[on_exit],
+    ).config_event(Events.disconnect, States.offline)
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.idle, on_run=[to_reading])
+            .config_parent(connected),
+            sm.State(name=States.reading, on_run=[to_writing])
+            .config_parent(connected),
+            sm.State(name=States.writing, on_run=[to_offline])
+            .config_parent(connected),
+            sm.State(name=States.offline, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.idle,
+    )
+
+    asyncio.run(testing.run_for(machine, 0.1))
+    assert machine.active_state == States.offline
+    assert log == ["enter", "keepalive", "exit"]
+
+
+def test_parent_transition() -> None:
+    """Переход из on_run родителя выполняется из дочернего состояния."""
+    log: list[str] = []
+
+    async def on_enter() -> None:
+        log.append("enter")
+
+    async def keepalive() -> States:
+        log.append("keepalive")
+        await asyncio.sleep(0.02)
+        return States.offline
+
+    async def on_exit() -> None:
+        log.append("exit")
+
+    connected = sm.State(
+        name=States.connected,
+        on_enter=[on_enter],
+        on_run=[keepalive],
+        on_exit=[on_exit],
+    ).config_event(Events.disconnect, States.offline)
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.idle, on_run=[to_reading])
+            .config_parent(connected),
+            sm.State(name=States.reading, on_run=[to_writing])
+            .config_parent(connected),
+            sm.State(name=States.writing, on_run=[to_idle])
+            .config_parent(connected),
+            sm.State(name=States.offline, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.idle,
+    )
+
+    asyncio.run(testing.run_for(machine, 0.1))
+    assert machine.active_state == States.offline
+    assert log == ["enter", "keepalive", "exit"]
+
+
+def test_parent_event() -> None:
+    """Переход по событию родителя действует в дочерних состояниях."""
+    log: list[str] = []
+
+    async def on_enter() -> None:
+        log.append("enter")
+
+    async def keepalive() -> None:
+        log.append("keepalive")
+        await asyncio.sleep(1000)
+
+    async def on_exit() -> None:
+        log.append("exit")
+
+    connected = sm.State(
+        name=States.connected,
+        on_enter=[on_enter],
+        on_run=[keepalive],
+        on_exit=[on_exit],
+    ).config_event(Events.disconnect, States.offline)
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.idle, on_run=[to_reading])
+            .config_parent(connected),
+            sm.State(name=States.reading, on_run=[to_writing])
+            .config_parent(connected),
+            sm.State(name=States.writing, on_run=[to_idle])
+            .config_parent(connected),
+            sm.State(name=States.offline, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.idle,
+    )
+
+    async def run() -> None:
+        task = asyncio.create_task(machine.run())
+        await asyncio.sleep(0.02)
+        machine.post(Events.disconnect)
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(run())
+    assert machine.active_state == States.offline
+    assert log == ["enter", "keepalive", "exit"]
+
+
+def test_parent_is_state() -> None:
+    """Родитель не может быть состоянием машины."""
+    connected = sm.State(name=States.connected, on_run=[wait_forever])
+    with pytest.raises(sm.StateMachineError):
+        sm.StateMachine(
+            states=[
+                connected,
+                sm.State(name=States.idle, on_run=[wait_forever])
+                .config_parent(connected),
+                sm.State(name=States.reading, on_run=[wait_forever]),
+                sm.State(name=States.writing, on_run=[wait_forever]),
+                sm.State(name=States.offline, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.idle,
+        )
+
+
+def test_child_rebuilt_after_parent_change() -> None:
+    """Изменение родителя после сборки дочернего состояния учитывается."""
+    parent = sm.State(name=States.connected, on_run=[wait_forever])
+    child = sm.State(name=States.idle, on_run=[wait_forever]).config_parent(
+        parent,
+    )
+    runner = child.build()
+    assert child.build() is runner
+
+    parent.config_timeout_on_run(1.0, States.offline)
+    rebuilt = child.build()
+    assert rebuilt is not runner
+    assert rebuilt.parent is parent.build()
+    assert States.offline in rebuilt.targets
+
+
+def test_close_retrieves_parent_errors() -> None:
+    """Ошибки родителей при остановке не попадают в обработчик цикла."""
+    errors: list[dict[str, object]] = []
+
+    async def broken() -> None:
+        raise RuntimeError("broken")
+
+    outer = sm.State(name=States.connected, on_run=[broken])
+    inner = sm.State(name=States.idle, on_run=[broken]).config_parent(outer)
+    child = (
+        sm.State(name=States.reading, on_run=[wait_forever])
+        .config_parent(inner)
+        .build()
+    )
+
+    async def run() -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda _, context: errors.append(context))
+        runtime = Runtime()
+        parents = ActiveParents()
+        await parents.switch(child, runtime)
+        await asyncio.sleep(0.01)
+        await parents.close(runtime)
+        del parents  # noqa: WPS420
+        gc.collect()
+
+    asyncio.run(run())
+    assert errors == []
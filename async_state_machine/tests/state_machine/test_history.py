@@ -0,0 +1,110 @@
+import asyncio
+import json
+from enum import Enum, auto
+
+import pytest
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+    state_3 = sm.enum_auto()
+    state_4 = sm.enum_auto()
+
+
+class Events(Enum):
+    """Перечень событий."""
+
+    go = auto()
+
+
+async def to_state_2() -> States:
+    return States.state_2
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+def test_history_causes() -> None:
+    """История хранит переходы с причиной."""
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2]),
+            sm.State(name=States.state_2, on_run=[wait_forever])
+            .config_timeout_on_run(0.01, States.state_3),
+            sm.State(name=States.state_3, on_run=[wait_forever])
+            .config_event(Events.go, States.state_4),
+            sm.State(name=States.state_4, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    ).config_history(10)
+
+    async def run() -> None:
+        task = asyncio.create_task(machine.run())
+        await asyncio.sleep(0.05)
+        machine.post(Events.go)
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(run())
+    history = machine.history
+    assert history is not None
+    assert [
+        (record.active_state, record.new_state, record.cause)
+        for record in history
+    ] == [
+        (States.state_1, States.state_2, sm.TransitionCause.callback),
+        (States.state_2, States.state_3, sm.TransitionCause.timeout),
+        (States.state_3, States.state_4, sm.TransitionCause.event),
+    ]
+    times = [record.time for record in history]
+    assert times == sorted(times)
+    assert history.query(cause=sm.TransitionCause.timeout)[0].new_state == (
+        States.state_3
+    )
+    assert len(history.query(state=States.state_3)) == 2
+    assert history.query(since=times[-1]) == [history.last()]
+    exported = json.loads(json.dumps(history.export()))
+    assert exported[-1]["cause"] == "event"
+    assert exported[-1]["new_state"] == "state_4"
+
+
+def test_ring_buffer_overwrite() -> None:
+    """Старые записи перезаписываются."""
+    history = sm.TransitionHistory(3)
+    assert history.last() is None
+    for index in range(5):
+        history.record(
+            float(index),
+            States.state_1,
+            States.state_2,
+            sm.TransitionCause.callback,
+        )
+    assert len(history) == 3
+    assert [record.time for record in history] == [2.0, 3.0, 4.0]
+    history.clear()
+    assert not list(history)
+
+
+def test_history_disabled() -> None:
+    """По-умолчанию история не ведется."""
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2]),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+            sm.State(name=States.state_3, on_run=[wait_forever]),
+            sm.State(name=States.state_4, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    assert machine.history is None
+    assert machine.config_history(2).config_history(None).history is None
+    with pytest.raises(ValueError):
+        machine.config_history(0)
@@ -4,9 +4,10 @@ import pytest
 import async_state_machine as sm
 
 
-from async_state_machine.state_machine import (
+from async_state_machine.state_machine_template import (
     EXC_NOT_USED_STATES,
     EXC_REUSE_STATE,
+    EXC_TARGET_NOT_FOUND,
 )
 
 
@@ -90,3 +91,33 @@ def test_init_state() -> None:
         init_state=States.state_2,
     )
     assert state_machine.active_state == States.state_2
+
+
+def test_exc_unknown_timeout_target() -> None:
+    """Переход по таймауту в неизвестное состояние."""
+
+    class OtherStates(sm.StatesEnum):
+        other = sm.enum_auto()
+
+    async def on_run():
+        pass
+
+    with pytest.raises(sm.StateMachineError) as exc:
+        sm.StateMachine(
+            states={
+                sm.State(
+                    name=States.state_1,
+                    on_run=[on_run],
+                ).config_timeout_on_run(1.0, OtherStates.other),
+                sm.State(
+                    name=States.state_2,
+                    on_run=[on_run],
+                ),
+            },
+            states_enum=States,
+            init_state=States.state_1,
+        )
+    assert exc.value.message == EXC_TARGET_NOT_FOUND.format(
+        name=States.state_1,
+        target=OtherStates.other,
+    )
@@ -0,0 +1,107 @@
+import asyncio
+
+import async_state_machine as sm
+
+from async_state_machine.metrics import Histogram
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+    state_3 = sm.enum_auto()
+
+
+def test_metrics_snapshot() -> None:
+    """Входы в состояния, таймауты и переходы учитываются."""
+
+    async def on_run_state_1() -> States:
+        return States.state_2
+
+    async def on_run_state_2() -> None:
+        await asyncio.sleep(10)
+
+    async def on_run_state_3() -> None:
+        await asyncio.sleep(10)
+
+    state_machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[on_run_state_1]),
+            sm.State(
+                name=States.state_2,
+                on_run=[on_run_state_2],
+            ).config_timeout_on_run(0.01, States.state_3),
+            sm.State(name=States.state_3, on_run=[on_run_state_3]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(state_machine.run(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+
+    snapshot = state_machine.metrics_snapshot()
+    assert snapshot is not None
+    assert snapshot.states[States.state_1].entries == 1
+    assert snapshot.states[States.state_2].entries == 1
+    assert snapshot.states[States.state_2].on_run.timeouts == 1
+    assert snapshot.states[States.state_2].on_run.latency.samples == 1
+    assert snapshot.states[States.state_2].on_run.latency.total >= 0.01
+    assert snapshot.transitions[States.state_1] == {States.state_2: 1}
+    assert snapshot.transitions[States.state_2] == {States.state_3: 1}
+    latency = snapshot.transition_latency[States.state_2][States.state_3]
+    assert latency.samples == 1
+    assert latency.total >= 0.01
+    assert snapshot.transition_latency[States.state_3] == {}
+
+
+def test_metrics_disabled() -> None:
+    """Сбор метрик отключается."""
+
+    async def on_run_state_1() -> States:
+        return States.state_2
+
+    async def on_run_state_2() -> None:
+        await asyncio.sleep(10)
+
+    async def on_run_state_3() -> None:
+        await asyncio.sleep(10)
+
+    state_machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[on_run_state_1]),
+            sm.State(
+                name=States.state_2,
+                on_run=[on_run_state_2],
+            ).config_timeout_on_run(0.01, States.state_3),
+            sm.State(name=States.state_3, on_run=[on_run_state_3]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    ).config_metrics(False)
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(state_machine.run(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert state_machine.metrics_snapshot() is None
+    assert state_machine.active_state == States.state_3
+
+
+def test_histogram() -> None:
+    """Значения попадают в интервалы гистограммы."""
+    histogram = Histogram(bounds=(1, 10))
+    for value in (0.5, 1, 5, 100):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot.counts == (2, 1, 1)
+    assert snapshot.samples == 4
@@ -2,8 +2,9 @@ import asyncio
 import pytest
 
 import async_state_machine as sm
+from async_state_machine import testing
 
-from async_state_machine.state_machine import EXC_NAME_NOT_FOUND
+from async_state_machine.transition_graph import EXC_NAME_NOT_FOUND
 
 
 class States(sm.StatesEnum):
@@ -45,13 +46,7 @@ def test_move_between_states() -> None:
         init_state=States.state_1,
     )
 
-    async def run():
-        try:
-            await asyncio.wait_for(state_machine.run(), 0.2)
-        except asyncio.TimeoutError:
-            pass
-
-    asyncio.run(run())
+    testing.run(testing.run_for(state_machine, 0.2))
 
     assert state_machine.active_state.name == States.state_3
 
@@ -86,3 +81,39 @@ def test_exc_name_not_found() -> None:
     with pytest.raises(sm.StateMachineError) as exc:
         asyncio.run(state_machine.run())
     assert str(exc.value) == EXC_NAME_NOT_FOUND.format(name="UNKNOWN_STATE")
+
+
+def test_move_by_return() -> None:
+    """Переход между состояниями через возвращаемое значение."""
+
+    async def on_run_state_1() -> States:
+        return States.state_2
+
+    async def on_run_state_2() -> States:
+        return States.state_3
+
+    async def on_run_state_3() -> None:
+        await asyncio.sleep(10)
+
+    state_machine = sm.StateMachine(
+        states={
+            sm.State(
+                name=States.state_1,
+                on_run=[on_run_state_1],
+            ),
+            sm.State(
+                name=States.state_2,
+                on_run=[on_run_state_2],
+            ),
+            sm.State(
+                name=States.state_3,
+                on_run=[on_run_state_3],
+            ),
+        },
+        states_enum=States,
+        init_state=States.state_1,
+    )
+
+    testing.run(testing.run_for(state_machine, 0.2))
+
+    assert state_machine.active_state == States.state_3
@@ -0,0 +1,257 @@
+import asyncio
+from enum import Enum, auto
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine import testing
+
+
+class Modes(sm.StatesEnum):
+    """Состояния основной области."""
+
+    starting = sm.enum_auto()
+    running = sm.enum_auto()
+
+
+class Lamp(sm.StatesEnum):
+    """Состояния параллельной области."""
+
+    off = sm.enum_auto()
+    on = sm.enum_auto()
+
+
+class Events(Enum):
+    """Перечень событий."""
+
+    switch_on = auto()
+
+
+class Context(object):
+    """Данные экземпляра машины."""
+
+    def __init__(self) -> None:
+        self.machine: sm.StateMachine | None = None
+        self.lamp_on = 0
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+async def start(context: Context) -> Modes:
+    await asyncio.sleep(0.01)
+    assert context.machine is not None
+    context.machine.post(Events.switch_on)
+    return Modes.running
+
+
+async def on_enter_lamp_on(context: Context) -> None:
+    context.lamp_on += 1
+
+
+async def lamp_on(context: Context) -> None:
+    await asyncio.sleep(1000)
+
+
+async def broken() -> None:
+    await asyncio.sleep(0.001)
+    raise RuntimeError("broken")
+
+
+def test_event_between_regions() -> None:
+    """Событие из одной области выполняет переход в другой."""
+    lamp = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=Lamp.off, on_run=[wait_forever])
+            .config_event(Events.switch_on, Lamp.on),
+            sm.State(
+                name=Lamp.on,
+                on_enter=[on_enter_lamp_on],
+                on_run=[lamp_on],
+            ).config_pass_context(),
+        ],
+        states_enum=Lamp,
+        init_state=Lamp.off,
+    )
+    context = Context()
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=Modes.starting, on_run=[start])
+            .config_pass_context(),
+            sm.State(name=Modes.running, on_run=[wait_forever]),
+        ],
+        states_enum=Modes,
+        init_state=Modes.starting,
+        context=context,
+    ).config_region("lamp", lamp)
+    context.machine = machine
+
+    asyncio.run(testing.run_for(machine, 0.05))
+    assert machine.active_state == Modes.running
+    region = machine.region("lamp")
+    assert region.active_state == Lamp.on
+    assert region.context is machine.context
+    assert machine.context.lamp_on == 1
+    assert list(machine.regions) == ["lamp"]
+
+
+def test_region_error() -> None:
+    """Ошибка в области останавливает машину."""
+    lamp = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=Lamp.off, on_run=[broken])
+            .config_event(Events.switch_on, Lamp.on),
+            sm.State(
+                name=Lamp.on,
+                on_enter=[on_enter_lamp_on],
+                on_run=[lamp_on],
+            ).config_pass_context(),
+        ],
+        states_enum=Lamp,
+        init_state=Lamp.off,
+    )
+    context = Context()
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=Modes.starting, on_run=[start])
+            .config_pass_context(),
+            sm.State(name=Modes.running, on_run=[wait_forever]),
+        ],
+        states_enum=Modes,
+        init_state=Modes.starting,
+        context=context,
+    ).config_region("lamp", lamp)
+    context.machine = machine
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(testing.run_for(machine, 1))
+
+
+def test_region_names() -> None:
+    """Имена областей уникальны."""
+    lamp = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=Lamp.off, on_run=[wait_forever]),
+            sm.State(name=Lamp.on, on_run=[wait_forever]),
+        ],
+        states_enum=Lamp,
+        init_state=Lamp.off,
+    )
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=Modes.starting, on_run=[wait_forever]),
+            sm.State(name=Modes.running, on_run=[wait_forever]),
+        ],
+        states_enum=Modes,
+        init_state=Modes.starting,
+    ).config_region("lamp", lamp)
+    with pytest.raises(sm.StateMachineError):
+        machine.config_region("lamp", lamp)
+    with pytest.raises(sm.StateMachineError):
+        machine.region("unknown")
+
+
+def test_post_all_or_nothing() -> None:
+    """post не передает событие, если очередь любой области заполнена."""
+    lamp = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=Lamp.off, on_run=[wait_forever])
+            .config_event(Events.switch_on, Lamp.on),
+            sm.State(name=Lamp.on, on_run=[wait_forever]),
+        ],
+        states_enum=Lamp,
+        init_state=Lamp.off,
+    )
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=Modes.starting, on_run=[wait_forever]),
+            sm.State(name=Modes.running, on_run=[wait_forever]),
+        ],
+        states_enum=Modes,
+        init_state=Modes.starting,
+    ).config_region("lamp", lamp)
+    machine.region("lamp").config_events_queue(2)
+    machine.config_region("small", lamp)
+    machine.region("small").config_events_queue(1)
+
+    machine.post(Events.switch_on)
+    with pytest.raises(sm.StateMachineError):
+        machine.post(Events.switch_on)
+    # в lamp осталось место: второе событие не было передано
+    machine.region("lamp").post(Events.switch_on)
+
+
+def test_regions_single_task() -> None:
+    """Области выполняются циклом машины без задач run для каждой."""
+    lamp = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=Lamp.off, on_run=[wait_forever]),
+            sm.State(name=Lamp.on, on_run=[wait_forever]),
+        ],
+        states_enum=Lamp,
+        init_state=Lamp.off,
+    )
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=Modes.starting, on_run=[wait_forever]),
+            sm.State(name=Modes.running, on_run=[wait_forever]),
+        ],
+        states_enum=Modes,
+        init_state=Modes.starting,
+    ).config_region("lamp", lamp)
+    machine.config_region("second", lamp)
+
+    async def main() -> int:
+        run_task = asyncio.ensure_future(machine.run())
+        await asyncio.sleep(0.05)
+        coros = {
+            task.get_coro().__qualname__ for task in asyncio.all_tasks()
+        }
+        run_task.cancel()
+        await asyncio.gather(run_task, return_exceptions=True)
+        return sum(name == "StateMachine.run" for name in coros)
+
+    assert asyncio.run(main()) == 1
+
+
+def test_snapshot_regions() -> None:
+    """Активные состояния областей сохраняются в снимке машины."""
+    lamp = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=Lamp.off, on_run=[wait_forever])
+            .config_event(Events.switch_on, Lamp.on),
+            sm.State(
+                name=Lamp.on,
+                on_enter=[on_enter_lamp_on],
+                on_run=[lamp_on],
+            ).config_pass_context(),
+        ],
+        states_enum=Lamp,
+        init_state=Lamp.off,
+    )
+    context = Context()
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=Modes.starting, on_run=[start])
+            .config_pass_context(),
+            sm.State(name=Modes.running, on_run=[wait_forever]),
+        ],
+        states_enum=Modes,
+        init_state=Modes.starting,
+        context=context,
+    ).config_region("lamp", lamp)
+    context.machine = machine
+    asyncio.run(testing.run_for(machine, 0.05))
+    assert machine.region("lamp").active_state == Lamp.on
+    data = machine.snapshot(include_context=False)
+
+    restored = sm.StateMachine.from_template(machine.template)
+    restored.config_region("lamp", lamp).restore(data)
+    assert restored.active_state == Modes.running
+    assert restored.region("lamp").active_state == Lamp.on
+
+    other = sm.StateMachine.from_template(machine.template)
+    other.config_region("other", lamp)
+    with pytest.raises(sm.StateMachineError):
+        other.restore(data)
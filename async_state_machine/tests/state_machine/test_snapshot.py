@@ -0,0 +1,289 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine import testing
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    connect = sm.enum_auto()
+    work = sm.enum_auto()
+
+
+class OtherStates(sm.StatesEnum):
+    """Перечень с другими состояниями."""
+
+    connect = sm.enum_auto()
+    other = sm.enum_auto()
+
+
+class Context(object):
+    """Данные экземпляра машины."""
+
+    def __init__(self) -> None:
+        self.connects = 0
+        self.runs = 0
+
+
+async def on_enter_connect(context: Context) -> None:
+    context.connects += 1
+
+
+async def to_work(context: Context) -> States:
+    return States.work
+
+
+async def on_enter_work(context: Context) -> None:
+    context.connects += 1
+
+
+async def on_run_work(context: Context) -> None:
+    context.runs += 1
+    await asyncio.sleep(1000)
+
+
+def test_restore_skips_on_enter() -> None:
+    """Машина продолжает работу с on_run восстановленного состояния."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    worked = sm.StateMachine.from_template(template, Context())
+    worked.config_history(8)
+    asyncio.run(testing.run_for(worked, 0.02))
+    assert worked.active_state == States.work
+    data = worked.snapshot()
+
+    restored = sm.StateMachine.from_template(template).restore(data)
+    assert restored.active_state == States.work
+    assert restored.context.connects == 2
+    assert restored.context.runs == 1
+    history = restored.history
+    assert history is not None
+    last = history.last()
+    assert last is not None
+    assert last.new_state == States.work
+
+    asyncio.run(testing.run_for(restored, 0.02))
+    assert restored.context.connects == 2
+    assert restored.context.runs == 2
+
+
+def test_restore_replay_on_enter() -> None:
+    """По запросу on_enter восстановленного состояния выполняется."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    worked = sm.StateMachine.from_template(template, Context())
+    worked.config_history(8)
+    asyncio.run(testing.run_for(worked, 0.02))
+    assert worked.active_state == States.work
+    data = worked.snapshot(include_history=False)
+
+    context = Context()
+    restored = sm.StateMachine.from_template(template, context)
+    restored.restore(
+        worked.snapshot(include_context=False),
+        replay_on_enter=True,
+    )
+    assert restored.context is context
+    asyncio.run(testing.run_for(restored, 0.02))
+    assert context.connects == 1
+    assert sm.StateMachine.from_template(template).restore(data).history is (
+        None
+    )
+
+
+def test_bulk_file(tmp_path: Path) -> None:
+    """Снимки многих машин сохраняются в один файл."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    worked = sm.StateMachine.from_template(template, Context())
+    worked.config_history(8)
+    asyncio.run(testing.run_for(worked, 0.02))
+    assert worked.active_state == States.work
+    data = worked.snapshot()
+    path = str(tmp_path / "machines.bin")
+    sm.save_snapshots(path, {f"machine_{index}": data for index in range(100)})
+
+    snapshots = sm.load_snapshots(path)
+    assert len(snapshots) == 100
+    machine = sm.StateMachine.from_template(template)
+    machine.restore(snapshots["machine_42"])
+    assert machine.active_state == States.work
+
+
+def test_wrong_snapshot() -> None:
+    """Снимок другой машины или поврежденные данные."""
+    other = sm.StateMachine(
+        states=[
+            sm.State(name=OtherStates.connect, on_run=[on_run_work]),
+            sm.State(name=OtherStates.other, on_run=[on_run_work]),
+        ],
+        states_enum=OtherStates,
+        init_state=OtherStates.connect,
+    )
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    machine = sm.StateMachine.from_template(template)
+    with pytest.raises(sm.StateMachineError):
+        machine.restore(other.snapshot())
+    with pytest.raises(sm.StateMachineError):
+        machine.restore(machine.snapshot()[:-1])
+
+
+def test_wrong_context() -> None:
+    """Контекст, который не восстанавливается pickle, - ошибка снимка."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    machine = sm.StateMachine.from_template(template, Context())
+    data = machine.snapshot().replace(b"Context", b"Contezt")
+    with pytest.raises(sm.StateMachineError):
+        sm.StateMachine.from_template(template).restore(data)
+
+
+def test_wrong_transition_cause() -> None:
+    """Неизвестная причина перехода в истории - ошибка снимка."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    worked = sm.StateMachine.from_template(template, Context())
+    worked.config_history(8)
+    asyncio.run(testing.run_for(worked, 0.02))
+    assert worked.active_state == States.work
+    data = worked.snapshot(include_context=False)
+    with pytest.raises(sm.StateMachineError):
+        sm.StateMachine.from_template(template).restore(data[:-1] + b"\xff")
+
+
+def test_wrong_file(tmp_path: Path) -> None:
+    """Пустой или поврежденный файл снимков."""
+    path = tmp_path / "machines.bin"
+    path.write_bytes(b"")
+    with pytest.raises(sm.StateMachineError):
+        sm.load_snapshots(str(path))
+    path.write_bytes(b"not snapshots")
+    with pytest.raises(sm.StateMachineError):
+        sm.load_snapshots(str(path))
+
+
+def test_history_loop_clock() -> None:
+    """Время истории пересчитывается по часам цикла событий."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(
+                name=States.connect,
+                on_enter=[on_enter_connect],
+                on_run=[to_work],
+            ).config_pass_context(),
+            sm.State(
+                name=States.work,
+                on_enter=[on_enter_work],
+                on_run=[on_run_work],
+            ).config_pass_context(),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    )
+    machine = sm.StateMachine.from_template(template, Context())
+    machine.config_history(8)
+
+    async def worked_snapshot() -> bytes:
+        await testing.run_for(machine, 0.02)
+        return machine.snapshot()
+
+    data = testing.run(worked_snapshot())
+
+    async def restore() -> tuple[float, float]:
+        history = sm.StateMachine.from_template(template).restore(data).history
+        assert history is not None
+        last = history.last()
+        assert last is not None
+        return last.time, asyncio.get_running_loop().time()
+
+    record_time, now = asyncio.run(restore())
+    assert now - 1 < record_time <= now
@@ -0,0 +1,84 @@
+import asyncio
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+async def to_state_2() -> States:
+    return States.state_2
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+def test_instances_independent() -> None:
+    """Машины из одного шаблона имеют собственное активное состояние."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2]),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    machine_1 = sm.StateMachine.from_template(template)
+    machine_2 = sm.StateMachine.from_template(template)
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(machine_1.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert machine_1.active_state == States.state_2
+    assert machine_2.active_state == States.state_1
+    assert machine_1.template is machine_2.template
+
+
+def test_metrics_per_instance() -> None:
+    """Метрики у каждой машины свои."""
+    template = sm.StateMachineTemplate(
+        states=[
+            sm.State(name=States.state_1, on_run=[to_state_2]),
+            sm.State(name=States.state_2, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    )
+    machine_1 = sm.StateMachine.from_template(template)
+    machine_2 = sm.StateMachine.from_template(template)
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(machine_1.run(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    snapshot_1 = machine_1.metrics_snapshot()
+    snapshot_2 = machine_2.metrics_snapshot()
+    assert snapshot_1 is not None
+    assert snapshot_2 is not None
+    assert snapshot_1.states[States.state_1].entries == 1
+    assert snapshot_2.states[States.state_1].entries == 0
+
+
+def test_shared_runners() -> None:
+    """Машины из одних объектов State используют общие состояния."""
+    states = [
+        sm.State(name=States.state_1, on_run=[to_state_2]),
+        sm.State(name=States.state_2, on_run=[wait_forever]),
+    ]
+    template_1 = sm.StateMachineTemplate(states, States, States.state_1)
+    template_2 = sm.StateMachineTemplate(states, States, States.state_1)
+    assert (
+        template_1.states[States.state_1] is template_2.states[States.state_1]
+    )
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+import async_state_machine as sm
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    state_1 = sm.enum_auto()
+    state_2 = sm.enum_auto()
+
+
+def _run_counting(policy: sm.TransitionPolicy, duration: float) -> int:
+    counter = [0]
+
+    async def on_run_state_1() -> States:
+        counter[0] += 1
+        return States.state_2
+
+    async def on_run_state_2() -> States:
+        counter[0] += 1
+        return States.state_1
+
+    state_machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.state_1, on_run=[on_run_state_1]),
+            sm.State(name=States.state_2, on_run=[on_run_state_2]),
+        ],
+        states_enum=States,
+        init_state=States.state_1,
+    ).config_transition_policy(policy)
+
+    async def run() -> None:
+        try:
+            await asyncio.wait_for(state_machine.run(), duration)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    return counter[0]
+
+
+def test_fixed_delay() -> None:
+    """Пауза ограничивает количество переходов."""
+    transitions = _run_counting(sm.TransitionPolicy.fixed_delay(0.05), 0.2)
+    assert transitions <= 6
+
+
+def test_immediate_faster_than_delay() -> None:
+    """Без паузы переходов значительно больше."""
+    transitions = _run_counting(sm.TransitionPolicy.immediate(), 0.2)
+    assert transitions > 100
+
+
+def test_budget() -> None:
+    """Бюджет переходов не блокирует цикл событий."""
+    transitions = _run_counting(sm.TransitionPolicy.budget(10), 0.2)
+    assert transitions > 100
+
+
+def test_wrong_parameters() -> None:
+    """Проверка параметров политики."""
+    with pytest.raises(ValueError):
+        sm.TransitionPolicy.budget(0)
+    with pytest.raises(ValueError):
+        sm.TransitionPolicy.fixed_delay(-1)
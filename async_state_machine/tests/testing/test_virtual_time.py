@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine import testing
+
+HOUR = 3600
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    idle = sm.enum_auto()
+    polling = sm.enum_auto()
+    offline = sm.enum_auto()
+
+
+class Context(object):
+    """Данные экземпляра машины."""
+
+    def __init__(self) -> None:
+        self.polls: list[float] = []
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(10 * HOUR)
+
+
+async def poll(context: Context) -> None:
+    context.polls.append(asyncio.get_running_loop().time())
+
+
+def test_long_timeouts() -> None:
+    """Часы таймаутов выполняются без ожидания."""
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.idle, on_run=[wait_forever])
+            .config_timeout_on_run(HOUR, States.polling),
+            sm.State(name=States.polling, on_run=[poll])
+            .config_pass_context()
+            .config_period_on_run(60)
+            .config_timeout_on_run(HOUR, States.offline),
+            sm.State(name=States.offline, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.idle,
+        context=Context(),
+    ).config_history(8)
+
+    start = time.perf_counter()
+    testing.run(testing.run_for(machine, 3 * HOUR))
+    assert time.perf_counter() - start < 5
+
+    assert machine.active_state == States.offline
+    history = machine.history
+    assert history is not None
+    times = [record.time for record in history]
+    assert times == pytest.approx([HOUR, 2 * HOUR], abs=0.01)
+    polls = machine.context.polls
+    assert len(polls) == 60
+    assert polls[0] == pytest.approx(times[0], abs=0.01)
+    assert polls[-1] == pytest.approx(times[0] + 59 * 60)
+
+
+def test_deterministic() -> None:
+    """Повторный прогон дает те же моменты переходов."""
+    runs: list[list[float]] = []
+    for _ in range(3):
+        machine = sm.StateMachine(
+            states=[
+                sm.State(name=States.idle, on_run=[wait_forever])
+                .config_timeout_on_run(HOUR, States.polling),
+                sm.State(name=States.polling, on_run=[poll])
+                .config_pass_context()
+                .config_period_on_run(60)
+                .config_timeout_on_run(HOUR, States.offline),
+                sm.State(name=States.offline, on_run=[wait_forever]),
+            ],
+            states_enum=States,
+            init_state=States.idle,
+            context=Context(),
+        ).config_history(8)
+        testing.run(testing.run_for(machine, 3 * HOUR))
+        assert machine.history is not None
+        runs.append([record.time for record in machine.history])
+        runs.append(machine.context.polls)
+    assert runs[0::2] == [runs[0]] * 3
+    assert runs[1::2] == [runs[1]] * 3
+
+
+def test_start_time() -> None:
+    """Начальное время часов."""
+
+    async def now() -> float:
+        await asyncio.sleep(HOUR)
+        return asyncio.get_running_loop().time()
+
+    assert testing.run(now(), start=100) == 100 + HOUR
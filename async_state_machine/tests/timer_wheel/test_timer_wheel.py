@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine import testing
+
+
+def test_call_later_order() -> None:
+    """Таймеры срабатывают в порядке задержек, включая несколько оборотов."""
+    fired: list[float] = []
+
+    async def run() -> None:
+        wheel = sm.TimerWheel(resolution=0.001, slots=8)
+        for delay in (0.02, 0.005, 0.012):
+            wheel.call_later(delay, lambda delay=delay: fired.append(delay))
+        await asyncio.sleep(0.05)
+        assert wheel.pending == 0
+
+    asyncio.run(run())
+    assert fired == [0.005, 0.012, 0.02]
+
+
+def test_cancel() -> None:
+    """Отмененный таймер не срабатывает."""
+    fired: list[int] = []
+
+    async def run() -> None:
+        wheel = sm.TimerWheel()
+        entry = wheel.call_later(0.01, lambda: fired.append(1))
+        entry.cancel()
+        assert wheel.pending == 0
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    assert fired == []
+
+
+def test_sleep() -> None:
+    """Пауза на колесе таймеров."""
+
+    async def run() -> float:
+        wheel = sm.TimerWheel()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await wheel.sleep(0.02)
+        return loop.time() - start
+
+    assert asyncio.run(run()) >= 0.02
+
+
+def test_timeout() -> None:
+    """Превышение времени преобразуется в TimeoutError."""
+
+    async def run() -> None:
+        wheel = sm.TimerWheel()
+        with pytest.raises(TimeoutError):
+            async with wheel.timeout(0.01):
+                await asyncio.sleep(1)
+        async with wheel.timeout(0.1) as timeout:
+            await asyncio.sleep(0)
+        assert not timeout.expired
+
+    asyncio.run(run())
+
+
+def test_empty_slots_skipped() -> None:
+    """Колесо не срабатывает на каждом такте до далекого таймера."""
+    fired: list[float] = []
+
+    async def run() -> int:
+        loop = asyncio.get_running_loop()
+        calls = 0
+        call_at = loop.call_at
+
+        def counting_call_at(
+            *args: Any,
+            **kwargs: Any,
+        ) -> asyncio.TimerHandle:
+            nonlocal calls
+            calls += 1
+            return call_at(*args, **kwargs)
+
+        loop.call_at = counting_call_at  # type: ignore[method-assign]
+        wheel = sm.TimerWheel(resolution=0.001, slots=512)
+        wheel.call_later(10, lambda: fired.append(loop.time()))
+        await asyncio.sleep(5)
+        # более ранний таймер переносит запланированный такт
+        wheel.call_later(0.002, lambda: fired.append(loop.time()))
+        await asyncio.sleep(6)
+        return calls
+
+    calls = testing.run(run())
+    assert calls < 100
+    assert fired == [
+        pytest.approx(5.002, abs=0.002),
+        pytest.approx(10, abs=0.002),
+    ]
+
+
+def test_timeout_inside_cancelled_task() -> None:
+    """Таймаут после перехваченной отмены задачи - TimeoutError."""
+
+    async def run() -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        task.cancel()
+        try:
+            await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            pass
+        wheel = sm.TimerWheel()
+        with pytest.raises(TimeoutError):
+            async with wheel.timeout(0.01):
+                await asyncio.sleep(1)
+        assert task.cancelling() == 1
+
+    asyncio.run(run())
+
+
+def test_wrong_parameters() -> None:
+    with pytest.raises(ValueError):
+        sm.TimerWheel(resolution=0)
+    with pytest.raises(ValueError):
+        sm.TimerWheel(slots=0)
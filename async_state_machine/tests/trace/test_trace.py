@@ -0,0 +1,192 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import async_state_machine as sm
+from async_state_machine import testing
+from async_state_machine.__main__ import main
+from async_state_machine.trace import (
+    TraceEvent,
+    TraceKind,
+    TraceRecorder,
+    analyze_trace,
+    read_trace,
+)
+
+
+class States(sm.StatesEnum):
+    """Перечень состояний."""
+
+    connect = sm.enum_auto()
+    work = sm.enum_auto()
+    offline = sm.enum_auto()
+
+
+async def to_work() -> States:
+    await asyncio.sleep(1)
+    return States.work
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(1000)
+
+
+async def disconnect() -> None:
+    await asyncio.sleep(0.5)
+
+
+def _write_trace(path: str) -> None:
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.connect, on_run=[to_work]),
+            sm.State(
+                name=States.work,
+                on_run=[wait_forever],
+                on_exit=[disconnect],
+            ).config_timeout_on_run(2, States.offline),
+            sm.State(name=States.offline, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    ).config_trace(path)
+    testing.run(testing.run_for(machine, 10))
+
+
+def test_report(tmp_path: Path) -> None:
+    """Отчет по записанной трассировке."""
+    path = str(tmp_path / "trace.bin")
+    _write_trace(path)
+
+    events = read_trace(path)
+    assert events[0].kind == TraceKind.start
+    assert events[0].state == "connect"
+    transitions = [
+        (event.state, event.new_state, event.cause)
+        for event in events
+        if event.kind == TraceKind.transition
+    ]
+    assert transitions == [
+        ("connect", "work", sm.TransitionCause.callback),
+        ("work", "offline", sm.TransitionCause.timeout),
+    ]
+
+    report = analyze_trace(events)
+    assert report.duration == pytest.approx(10, abs=0.01)
+    states = {item.state: item for item in report.states}
+    assert states["connect"].total == pytest.approx(1, abs=0.01)
+    assert states["work"].total == pytest.approx(2.5, abs=0.01)
+    stages = {(item.state, item.stage): item for item in report.stages}
+    assert stages["work", "on_run"].timeouts == 1
+    assert stages["work", "on_run"].max == pytest.approx(2, abs=0.01)
+    assert stages["work", "on_exit"].max == pytest.approx(0.5, abs=0.01)
+    path = {item.segment: item for item in report.critical_path}
+    assert report.critical_path[0].segment == "offline|on_run"
+    assert path["work|on_run"].total == pytest.approx(2, abs=0.01)
+    assert path["work|on_exit"].total == pytest.approx(0.5, abs=0.01)
+    assert sum(item.share for item in report.critical_path) == (
+        pytest.approx(1, abs=0.01)
+    )
+    slowest = report.slowest_transitions[0]
+    assert (slowest.active_state, slowest.new_state) == ("work", "offline")
+    worst = report.worst_latencies[0]
+    assert (worst.active_state, worst.new_state) == ("work", "offline")
+    assert worst.latency == pytest.approx(0.5, abs=0.01)
+
+
+def test_cli(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Отчет из командной строки."""
+    path = str(tmp_path / "trace.bin")
+    _write_trace(path)
+
+    monkeypatch.setattr(sys, "argv", ["prog", path, "--json", "--top", "1"])
+    main()
+    report = json.loads(capsys.readouterr().out)
+    assert len(report["slowest_transitions"]) == 1
+    assert report["worst_latencies"][0]["cause"] == "timeout"
+
+    monkeypatch.setattr(sys, "argv", ["prog", path])
+    main()
+    assert "work -> offline" in capsys.readouterr().out
+
+
+def test_truncated_and_wrong_file(tmp_path: Path) -> None:
+    """Неполная последняя запись отбрасывается, чужой файл - ошибка."""
+    path = tmp_path / "trace.bin"
+    _write_trace(str(path))
+    data = path.read_bytes()
+    count = len(read_trace(str(path)))
+    path.write_bytes(data[:-3])
+    assert len(read_trace(str(path))) == count - 1
+
+    path.write_bytes(b"not a trace")
+    with pytest.raises(sm.StateMachineError):
+        read_trace(str(path))
+
+
+def test_closed_after_run(tmp_path: Path) -> None:
+    """Файл закрывается по завершении run и дописывается при перезапуске."""
+    path = str(tmp_path / "trace.bin")
+    machine = sm.StateMachine(
+        states=[
+            sm.State(name=States.connect, on_run=[to_work]),
+            sm.State(
+                name=States.work,
+                on_run=[wait_forever],
+                on_exit=[disconnect],
+            ).config_timeout_on_run(2, States.offline),
+            sm.State(name=States.offline, on_run=[wait_forever]),
+        ],
+        states_enum=States,
+        init_state=States.connect,
+    ).config_trace(path)
+    testing.run(testing.run_for(machine, 0.5))
+    testing.run(testing.run_for(machine, 2))
+
+    kinds = [event.kind for event in read_trace(path)]
+    assert kinds.count(TraceKind.start) == 2
+
+
+def test_recorder_context_manager(tmp_path: Path) -> None:
+    """Выход из блока with закрывает файл."""
+    with TraceRecorder(str(tmp_path / "trace.bin"), States) as recorder:
+        assert not recorder.closed
+    assert recorder.closed
+
+
+def test_critical_path_skips_parent_on_run() -> None:
+    """on_run родителя параллелен дочерним состояниям и не входит в путь."""
+
+    def event(
+        time: float,
+        kind: TraceKind,
+        state: str,
+        stage: str | None = None,
+        new_state: str | None = None,
+    ) -> TraceEvent:
+        cause = sm.TransitionCause.callback if new_state else None
+        return TraceEvent(time, kind, state, stage, new_state, cause)
+
+    events = [
+        event(0, TraceKind.start, "idle"),
+        event(0, TraceKind.stage_start, "link", "on_run"),
+        event(0, TraceKind.stage_start, "idle", "on_run"),
+        event(1, TraceKind.stage_end, "idle", "on_run"),
+        event(1.5, TraceKind.transition, "idle", new_state="busy"),
+        event(1.5, TraceKind.stage_start, "busy", "on_run"),
+        event(4, TraceKind.stage_end, "busy", "on_run"),
+        event(4, TraceKind.stage_end, "link", "on_run"),
+    ]
+    report = analyze_trace(events)
+    path = {item.segment: item.total for item in report.critical_path}
+    assert path == {
+        "idle|on_run": 1,
+        "idle -> busy": 0.5,
+        "busy|on_run": 2.5,
+    }